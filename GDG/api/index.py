@@ -1,3 +1,8 @@
+import os
+
+# Serverless: the function is frozen after each response, so History rows are written in the request
+os.environ['HISTORY_WRITE_BEHIND'] = '0'
+
 from app import create_app
 
 app = create_app()
@@ -1,25 +1,41 @@
-from flask import Flask, render_template, session, redirect, url_for, jsonify, request
+from flask import Flask, Response, abort, g, render_template, send_file, session, redirect, url_for, jsonify, request, stream_with_context
+from flask import before_render_template, template_rendered
 import os
+import copy
 import json
-import requests
-import feedparser
+import time
+import mimetypes
 from io import BytesIO
 from dotenv import load_dotenv
-from google import genai
-from models import db, User, History
+from models import db, PrebuiltBriefing
+import migrations
 from datetime import datetime, timedelta, timezone
-import urllib.parse
-import PyPDF2
-from werkzeug.utils import secure_filename
-from bs4 import BeautifulSoup
-import time
 
 load_dotenv()
 
-# --- CONFIGURATION ---
-# ⚠️ REPLACE WITH YOUR ACTUAL API KEY IF NOT IN ENV
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
+from services import news_fetcher
+from services.news_fetcher import fetch_feeds
+from services import briefing_cache, scheduler, jobs, ai_client, pdf_cache, relevance, tts_service, history_writer, briefing_store
+from services import metrics, profiles, feed_cache, article_extractor, headlines, ai_response, assets, seen_stories, story_cache
+from services.article_extractor import extract_text_from_url, extract_many
+from services.stream_parser import BriefingStreamParser
+from services import history as history_store, history_export
+from services.profiles import get_profile, clean_user_topics, language_prompt
+
+# The whole paper is extracted; services.relevance decides what reaches the prompt
+PDF_CHAR_BUDGET = 400000
+PDF_MAX_PAGES = 64
+
+MAX_BATCH_URLS = 10
+LINK_SCRAPE_DEADLINE = 10
+LINK_ARTICLE_CHARS = 6000
+LINK_BATCH_PROMPT_CHARS = 40000
+DELTA_MAX_STORIES = int(os.environ.get('DELTA_MAX_STORIES', 6))
+
+AUDIO_MAX_AGE = 365 * 24 * 3600
+AUDIO_MAX_SEGMENTS = 24 # gTTS calls one /api/briefing-audio request may cause
+AUDIO_MAX_SEGMENT_CHARS = 2000
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') # when set, /metrics wants 'Authorization: Bearer <token>'
 
 # --- HELPER: INDIAN STANDARD TIME ---
 IST = timezone(timedelta(hours=5, minutes=30))
@@ -28,133 +44,64 @@ def get_ist_now():
     """Returns current time in IST"""
     return datetime.now(IST)
 
-# --- HELPER: AI RETRY LOGIC (Fixes 503 Errors) ---
-def call_gemini_with_retry(prompt, model='gemini-2.5-flash-lite'):
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.models.generate_content(
-                model=model, 
-                contents=prompt
-            )
-            return response
-        except Exception as e:
-            if "503" in str(e) or "overloaded" in str(e).lower() or "429" in str(e):
-                if attempt < max_retries - 1:
-                    print(f"⚠️ Model overloaded. Retrying in 5 seconds... (Attempt {attempt+1})")
-                    time.sleep(5)
-                else:
-                    raise e
-            else:
-                raise e
-
-def clean_json_string(text):
-    """Removes Markdown formatting from AI response"""
-    text = text.strip()
-    if text.startswith("```json"): text = text.replace("```json", "", 1)
-    if text.startswith("```"): text = text.replace("```", "", 1)
-    if text.endswith("```"): text = text.replace("```", "", 1)
-    return text.strip()
-
-# --- HELPER: EXTRACT TEXT FROM PDF (MEMORY SAFE) ---
-def extract_text_from_pdf(file_path):
-    """Extracts text from an uploaded PDF file saved on disk."""
-    try:
-        with open(file_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            text = ""
-            max_pages = min(len(pdf_reader.pages), 15) 
-            for page_num in range(max_pages):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        print(f"PDF Error: {e}")
-        return ""
-
-def extract_text_from_url(url):
-    """Scrapes the main text content from a news URL."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return ""
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Kill all script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.extract()    
-
-        text = " ".join([p.get_text() for p in soup.find_all('p')])
-        return " ".join(text.split())
-        
-    except Exception as e:
-        print(f"Scraping Error: {e}")
-        return ""
-
 # --- HELPER: DYNAMIC RSS FETCH ---
-def fetch_rss_news_for_topics(topics):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    combined_text = ""
-    
+def topic_query_terms(topics):
     if not topics: topics = ["Kerala"]
 
     print(f"🔍 Fetching custom news for: {topics}")
-    
+
+    query_terms = []
     for topic in topics:
         query_term = topic
         if isinstance(topic, dict): query_term = topic.get("id", "")
         if not query_term: continue
+        query_terms.append(query_term)
+    return query_terms
 
-        encoded_topic = urllib.parse.quote(query_term)
-        rss_url = f"https://news.google.com/rss/search?q={encoded_topic}&hl=en-IN&gl=IN&ceid=IN:en"
-        
-        try:
-            response = requests.get(rss_url, headers=headers, timeout=4)
-            if response.status_code == 200:
-                feed = feedparser.parse(BytesIO(response.content))
-                if not feed.entries: continue
-
-                count = 0
-                for entry in feed.entries:
-                    if count >= 2: break
-                    title = entry.title if 'title' in entry else ""
-                    clean_title = title.rsplit('-', 1)[0].strip()
-                    combined_text += f"Topic: {query_term} | Headline: {clean_title}\n"
-                    count += 1
-        except Exception as e:
-            print(f"      ❌ Error fetching {query_term}: {e}")
+def format_headlines(feeds):
+    """[(query_term, entries)] -> the "Topic | Headline" lines given to Gemini, deduplicated and within budget."""
+    return headlines.pack(feeds)
 
-    return combined_text
+def fetch_rss_news_for_topics(topics):
+    # All feeds are fetched in parallel; results come back in topic order
+    return format_headlines(fetch_feeds(topic_query_terms(topics)))
 
 def generate_ai_news(topics, language='malayalam'):
-    raw_text = fetch_rss_news_for_topics(topics)
-    
+    """
+    Briefing for a topic set, shared by every user with the same topics and
+    language in the current news hour. Concurrent misses share one Gemini call.
+    """
+    key = briefing_cache.make_key(topics, language)
+    return briefing_cache.get_or_generate(key, lambda: _generate_briefing(topics, language))
+
+def prebuild_briefing(topics, language):
+    """Scheduler entry point: a fresh briefing, or None when only the backup was available."""
+    news_data, cacheable = _generate_briefing(topics, language)
+    return news_data if cacheable else None
+
+def backup_briefing(language):
     if language.lower() == 'english':
-        role = "You are a professional English Radio News Editor."
-        lang_instruction = "Language: English."
-        backup_data = {
+        return {
             "headlines": ["News not available.", "Please check your internet."],
             "details": ["Unable to fetch news due to a technical error.", "Please try again shortly."]
         }
-    else:
-        role = "You are a professional Malayalam Radio News Editor."
-        lang_instruction = "Language: Malayalam."
-        backup_data = {
-            "headlines": ["വാർത്തകൾ ലഭ്യമാകുന്നില്ല.", "ഇന്റർനെറ്റ് കണക്ഷൻ പരിശോധിക്കുക."],
-            "details": ["സാങ്കേതിക തകരാർ മൂലം വാർത്തകൾ ലഭ്യമാക്കാൻ സാധിക്കുന്നില്ല.", "അല്പസമയത്തിന് ശേഷം വീണ്ടും ശ്രമിക്കുക."]
-        }
+    return {
+        "headlines": ["വാർത്തകൾ ലഭ്യമാകുന്നില്ല.", "ഇന്റർനെറ്റ് കണക്ഷൻ പരിശോധിക്കുക."],
+        "details": ["സാങ്കേതിക തകരാർ മൂലം വാർത്തകൾ ലഭ്യമാക്കാൻ സാധിക്കുന്നില്ല.", "അല്പസമയത്തിന് ശേഷം വീണ്ടും ശ്രമിക്കുക."]
+    }
 
+def build_briefing_prompt(topics, language):
+    """Fetches the headlines for `topics` and returns the Gemini prompt, or None when RSS came back empty."""
+    return briefing_prompt(topics, language, fetch_rss_news_for_topics(topics))
+
+@metrics.timed('prompt_build', kind='briefing')
+def briefing_prompt(topics, language, raw_text):
     if not raw_text or len(raw_text) < 50:
         print("⚠️ RSS Empty. Using Backup.")
-        return backup_data
+        return None
 
-    prompt = f"""
+    role, lang_instruction = language_prompt(language.lower())
+    return f"""
     {role}
     The listener is interested in these topics: {", ".join(topics)}.
     Below are the latest raw headlines fetched for them.
@@ -166,7 +113,7 @@ def generate_ai_news(topics, language='malayalam'):
     4. {lang_instruction}
     
     Raw News:
-    {raw_text[:12000]}
+    {raw_text}
     
     Output Format (JSON):
     {{
@@ -175,27 +122,505 @@ def generate_ai_news(topics, language='malayalam'):
     }}
     """
 
+def _generate_briefing(topics, language):
+    """Returns (news_data, cacheable). Backup data is never cacheable."""
+    prompt = build_briefing_prompt(topics, language)
+    if prompt is None:
+        return backup_briefing(language), False
+
     try:
-        response = call_gemini_with_retry(prompt)
-        cleaned = clean_json_string(response.text)
-        return json.loads(cleaned)
+        return ai_response.generate_briefing(prompt), True
     except Exception as e:
         print(f"❌ AI Error: {e}")
-        return backup_data
+        return backup_briefing(language), False
+
+@metrics.timed('prompt_build', kind='delta')
+def story_prompt(profile, stories):
+    """Gemini prompt writing up each (id, story) of `stories` on its own, for the story cache."""
+    story_block = "\n".join(f"[Story {i}] ({', '.join(story['topics'])}) {story['title']}" for i, story in stories)
+    return f"""
+    {profile.role}
+    Below are {len(stories)} news headlines, each marked [Story N] with its topics.
+    
+    Task:
+    1. Rewrite EACH story separately as a short radio news item: one headline and a 2-3 sentence detail.
+    2. Only use what the headline says; do not invent facts.
+    3. {profile.lang_instruction}
+    4. Output MUST be valid JSON.
+    
+    Stories:
+    {story_block}
+    
+    Output Format (JSON):
+    {{
+        "articles": [
+            {{"id": 1, "headlines": ["Headline"], "details": ["Detail"]}}
+        ]
+    }}
+    """
+
+def delta_briefing(profile):
+    """
+    Only the stories this user has not been given yet, as (news_data,
+    new_stories); (None, 0) with nothing new, without calling Gemini.
+    Raises PipelineError when only the backup briefing was available.
+
+    After each delta briefing every story in the feeds' candidate window
+    counts as heard, so later calls pick up only stories that entered the
+    feeds since; at most DELTA_MAX_STORIES at a time, the rest wait for the
+    next call. A first delta briefing is the prebuilt or this hour's shared
+    briefing when one is ready. Otherwise stories come from the story cache
+    (written up once per language, for all listeners): Gemini is asked at
+    most once per topic set per STORY_WRITE_INTERVAL (or for a first
+    briefing that has nothing written yet), and new stories not written yet
+    stay unheard until the next write-up.
+    """
+    feeds = fetch_feeds(topic_query_terms(profile.topics))
+    seen = seen_stories.load(profile.user_id)
+    first = not len(seen)
+    news_data = None
+    if first:
+        news_data = get_prebuilt_briefing(profile.topics, profile.language, profile.prebuilt_key) \
+            or briefing_cache.peek(briefing_cache.make_key(profile.topics, profile.language))
+    held_back = set() # keys of new stories not delivered this time; they stay unheard
+    if news_data is None:
+        stories = headlines.select_stories(feeds, seen, per_topic=headlines.CANDIDATES_PER_TOPIC)
+        seen_stories.count(len(stories))
+        if not stories: return None, 0
+        news_data, held_back = delta_items(profile, stories, feeds, first)
+        # Nothing written yet: every new story waits for the next write-up
+        if news_data is None: return None, 0
+
+    # A backup says nothing about the stories: keep them all unheard for the next try
+    if news_data == backup_briefing(profile.language):
+        raise PipelineError('News is not available right now. Please try again shortly.', 503)
+    seen_stories.mark(profile.user_id, [key for key in headlines.window_keys(feeds) if key not in held_back])
+    return news_data, len(news_data.get('headlines', []))
+
+def delta_items(profile, stories, feeds, first=False):
+    """
+    ({'headlines', 'details'}, keys of stories not delivered) for the first
+    DELTA_MAX_STORIES of `stories` that the story cache has written up. When
+    some of the first DELTA_MAX_STORIES are unwritten and a write-up is due
+    (story_cache.claim_write; always for a first briefing with nothing
+    written), one Gemini call writes them up and then the rest of the feeds'
+    candidate window, up to STORY_WRITE_MAX. News data is None when nothing
+    is written, or the backup when Gemini failed.
+    """
+    items = [story_cache.get(story['keys'], profile.language) for story in stories]
+    missing = [i for i, item in enumerate(items[:DELTA_MAX_STORIES]) if item is None]
+    due = missing and story_cache.claim_write(briefing_cache.normalize_topics(profile.topics), profile.language,
+                                              force=first and not any(items))
+    if due:
+        taken = {key for i in missing for key in stories[i]['keys']}
+        window = [story for story in headlines.select_stories(feeds, per_topic=headlines.CANDIDATES_PER_TOPIC)
+                  if not taken.intersection(story['keys']) and story_cache.get(story['keys'], profile.language) is None]
+        batch = ([stories[i] for i in missing] + window)[:max(story_cache.STORY_WRITE_MAX, len(missing))]
+        try:
+            response = ai_client.generate(story_prompt(profile, list(enumerate(batch, 1))), config=ai_response.ARTICLES_CONFIG)
+            written = {article.get('id'): article for article in ai_response.parse_articles(response.text)}
+        except Exception as e:
+            print(f"❌ AI Delta Error: {e}")
+            written = {}
+        for n, story in enumerate(batch, 1):
+            article = written.get(n) or {}
+            if article.get('headlines') and article.get('details'):
+                item = {'headline': article['headlines'][0], 'detail': article['details'][0]}
+                story_cache.put(story['keys'], profile.language, **item)
+                if n <= len(missing): items[missing[n - 1]] = item
+
+    chosen = [i for i, item in enumerate(items) if item][:DELTA_MAX_STORIES]
+    held_back = {key for i, story in enumerate(stories) if i not in chosen for key in story['keys']}
+    if not chosen: return (backup_briefing(profile.language) if due else None), held_back
+    return {'headlines': [items[i]['headline'] for i in chosen], 'details': [items[i]['detail'] for i in chosen]}, held_back
+
+def stream_briefing_events(topics, language):
+    """
+    Yields ('headlines' | 'details', index, text) as soon as each item is
+    complete, then ('done', None, news_data). Prebuilt and cached briefings
+    are replayed at once; otherwise one request per key streams Gemini's
+    output as it is parsed, and concurrent requests for the same key wait
+    for it and replay the result (briefing_cache.claim).
+    """
+    key = briefing_cache.make_key(topics, language)
+    news_data = get_prebuilt_briefing(topics, language)
+    if news_data is None:
+        role, value = briefing_cache.claim(key)
+        if role == 'hit':
+            news_data = value
+        elif role == 'follow':
+            try:
+                news_data = briefing_cache.wait(value)
+            except Exception:
+                # The leader's listener left before the briefing was done
+                news_data = generate_ai_news(topics, language)
+        else:
+            news_data = yield from _lead_briefing_stream(key, value, topics, language)
+            if news_data is not None:
+                yield ('done', None, news_data)
+                return
+            news_data = backup_briefing(language)
+
+    for kind in ('headlines', 'details'):
+        for index, text in enumerate(news_data.get(kind, [])):
+            yield (kind, index, text)
+    yield ('done', None, news_data)
+
+def _lead_briefing_stream(key, future, topics, language):
+    """
+    Streams the briefing for `key` as its single-flight leader and hands the
+    result to the waiting requests. Returns the briefing the listener has
+    heard, or None when nothing was streamed (the backup goes to everyone).
+    """
+    news_data, cacheable, shared = None, False, None
+    parser = BriefingStreamParser()
+    try:
+        prompt = build_briefing_prompt(topics, language)
+        if prompt is not None:
+            chunks = []
+            try:
+                for chunk in ai_client.generate_stream(prompt, config=ai_response.BRIEFING_CONFIG):
+                    chunks.append(chunk)
+                    yield from parser.feed(chunk)
+                news_data = ai_response.finish(ai_response.parse_briefing("".join(chunks)))
+                cacheable = True
+            except Exception as e:
+                print(f"❌ AI Stream Error: {e}")
+                partial = parser.result()
+                # The listener already heard these; finish with what arrived
+                if partial['headlines']: news_data = partial
+        shared = news_data or backup_briefing(language)
+    finally:
+        if shared is None:
+            briefing_cache.fail(key, future, ai_client.AIUnavailableError("Streamed briefing was abandoned"))
+        else:
+            briefing_cache.finish(key, future, shared, cacheable)
+    return news_data
+
+class PipelineError(Exception):
+    """A user-facing pipeline failure, carrying the message and HTTP status to return."""
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def save_history(user_id, summary_text, news_data, label="History"):
+    """Queues the row for the write-behind flusher, so the response never waits on a commit."""
+    try:
+        history_writer.record(user_id, summary_text[:500], news_data, get_ist_now())
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ {label} Save Error: {e}")
+
+def save_history_many(user_id, entries, label="History"):
+    """save_history() for several (summary_text, news_data) rows, committed in one transaction."""
+    now = get_ist_now()
+    try:
+        history_writer.record_many([(user_id, summary_text[:500], news_data, now) for summary_text, news_data in entries])
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ {label} Save Error: {e}")
+
+@metrics.timed('prompt_build', kind='pdf')
+def pdf_prompt(profile, relevant_text):
+    """Gemini prompt for the ranked newspaper extracts."""
+    return f"""
+    {profile.role}
+    I have uploaded a newspaper PDF. 
+    The listener is ONLY interested in these topics: {", ".join(profile.pdf_topics)}.
+    
+    Task:
+    1. Scan the newspaper extracts below.
+    2. STRICTLY FILTER out stories that do not match the user's topics.
+    3. Select the 3 most important stories that match their interests.
+    4. Rewrite them into a professional script for a Radio Broadcast.
+    5. Output MUST be valid JSON.
+    6. {profile.lang_instruction}
+    
+    Newspaper Extracts (most relevant first-pass matches, in page order):
+    {relevant_text}
+    
+    Output Format (JSON):
+    {{
+        "headlines": ["Short Headline 1", "Short Headline 2"],
+        "details": ["Detail 1", "Detail 2"]
+    }}
+    """
+
+@metrics.timed('prompt_build', kind='link')
+def link_prompt(profile, raw_text):
+    """Gemini prompt for one scraped article."""
+    return f"""
+    {profile.role}
+    I have provided the raw text of a news article below.
+    
+    Task:
+    1. Summarize this specific article into a short, engaging radio news segment.
+    2. Keep it under 60 words.
+    3. {profile.lang_instruction}
+    4. Output MUST be valid JSON.
+    
+    Article Text:
+    {raw_text[:15000]}
+    
+    Output Format (JSON):
+    {{
+        "headlines": ["Main Headline"],
+        "details": ["Summary of the article..."]
+    }}
+    """
+
+@metrics.timed('prompt_build', kind='link_batch')
+def link_batch_prompt(profile, batch):
+    """Gemini prompt summarizing each (index, text) article of `batch` separately."""
+    article_block = "\n\n".join(f"[Article {i + 1}]\n{text}" for i, text in batch)
+    return f"""
+    {profile.role}
+    I have provided the raw text of {len(batch)} news articles below, each marked [Article N].
+    
+    Task:
+    1. Summarize EACH article separately into a short, engaging radio news segment.
+    2. Keep each summary under 60 words.
+    3. {profile.lang_instruction}
+    4. Output MUST be valid JSON.
+    
+    Articles:
+    {article_block}
+    
+    Output Format (JSON):
+    {{
+        "articles": [
+            {{"id": 1, "headlines": ["Main Headline"], "details": ["Summary of the article..."]}}
+        ]
+    }}
+    """
+
+def run_pdf_pipeline(user_id, document, filename, report=None):
+    """Extracted newspaper (see pdf_cache) -> filtered radio script. Returns {'news_data', 'language'}."""
+    report = report or (lambda progress, stage: None)
+
+    if len(document['text']) < 100:
+        raise PipelineError('Could not read text. Is this an image scan?', 400)
+
+    profile = get_profile(user_id)
+    if not profile: raise PipelineError('User not found', 404)
+    user_language = profile.language
+
+    # Only the stories that match the listener's topics are sent to Gemini
+    report(30, 'ranking')
+    relevant_text = relevance.select_relevant(document, profile.pdf_topics)
+
+    prompt = pdf_prompt(profile, relevant_text)
+
+    report(40, 'summarizing')
+    try:
+        news_data = ai_response.generate_briefing(prompt)
+    except Exception as e:
+        print(f"❌ AI PDF Error: {e}")
+        raise PipelineError('AI failed to process PDF.', 500)
+
+    report(90, 'saving')
+    headlines = news_data.get('headlines', [])
+    summary_text = f"PDF: {filename} | " + (" | ".join(headlines) if headlines else "")
+    save_history(profile.user_id, summary_text, news_data, label="PDF DB")
 
-def create_app():
+    return {'news_data': news_data, 'language': user_language}
+
+def run_link_pipeline(user_id, url, report=None):
+    """News URL -> short radio segment. Returns {'news_data', 'language'}."""
+    report = report or (lambda progress, stage: None)
+
+    report(10, 'scraping')
+    raw_text = extract_text_from_url(url)
+    if len(raw_text) < 200:
+        raise PipelineError('Could not extract enough text. It might be behind a paywall.', 400)
+
+    profile = get_profile(user_id)
+    if not profile: raise PipelineError('User not found', 404)
+    user_language = profile.language
+
+    prompt = link_prompt(profile, raw_text)
+
+    report(40, 'summarizing')
+    try:
+        news_data = ai_response.generate_briefing(prompt)
+    except Exception as e:
+        print(f"❌ AI Link Error: {e}")
+        raise PipelineError('AI failed to process link.', 500)
+
+    report(90, 'saving')
+    headlines = news_data.get('headlines', [])
+    summary_text = f"Link: {url[:30]}... | " + (" | ".join(headlines) if headlines else "")
+    save_history(profile.user_id, summary_text, news_data)
+
+    return {'news_data': news_data, 'language': user_language}
+
+def run_link_batch_pipeline(user_id, urls):
+    """
+    Several news URLs -> one radio segment each. Pages are scraped in parallel
+    and summarized in as few Gemini calls as fit LINK_BATCH_PROMPT_CHARS.
+    Returns {'results', 'language'}; each result succeeds or fails on its own.
+    """
+    profile = get_profile(user_id)
+    if not profile: raise PipelineError('User not found', 404)
+    user_language = profile.language
+
+    texts = extract_many(urls, deadline=LINK_SCRAPE_DEADLINE)
+    results = [{'url': url, 'success': False} for url in urls]
+    articles = []
+    for i, raw_text in enumerate(texts):
+        if raw_text is None:
+            results[i]['message'] = 'The page took too long to load.'
+        elif len(raw_text) < 200:
+            results[i]['message'] = 'Could not extract enough text. It might be behind a paywall.'
+        else:
+            articles.append((i, raw_text[:LINK_ARTICLE_CHARS]))
+
+    # Pack articles into as few prompts as the size limit allows
+    batches = [[]]
+    batch_chars = 0
+    for article in articles:
+        if batches[-1] and batch_chars + len(article[1]) > LINK_BATCH_PROMPT_CHARS:
+            batches.append([])
+            batch_chars = 0
+        batches[-1].append(article)
+        batch_chars += len(article[1])
+
+    for batch in batches:
+        if not batch: continue
+        prompt = link_batch_prompt(profile, batch)
+        try:
+            response = ai_client.generate(prompt, config=ai_response.ARTICLES_CONFIG)
+            summaries = ai_response.parse_articles(response.text)
+        except Exception as e:
+            print(f"❌ AI Link Batch Error: {e}")
+            summaries = []
+
+        by_id = {item.get('id'): item for item in summaries if isinstance(item, dict)}
+        for i, _ in batch:
+            item = by_id.get(i + 1)
+            if item and item.get('headlines'):
+                results[i].update(success=True, news_data={'headlines': item.get('headlines', []), 'details': item.get('details', [])})
+            else:
+                results[i]['message'] = 'AI failed to process link.'
+
+    # One transaction for every History row of the batch
+    save_history_many(profile.user_id, [
+        (f"Link: {result['url'][:30]}... | " + " | ".join(result['news_data'].get('headlines', [])), result['news_data'])
+        for result in results if result['success']
+    ])
+
+    return {'results': results, 'language': user_language}
+
+def run_pdf_job(payload, user_id, report, upload):
+    report(10, 'extracting')
+    document, cache_hit = pdf_cache.extract_with_cache(BytesIO(upload), max_chars=PDF_CHAR_BUDGET, max_pages=PDF_MAX_PAGES)
+    result = run_pdf_pipeline(user_id, document, payload['filename'], report)
+    result['cache_hit'] = cache_hit
+    return result
+
+def run_link_job(payload, user_id, report, upload):
+    return run_link_pipeline(user_id, payload['url'], report)
+
+def get_prebuilt_briefing(topics, language, key=None):
+    """Returns a briefing the scheduler built for this topic set if it is still fresh."""
+    try:
+        news_data, built_at = profiles.prebuilt(key or scheduler.briefing_key(topics, language), _load_prebuilt)
+    except Exception as e:
+        print(f"⚠️ Prebuilt lookup error: {e}")
+        return None
+    if news_data is not None and scheduler.is_fresh(built_at):
+        return copy.deepcopy(news_data)
+    return None
+
+def _load_prebuilt(key):
+    row = db.session.query(PrebuiltBriefing.news_data, PrebuiltBriefing.built_at).filter_by(briefing_key=key).first()
+    return (row.news_data, row.built_at) if row else (None, None)
+
+def configure_services(config):
+    """Applies endpoint overrides from the app config to the service modules."""
+    if config.get('GEMINI_BASE_URL') or config.get('GEMINI_API_KEY'):
+        ai_client.configure(api_key=config.get('GEMINI_API_KEY'), base_url=config.get('GEMINI_BASE_URL'))
+    if config.get('RSS_SEARCH_URL'):
+        news_fetcher.RSS_SEARCH_URL = config['RSS_SEARCH_URL']
+    if config.get('TTS_BACKEND') == 'stub':
+        tts_service.set_backend(tts_service.StubBackend())
+
+def register_collectors():
+    """Cache, queue and Gemini state, read fresh on every /metrics scrape."""
+    metrics.register_collector('briefing_cache', briefing_cache.stats)
+    metrics.register_collector('feed_cache', feed_cache.stats)
+    metrics.register_collector('article_cache', article_extractor.stats)
+    metrics.register_collector('pdf_cache', pdf_cache.stats)
+    metrics.register_collector('profiles', profiles.stats)
+    metrics.register_collector('history_writer', history_writer.stats)
+    metrics.register_collector('briefing_store', briefing_store.stats)
+    metrics.register_collector('ai_responses', ai_response.stats)
+    metrics.register_collector('delta_briefings', seen_stories.stats)
+    metrics.register_collector('story_cache', story_cache.stats)
+    metrics.register_collector('gemini', lambda: {'circuit_open': int(ai_client.breaker.state == 'open')})
+
+def init_metrics(app):
+    """Request ids, the per-request latency histogram and template render timing."""
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.request_id = request.headers.get('X-Request-ID') or metrics.new_request_id()
+        g.request_id_token = metrics.set_request_id(g.request_id)
+
+    @app.after_request
+    def finish_request(response):
+        if 'request_started' not in g: return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('mindfeed_http_request_seconds', elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+        # Touching the session adds Vary: Cookie, which would keep shared caches from storing public assets
+        user_id = None if request.endpoint in ('asset', 'static') else session.get('user_id')
+        metrics.log_event('request', method=request.method, endpoint=endpoint, status=response.status_code,
+                          duration_ms=round(elapsed * 1000, 2), user_id=user_id)
+        response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    @app.teardown_request
+    def end_request(error=None):
+        token = g.pop('request_id_token', None)
+        if token is not None: metrics.reset_request_id(token)
+
+    def render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.pop('render_started', None)
+        if started is None: return
+        elapsed = time.perf_counter() - started
+        metrics.observe('mindfeed_stage_seconds', elapsed, stage='template_render', outcome='ok')
+        metrics.log_event('span', stage='template_render', outcome='ok', template=template.name, duration_ms=round(elapsed * 1000, 2))
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+def create_app(config=None):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'dev_secret_key_change_in_prod'
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 
+    app.config['AUTO_MIGRATE'] = os.environ.get('AUTO_MIGRATE') == '1'
+    # Only runner processes execute background jobs (worker.py and local runs set it; see services/jobs.py)
+    app.config['JOB_RUNNER'] = os.environ.get('JOB_RUNNER') == '1'
+    # Overrides, e.g. benchmarks.offline.app_config() for the offline benchmark stack
+    app.config.update(config or {})
+    configure_services(app.config)
 
     db.init_app(app)
 
     from auth.routes import auth_bp
     app.register_blueprint(auth_bp)
 
+    init_metrics(app)
+    register_collectors()
+
     # --- ROUTES ---
     @app.route('/')
     def index():
@@ -217,14 +642,44 @@ def create_app():
         if 'user_id' not in session: return redirect(url_for('auth.login'))
         
         selected_date = request.args.get('date')
-        query = db.session.query(History).filter_by(user_id=session['user_id'])
-        
-        if selected_date:
-            query = query.filter(History.summary_date == selected_date)
-        
-        user_history = query.order_by(History.created_at.desc()).all()
+        user_history, next_cursor = history_store.history_page(session['user_id'], selected_date, request.args.get('cursor'))
             
-        return render_template('history.html', history=user_history, selected_date=selected_date)
+        return render_template('history.html', history=user_history, selected_date=selected_date, next_cursor=next_cursor)
+
+    @app.route('/api/history')
+    def history_api():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+        rows, next_cursor = history_store.history_page(
+            session['user_id'], request.args.get('date'), request.args.get('cursor'),
+            request.args.get('limit', history_store.PAGE_SIZE, type=int)
+        )
+        return jsonify({'success': True, 'items': [history_store.entry_to_dict(r) for r in rows], 'next_cursor': next_cursor})
+
+    @app.route('/api/history/export')
+    def export_history():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in history_export.FORMATS:
+            return jsonify({'success': False, 'message': f"Format must be one of {', '.join(history_export.FORMATS)}"}), 400
+        start, end = history_store.parse_date(request.args.get('from')), history_store.parse_date(request.args.get('to'))
+        if (request.args.get('from') and not start) or (request.args.get('to') and not end):
+            return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+
+        gzip = request.accept_encodings['gzip'] > 0
+        headers = {'Content-Disposition': f'attachment; filename="mindfeed-history.{fmt}"', 'Vary': 'Accept-Encoding'}
+        if gzip: headers['Content-Encoding'] = 'gzip'
+        body = history_export.export(session['user_id'], fmt, start, end, gzip)
+        return Response(stream_with_context(body), mimetype=history_export.FORMATS[fmt], headers=headers)
+
+    @app.route('/api/history/<int:entry_id>')
+    def history_entry(entry_id):
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+        row = history_store.get_entry(session['user_id'], entry_id)
+        if not row: return jsonify({'success': False, 'message': 'Not found'}), 404
+        return jsonify({'success': True, 'entry': history_store.entry_to_dict(row), 'news_data': history_store.news_data(row)})
 
     @app.route('/upload-news')
     def upload_news_page():
@@ -242,90 +697,15 @@ def create_app():
         file = request.files['file']
         if file.filename == '': return jsonify({'success': False, 'message': 'No file selected'}), 400
 
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join('/tmp', filename) 
-        if not os.path.exists('/tmp'): os.makedirs('/tmp')
-        
-        try:
-            file.save(temp_path)
-            raw_text = extract_text_from_pdf(temp_path)
-        except Exception as e:
-            return jsonify({'success': False, 'message': f'File save error: {str(e)}'}), 500
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        
-        if len(raw_text) < 100:
-            return jsonify({'success': False, 'message': 'Could not read text. Is this an image scan?'}), 400
-
-        user = db.session.get(User, session['user_id'])
-        user_prefs = user.preferences if user.preferences else {}
-        
-        user_topics = user_prefs.get('topics', [])
-        cleaned_topics = []
-        for t in user_topics:
-            if isinstance(t, dict): cleaned_topics.append(t.get('id', 'General'))
-            else: cleaned_topics.append(str(t))
-        if not cleaned_topics: cleaned_topics = ["General News"]
-
-        user_language = user_prefs.get('language', 'malayalam').lower()
-        if user_language == 'english':
-            role = "You are a professional English Radio News Editor."
-            lang_instruction = "Language: English."
-        else:
-            role = "You are a professional Malayalam Radio News Editor."
-            lang_instruction = "Language: Malayalam."
-
-        prompt = f"""
-        {role}
-        I have uploaded a newspaper PDF. 
-        The listener is ONLY interested in these topics: {", ".join(cleaned_topics)}.
-        
-        Task:
-        1. Scan the raw PDF text below.
-        2. STRICTLY FILTER out stories that do not match the user's topics.
-        3. Select the 3 most important stories that match their interests.
-        4. Rewrite them into a professional script for a Radio Broadcast.
-        5. Output MUST be valid JSON.
-        6. {lang_instruction}
-        
-        Raw PDF Text (Truncated):
-        {raw_text[:25000]} 
-        
-        Output Format (JSON):
-        {{
-            "headlines": ["Short Headline 1", "Short Headline 2"],
-            "details": ["Detail 1", "Detail 2"]
-        }}
-        """
+        # Read straight from the upload stream, up to the extraction budget.
+        # A repeat upload of the same file is served from the content-addressed cache.
+        document, cache_hit = pdf_cache.extract_with_cache(file.stream, max_chars=PDF_CHAR_BUDGET, max_pages=PDF_MAX_PAGES)
 
         try:
-            response = call_gemini_with_retry(prompt)
-            cleaned_json = clean_json_string(response.text)
-            news_data = json.loads(cleaned_json)
-
-            try:
-                headlines = news_data.get('headlines', [])
-                summary_text = f"PDF: {file.filename} | " + (" | ".join(headlines) if headlines else "")
-
-                new_history = History(
-                    user_id=user.id,
-                    summary_date=get_ist_now().date(),
-                    created_at=get_ist_now(),
-                    content=summary_text[:500], 
-                    meta_data=news_data 
-                )
-                db.session.add(new_history)
-                db.session.commit()
-            except Exception as db_e:
-                db.session.rollback()
-                print(f"❌ PDF DB Save Error: {db_e}")
-            
-            return jsonify({'success': True, 'news_data': news_data, 'language': user_language})
-            
-        except Exception as e:
-            print(f"❌ AI PDF Error: {e}")
-            return jsonify({'success': False, 'message': 'AI failed to process PDF.'}), 500
+            result = run_pdf_pipeline(session['user_id'], document, file.filename)
+        except PipelineError as e:
+            return jsonify({'success': False, 'message': e.message, 'cache_hit': cache_hit}), e.status_code
+        return jsonify({'success': True, **result, 'cache_hit': cache_hit})
 
     # ROUTE 3: Upload Link Page
     @app.route('/upload-link')
@@ -343,116 +723,261 @@ def create_app():
         
         if not url: return jsonify({'success': False, 'message': 'No URL provided'}), 400
 
-        raw_text = extract_text_from_url(url)
-        if len(raw_text) < 200:
-            return jsonify({'success': False, 'message': 'Could not extract enough text. It might be behind a paywall.'}), 400
+        try:
+            result = run_link_pipeline(session['user_id'], url)
+        except PipelineError as e:
+            return jsonify({'success': False, 'message': e.message}), e.status_code
+        return jsonify({'success': True, **result})
+
+    # API 4: PROCESS SEVERAL NEWS LINKS AT ONCE
+    @app.route('/api/process-links', methods=['POST'])
+    def process_links():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+        data = request.get_json(silent=True)
+        urls = data.get('urls') if isinstance(data, dict) else None
+        if not isinstance(urls, list): return jsonify({'success': False, 'message': 'urls must be a list of links'}), 400
+        urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
+        if not urls: return jsonify({'success': False, 'message': 'No URL provided'}), 400
+        if len(urls) > MAX_BATCH_URLS:
+            return jsonify({'success': False, 'message': f'At most {MAX_BATCH_URLS} links at a time.'}), 400
 
-        user = db.session.get(User, session['user_id'])
-        user_prefs = user.preferences if user.preferences else {}
-        user_language = user_prefs.get('language', 'malayalam').lower()
+        try:
+            result = run_link_batch_pipeline(session['user_id'], urls)
+        except PipelineError as e:
+            return jsonify({'success': False, 'message': e.message}), e.status_code
+        return jsonify({'success': True, **result})
+
+    # API 5: SERVER-SIDE BRIEFING AUDIO
+    @app.route('/api/briefing-audio', methods=['POST'])
+    def briefing_audio():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
 
-        if user_language == 'english':
-            role = "You are a professional English Radio News Editor."
-            lang_instruction = "Language: English."
-        else:
-            role = "You are a professional Malayalam Radio News Editor."
-            lang_instruction = "Language: Malayalam."
-        
-        prompt = f"""
-        {role}
-        I have provided the raw text of a news article below.
-        
-        Task:
-        1. Summarize this specific article into a short, engaging radio news segment.
-        2. Keep it under 60 words.
-        3. {lang_instruction}
-        4. Output MUST be valid JSON.
-        
-        Article Text:
-        {raw_text[:15000]}
-        
-        Output Format (JSON):
-        {{
-            "headlines": ["Main Headline"],
-            "details": ["Summary of the article..."]
-        }}
-        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict): return jsonify({'success': False, 'message': 'Nothing to read'}), 400
+        news_data = data.get('news_data') if isinstance(data.get('news_data'), dict) else {}
+        language = str(data.get('language', 'malayalam'))
+
+        segments = []
+        for kind, items in (('line', data.get('lines')), ('headline', news_data.get('headlines')), ('detail', news_data.get('details'))):
+            if not isinstance(items, list): continue
+            segments += [(kind, i, str(t)) for i, t in enumerate(items) if t]
+        if not segments: return jsonify({'success': False, 'message': 'Nothing to read'}), 400
+        # Every segment may be a synthesis call made inside this request
+        if len(segments) > AUDIO_MAX_SEGMENTS:
+            return jsonify({'success': False, 'message': f'At most {AUDIO_MAX_SEGMENTS} segments at a time.'}), 400
+        if any(len(text) > AUDIO_MAX_SEGMENT_CHARS for _, _, text in segments):
+            return jsonify({'success': False, 'message': f'Segments are limited to {AUDIO_MAX_SEGMENT_CHARS} characters.'}), 400
 
         try:
-            response = call_gemini_with_retry(prompt)
-            cleaned_json = clean_json_string(response.text)
-            news_data = json.loads(cleaned_json)
+            briefing_digest, parts = tts_service.render_briefing(segments, language)
+        except Exception as e:
+            print(f"❌ TTS Error: {e}")
+            return jsonify({'success': False, 'message': 'Audio generation failed.'}), 502
+
+        return jsonify({
+            'success': True,
+            'audio_url': url_for('audio_file', digest=briefing_digest),
+            'segments': [
+                {'kind': p['kind'], 'index': p['index'], 'url': url_for('audio_file', digest=p['digest'])}
+                for p in parts
+            ],
+        })
+
+    @app.route('/audio/<digest>.mp3')
+    def audio_file(digest):
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest): abort(404)
+
+        path = tts_service.audio_path(digest)
+        if not os.path.exists(path): abort(404)
+        # Content-addressed, so the file behind a URL never changes; send_file handles Range and If-None-Match
+        response = send_file(path, mimetype='audio/mpeg', conditional=True, etag=digest, max_age=AUDIO_MAX_AGE)
+        response.headers['Cache-Control'] = f'private, max-age={AUDIO_MAX_AGE}, immutable'
+        return response
+
+    @app.template_global()
+    def asset_url(name):
+        """Fingerprinted URL of a static file; plain /static/ for files that do not exist."""
+        digest = assets.fingerprint(name)
+        if digest is None: return url_for('static', filename=name)
+        return url_for('asset', filename=assets.hashed_name(name, digest))
+
+    @app.route('/assets/<path:filename>')
+    def asset(filename):
+        name, requested = assets.split_hashed(filename)
+        digest = assets.fingerprint(name)
+        if digest is None: abort(404)
+
+        accepted = {e for e, _ in assets.ENCODINGS if request.accept_encodings[e]}
+        encoding, source = assets.variant(name, digest, accepted)
+        path = os.path.join(assets.STATIC_DIR, name)
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if source is None: source = path
+        elif isinstance(source, bytes): source = BytesIO(source)
+        # send_file answers If-None-Match and Range, per encoding since each has its own ETag
+        response = send_file(source, mimetype=mimetype, conditional=True, etag=f"{digest}-{encoding or 'identity'}",
+                             last_modified=os.path.getmtime(path), max_age=assets.ASSET_MAX_AGE)
+        if encoding: response.headers['Content-Encoding'] = encoding
+        if assets.compressible(name): response.vary.add('Accept-Encoding')
+        if requested == digest:
+            response.headers['Cache-Control'] = f'public, max-age={assets.ASSET_MAX_AGE}, immutable'
+        else:
+            # A page from before the file changed: today's file, revalidated every time
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
 
-            try:
-                headlines = news_data.get('headlines', [])
-                summary_text = f"Link: {url[:30]}... | " + (" | ".join(headlines) if headlines else "")
-                
-                new_history = History(
-                    user_id=user.id,
-                    summary_date=get_ist_now().date(),
-                    created_at=get_ist_now(),
-                    content=summary_text[:500],
-                    meta_data=news_data
-                )
-                db.session.add(new_history)
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"History Save Error: {e}")
+    # API 2b: LIVE RSS NEWS, STREAMED AS NDJSON WHILE GEMINI WRITES IT
+    @app.route('/api/process-news/stream', methods=['POST'])
+    def process_news_stream():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
 
-            return jsonify({'success': True, 'news_data': news_data, 'language': user_language})
+        profile = get_profile(session['user_id'])
+        if not profile: return jsonify({'success': False, 'message': 'User not found'}), 404
 
+        cleaned_topics = profile.topics
+        user_language = profile.language
+        user_id = profile.user_id
+
+        def generate():
+            for kind, index, value in stream_briefing_events(cleaned_topics, user_language):
+                if kind == 'done':
+                    headlines = value.get('headlines', [])
+                    summary_text = " | ".join(headlines) if headlines else "News Briefing"
+                    save_history(user_id, summary_text, value)
+                    yield json.dumps({'type': 'done', 'news_data': value, 'language': user_language}, ensure_ascii=False) + "\n"
+                else:
+                    yield json.dumps({'type': kind[:-1], 'index': index, 'text': value}, ensure_ascii=False) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    # --- ASYNC JOBS: same pipelines, run on the job worker pool ---
+    @app.route('/api/jobs/process-pdf', methods=['POST'])
+    def submit_pdf_job():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        if 'file' not in request.files: return jsonify({'success': False, 'message': 'No file uploaded'}), 400
+
+        file = request.files['file']
+        if file.filename == '': return jsonify({'success': False, 'message': 'No file selected'}), 400
+
+        # The upload is stored on the job row, so the job survives a restart and runs on any runner host
+        try:
+            upload = file.read()
         except Exception as e:
-            print(f"❌ AI Link Error: {e}")
-            return jsonify({'success': False, 'message': 'AI failed to process link.'}), 500
+            return jsonify({'success': False, 'message': f'File read error: {str(e)}'}), 500
+
+        job_id = jobs.submit(session['user_id'], 'pdf', {'filename': file.filename}, upload=upload)
+        return jsonify({'success': True, 'job_id': job_id}), 202
+
+    @app.route('/api/jobs/process-link', methods=['POST'])
+    def submit_link_job():
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+        data = request.get_json() or {}
+        url = data.get('url')
+        if not url: return jsonify({'success': False, 'message': 'No URL provided'}), 400
+
+        job_id = jobs.submit(session['user_id'], 'link', {'url': url})
+        return jsonify({'success': True, 'job_id': job_id}), 202
+
+    @app.route('/api/jobs/<job_id>')
+    def job_status(job_id):
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        job = jobs.get_job(job_id, session['user_id'])
+        if not job: return jsonify({'success': False, 'message': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': jobs.job_to_dict(job)})
+
+    @app.route('/api/jobs/<job_id>/events')
+    def job_events(job_id):
+        if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        if not jobs.get_job(job_id, session['user_id']): return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+        # One snapshot per request in sync mode (see jobs.sse_snapshot); asgi.py holds the stream open
+        stream = stream_with_context(jobs.sse_snapshot(job_id, session['user_id']))
+        return Response(stream, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/metrics')
+    def metrics_page():
+        if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
     # API 2: PROCESS LIVE RSS NEWS
     @app.route('/api/process-news', methods=['POST'])
     def process_news():
         if 'user_id' not in session: return jsonify({'success': False, 'message': 'Unauthorized'}), 401
 
-        user = db.session.get(User, session['user_id'])
-        if not user: return jsonify({'success': False, 'message': 'User not found'}), 404
+        # Cached, pre-normalized preferences: no database read on a warm profile
+        profile = get_profile(session['user_id'])
+        if not profile: return jsonify({'success': False, 'message': 'User not found'}), 404
 
-        user_prefs = user.preferences if user.preferences else {}
-        
-        user_topics = user_prefs.get('topics', [])
-        cleaned_topics = []
-        for t in user_topics:
-            if isinstance(t, dict): cleaned_topics.append(t.get('id', 'General'))
-            else: cleaned_topics.append(str(t))
-        if not cleaned_topics: cleaned_topics = ["Kerala"]
-
-        user_language = user_prefs.get('language', 'malayalam').lower()
+        cleaned_topics = profile.topics
+        user_language = profile.language
 
-        news_data = generate_ai_news(cleaned_topics, user_language)
-        
-        try:
+        # Delta mode: only what this user has not heard yet
+        body = request.get_json(silent=True)
+        if request.args.get('delta') == '1' or (isinstance(body, dict) and body.get('delta')):
+            try:
+                news_data, new_stories = delta_briefing(profile)
+            except PipelineError as e:
+                return jsonify({'success': False, 'message': e.message}), e.status_code
+            if not new_stories:
+                return jsonify({'success': True, 'no_new_stories': True, 'message': 'No new stories since your last briefing.',
+                                'news_data': {'headlines': [], 'details': []}, 'language': user_language})
             headlines = news_data.get('headlines', [])
-            summary_text = " | ".join(headlines) if headlines else "News Briefing"
-
-            new_history = History(
-                user_id=user.id,
-                summary_date=get_ist_now().date(), 
-                created_at=get_ist_now(),     
-                content=summary_text[:500], 
-                meta_data=news_data 
-            )
-            db.session.add(new_history)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ History Save Error: {e}")
+            save_history(profile.user_id, " | ".join(headlines) if headlines else "News Briefing", news_data)
+            return jsonify({'success': True, 'no_new_stories': False, 'new_stories': new_stories,
+                            'news_data': news_data, 'language': user_language})
+
+        # Served instantly when the scheduler already built this briefing
+        news_data = get_prebuilt_briefing(cleaned_topics, user_language, profile.prebuilt_key)
+        prebuilt = news_data is not None
+        if not prebuilt:
+            news_data = generate_ai_news(cleaned_topics, user_language)
+        
+        headlines = news_data.get('headlines', [])
+        summary_text = " | ".join(headlines) if headlines else "News Briefing"
+        save_history(profile.user_id, summary_text, news_data)
 
         # ⭐ RETURNING LANGUAGE HERE ⭐
-        return jsonify({'success': True, 'news_data': news_data, 'language': user_language})
+        return jsonify({'success': True, 'news_data': news_data, 'language': user_language, 'prebuilt': prebuilt})
+
+    @app.cli.command('assets-build')
+    def assets_build():
+        """Precompresses text assets in static/ (see services/assets.py)."""
+        assets.build()
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Applies pending schema migrations (see migrations.py)."""
+        if not migrations.upgrade(): print("✅ Schema is up to date")
 
-    with app.app_context():
-        db.create_all()
+    # The schema is a deploy step, not a boot step; AUTO_MIGRATE is for local runs
+    if app.config['AUTO_MIGRATE']:
+        with app.app_context():
+            migrations.upgrade()
+
+    jobs.register('pdf', run_pdf_job)
+    jobs.register('link', run_link_job)
+    jobs.init_app(app, runner=app.config['JOB_RUNNER'])
+    history_writer.init_app(app)
+
+    if os.environ.get('PREBUILD_IN_APP') == '1':
+        scheduler.start_background(app, prebuild_briefing, clean_user_topics)
 
     return app
 
-app = create_app()
+_app = None
+
+def __getattr__(name):
+    # `app` is built on first access (gunicorn app:app, asgi.py), so importing
+    # create_app from here (run.py, api/index.py, worker.py) builds only one app
+    global _app
+    if name == 'app':
+        if _app is None: _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app({'AUTO_MIGRATE': True, 'JOB_RUNNER': True}).run(debug=True, host='0.0.0.0', port=5000)
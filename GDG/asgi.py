@@ -0,0 +1,347 @@
+"""
+Async serving mode.
+
+The network-bound endpoints (/api/process-news, /api/process-link and
+/api/process-pdf) run as coroutines on the event loop: RSS and article
+pages go through one shared httpx.AsyncClient and Gemini through the
+client's asyncio API, so a single worker holds hundreds of briefings in
+flight instead of one per OS process. Job progress events
+(/api/jobs/<id>/events) are held open here without a thread per listener.
+Every other route is the unchanged
+Flask app from create_app(), run on a thread pool through asgiref.
+
+    uvicorn asgi:app --workers 2
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+The sync `gunicorn app:app` mode keeps working as before.
+"""
+import re
+import copy
+import time
+import asyncio
+from io import BytesIO
+from urllib.parse import unquote
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.wrappers import Request
+
+import app as web
+from services import ai_response, briefing_cache, pdf_cache, relevance, profiles, metrics, jobs
+from services.http import close_async_client
+from services.news_fetcher import fetch_feeds_async
+from services.article_extractor import extract_text_from_url_async
+
+JOB_EVENTS_PATH = re.compile(r'^/api/jobs/([0-9a-f]+)/events$')
+
+class _ThreadedWsgiInstance(WsgiToAsgiInstance):
+    """
+    asgiref runs every WSGI call on one shared thread (thread_sensitive),
+    which serializes the Flask routes; they are thread-safe, so this runs
+    them on the default pool. Same steps as WsgiToAsgiInstance.run_wsgi_app.
+    """
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._run_wsgi_app, thread_sensitive=False)(body)
+
+    def _run_wsgi_app(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            self.sync_send({'type': 'http.response.start', 'status': 400, 'headers': [(b'content-type', b'text/plain')]})
+            self.sync_send({'type': 'http.response.body', 'body': b"Bad Request: Too many duplicate headers"})
+            return
+        sent = 0
+        for output in self.wsgi_application(environ, self.start_response):
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            if self.response_content_length is not None:
+                output = output[:self.response_content_length - sent]
+            self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+            sent += len(output)
+            if sent == self.response_content_length: break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+class AsyncAPI:
+    """ASGI app: native async handlers for the hot API paths, Flask for the rest."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = ThreadedWsgiToAsgi(flask_app)
+        self.max_body = flask_app.config.get('MAX_CONTENT_LENGTH')
+        self.routes = {
+            '/api/process-news': self.process_news,
+            '/api/process-link': self.process_link,
+            '/api/process-pdf': self.process_pdf,
+        }
+        self._leaders = set() # keeps running briefing generations referenced
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = JOB_EVENTS_PATH.match(scope['path'])
+            if match: return await self.job_events(scope, receive, send, match.group(1))
+        handler = self.routes.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'POST' else None
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+
+        started = time.perf_counter()
+        headers = dict(scope['headers'])
+        request_id = headers.get(b'x-request-id', b'').decode('latin-1') or metrics.new_request_id()
+        token = metrics.set_request_id(request_id)
+        try:
+            status, payload = await self._handle(scope, receive, handler)
+        finally:
+            metrics.reset_request_id(token)
+        await self._respond(send, status, payload, request_id)
+
+        elapsed = time.perf_counter() - started
+        metrics.observe('mindfeed_http_request_seconds', elapsed, endpoint=scope['path'], method='POST', status=status)
+        metrics.log_event('request', request_id=request_id, method='POST', endpoint=scope['path'], status=status,
+                          duration_ms=round(elapsed * 1000, 2))
+
+    async def _handle(self, scope, receive, handler):
+        body = await self._read_body(receive)
+        if body is None:
+            return 413, {'success': False, 'message': 'File too large'}
+        request = Request(self._environ(scope, body))
+        user_id = self.flask_app.session_interface.open_session(self.flask_app, request).get('user_id')
+        if user_id is None:
+            return 401, {'success': False, 'message': 'Unauthorized'}
+        try:
+            return await handler(request, user_id)
+        except Exception as e:
+            print(f"❌ Async API Error ({scope['path']}): {e}")
+            return 500, {'success': False, 'message': 'Internal error'}
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_client()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- HANDLERS ---
+    async def process_news(self, request, user_id):
+        profile = await self._profile(user_id)
+        if not profile: return 404, {'success': False, 'message': 'User not found'}
+
+        body = request.get_json(silent=True)
+        if request.args.get('delta') == '1' or (isinstance(body, dict) and body.get('delta')):
+            # Per-user and mostly answered without Gemini: the blocking path on a thread is enough
+            try:
+                news_data, new_stories = await self._sync(web.delta_briefing, profile)
+            except web.PipelineError as e:
+                return e.status_code, {'success': False, 'message': e.message}
+            if not new_stories:
+                return 200, {'success': True, 'no_new_stories': True, 'message': 'No new stories since your last briefing.',
+                             'news_data': {'headlines': [], 'details': []}, 'language': profile.language}
+            headlines = news_data.get('headlines', [])
+            await self._sync(web.save_history, profile.user_id, " | ".join(headlines) if headlines else "News Briefing", news_data)
+            return 200, {'success': True, 'no_new_stories': False, 'new_stories': new_stories,
+                         'news_data': news_data, 'language': profile.language}
+
+        news_data = await self._sync(web.get_prebuilt_briefing, profile.topics, profile.language, profile.prebuilt_key)
+        prebuilt = news_data is not None
+        if not prebuilt:
+            news_data = await self._briefing(profile.topics, profile.language)
+
+        headlines = news_data.get('headlines', [])
+        summary_text = " | ".join(headlines) if headlines else "News Briefing"
+        await self._sync(web.save_history, profile.user_id, summary_text, news_data)
+        return 200, {'success': True, 'news_data': news_data, 'language': profile.language, 'prebuilt': prebuilt}
+
+    async def process_link(self, request, user_id):
+        data = request.get_json(silent=True) or {}
+        url = data.get('url')
+        if not url: return 400, {'success': False, 'message': 'No URL provided'}
+
+        raw_text = await extract_text_from_url_async(url)
+        if len(raw_text) < 200:
+            return 400, {'success': False, 'message': 'Could not extract enough text. It might be behind a paywall.'}
+
+        profile = await self._profile(user_id)
+        if not profile: return 404, {'success': False, 'message': 'User not found'}
+        try:
+            news_data = await ai_response.generate_briefing_async(web.link_prompt(profile, raw_text))
+        except Exception as e:
+            print(f"❌ AI Link Error: {e}")
+            return 500, {'success': False, 'message': 'AI failed to process link.'}
+
+        headlines = news_data.get('headlines', [])
+        summary_text = f"Link: {url[:30]}... | " + (" | ".join(headlines) if headlines else "")
+        await self._sync(web.save_history, profile.user_id, summary_text, news_data)
+        return 200, {'success': True, 'news_data': news_data, 'language': profile.language}
+
+    async def process_pdf(self, request, user_id):
+        # Parsing multipart spools large uploads to disk: keep it off the event loop
+        file = await asyncio.to_thread(request.files.get, 'file')
+        if file is None: return 400, {'success': False, 'message': 'No file uploaded'}
+        if file.filename == '': return 400, {'success': False, 'message': 'No file selected'}
+
+        # Extraction and ranking are CPU work: keep them off the event loop
+        document, cache_hit = await asyncio.to_thread(
+            pdf_cache.extract_with_cache, file.stream, max_chars=web.PDF_CHAR_BUDGET, max_pages=web.PDF_MAX_PAGES
+        )
+        if len(document['text']) < 100:
+            return 400, {'success': False, 'message': 'Could not read text. Is this an image scan?', 'cache_hit': cache_hit}
+
+        profile = await self._profile(user_id)
+        if not profile: return 404, {'success': False, 'message': 'User not found', 'cache_hit': cache_hit}
+        relevant_text = await asyncio.to_thread(relevance.select_relevant, document, profile.pdf_topics)
+        try:
+            news_data = await ai_response.generate_briefing_async(web.pdf_prompt(profile, relevant_text))
+        except Exception as e:
+            print(f"❌ AI PDF Error: {e}")
+            return 500, {'success': False, 'message': 'AI failed to process PDF.', 'cache_hit': cache_hit}
+
+        headlines = news_data.get('headlines', [])
+        summary_text = f"PDF: {file.filename} | " + (" | ".join(headlines) if headlines else "")
+        await self._sync(web.save_history, profile.user_id, summary_text, news_data, "PDF DB")
+        return 200, {'success': True, 'news_data': news_data, 'language': profile.language, 'cache_hit': cache_hit}
+
+    async def job_events(self, scope, receive, send, job_id):
+        """Server-Sent Events for a job, one per state change, polled from the event loop."""
+        request_id = metrics.new_request_id()
+        request = Request(self._environ(scope, b''))
+        user_id = self.flask_app.session_interface.open_session(self.flask_app, request).get('user_id')
+        if user_id is None:
+            return await self._respond(send, 401, {'success': False, 'message': 'Unauthorized'}, request_id)
+        data = await self._sync(jobs.job_state, job_id, user_id)
+        if data is None:
+            return await self._respond(send, 404, {'success': False, 'message': 'Job not found'}, request_id)
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'x-request-id', request_id.encode('latin-1')),
+        ]})
+        disconnected = asyncio.ensure_future(self._disconnect(receive))
+        try:
+            last, deadline = None, time.monotonic() + jobs.SSE_MAX_SECONDS
+            while data is not None and not disconnected.done():
+                if data != last:
+                    await send({'type': 'http.response.body', 'body': jobs.sse_message(data).encode('utf-8'), 'more_body': True})
+                    last = data
+                if data['status'] in ('done', 'failed'): break
+                if time.monotonic() > deadline:
+                    await send({'type': 'http.response.body', 'body': b"event: timeout\ndata: {}\n\n", 'more_body': True})
+                    break
+                await asyncio.sleep(jobs.SSE_POLL_INTERVAL)
+                data = await self._sync(jobs.job_state, job_id, user_id)
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+
+    # --- HELPERS ---
+    async def _disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _briefing(self, topics, language):
+        """
+        generate_ai_news() for the event loop: cached per news hour, and one
+        Gemini call per key across this loop and the threaded WSGI routes
+        (briefing_cache.claim).
+        """
+        key = briefing_cache.make_key(topics, language)
+        role, value = briefing_cache.claim(key)
+        if role == 'hit': return value
+        if role == 'lead':
+            # A task of its own: one impatient client disconnecting must not cancel the others' briefing
+            task = asyncio.ensure_future(self._lead_briefing(key, value, topics, language))
+            self._leaders.add(task)
+            task.add_done_callback(self._leaders.discard)
+        news_data = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(value)), briefing_cache.FOLLOWER_TIMEOUT)
+        return copy.deepcopy(news_data)
+
+    async def _lead_briefing(self, key, future, topics, language):
+        try:
+            news_data, cacheable = await self._generate_briefing(topics, language)
+        except BaseException as e:
+            briefing_cache.fail(key, future, e if isinstance(e, Exception) else RuntimeError("Briefing was cancelled"))
+            raise
+        briefing_cache.finish(key, future, news_data, cacheable)
+
+    async def _generate_briefing(self, topics, language):
+        """(news_data, cacheable), as app._generate_briefing."""
+        raw_text = web.format_headlines(await fetch_feeds_async(web.topic_query_terms(topics)))
+        prompt = web.briefing_prompt(topics, language, raw_text)
+        if prompt is None:
+            return web.backup_briefing(language), False
+        try:
+            return await ai_response.generate_briefing_async(prompt), True
+        except Exception as e:
+            print(f"❌ AI Error: {e}")
+            return web.backup_briefing(language), False
+
+    async def _profile(self, user_id):
+        return profiles.peek(user_id) or await self._sync(profiles.get_profile, user_id)
+
+    async def _sync(self, fn, *args):
+        """Runs blocking database work on a thread, inside the Flask app context."""
+        def call():
+            with self.flask_app.app_context():
+                return fn(*args)
+        return await asyncio.to_thread(call)
+
+    async def _read_body(self, receive):
+        """The whole request body, or None once it passes MAX_CONTENT_LENGTH."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.max_body and size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                return b"".join(chunks)
+
+    def _environ(self, scope, body):
+        """Just enough WSGI environ for werkzeug to parse the body, files and cookies."""
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': unquote(scope['path']),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            if name == 'CONTENT_TYPE': environ['CONTENT_TYPE'] = value.decode('latin-1')
+            elif name != 'CONTENT_LENGTH': environ[f'HTTP_{name}'] = value.decode('latin-1')
+        return environ
+
+    async def _respond(self, send, status, payload, request_id):
+        body = (self.flask_app.json.dumps(payload) + "\n").encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'x-request-id', request_id.encode('latin-1')),
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+app = AsyncAPI(web.app)
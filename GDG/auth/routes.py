@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, History
+from models import db, User
 from sqlalchemy.orm.attributes import flag_modified  # <--- The Fix
+from services.history import history_page
+from services import profiles
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -87,6 +88,7 @@ def preferences():
         
         try:
             db.session.commit()
+            profiles.invalidate(user.id)
             return jsonify({'success': True})
         except Exception as e:
             db.session.rollback()
@@ -100,19 +102,10 @@ def history():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
         
-    # Sort by newest first
-    query = History.query.filter_by(user_id=session['user_id'])
-    
+    # Newest first, one page at a time
     selected_date = request.args.get('date')
-    if selected_date:
-        try:
-            filter_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
-            query = query.filter(History.summary_date == filter_date)
-        except ValueError:
-            pass 
-            
-    user_history = query.order_by(History.created_at.desc()).all()
-    return render_template('history.html', history=user_history, selected_date=selected_date)
+    user_history, next_cursor = history_page(session['user_id'], selected_date, request.args.get('cursor'))
+    return render_template('history.html', history=user_history, selected_date=selected_date, next_cursor=next_cursor)
 
 @auth_bp.route('/logout')
 def logout():
@@ -0,0 +1,52 @@
+"""
+Drives services.ai_client against the local fake Gemini with injected 429/503s
+and reports success rate, retries, latency and circuit breaker behaviour.
+
+    python -m benchmarks.bench_ai_client
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google import genai
+from google.genai import types
+
+from services import ai_client
+from benchmarks.fake_gemini import start_fake_gemini
+
+def run(error_rate, calls=40, concurrency=8):
+    server, base_url = start_fake_gemini(latency=0.05, error_rate=error_rate)
+    ai_client.set_client(genai.Client(api_key='fake', http_options=types.HttpOptions(base_url=base_url)))
+    ai_client.breaker.record_success()
+
+    def one(_):
+        try:
+            ai_client.generate("Summarize the news " * 20)
+            return 'ok'
+        except ai_client.AIUnavailableError:
+            return 'fast-fail'
+        except Exception:
+            return 'error'
+
+    before = ai_client.stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - started
+    after = ai_client.stats()
+    server.shutdown()
+
+    print(f"error_rate={error_rate:.0%} wall={elapsed:.2f}s ok={outcomes.count('ok')} "
+          f"fast_fail={outcomes.count('fast-fail')} error={outcomes.count('error')} "
+          f"retries={after['retries'] - before['retries']} circuit={after['circuit']}")
+
+def main():
+    ai_client.AI_BACKOFF_BASE = 0.05
+    ai_client.breaker.cooldown = 0.5
+    # Budgets high enough that only the injected errors shape the result
+    ai_client._request_bucket = ai_client.TokenBucket(100000)
+    ai_client._token_bucket = ai_client.TokenBucket(10000000)
+    for rate in (0.0, 0.2, 0.5, 1.0):
+        run(rate)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+How many Gemini answers survive parsing, before and after services.ai_response.
+
+1. Offline corpus: briefings broken the ways model output breaks (fences,
+   chatter, trailing commas, cut off in the details), parsed by the old
+   clean_json_string + json.loads and by ai_response: answers kept, items
+   salvaged and time per parse.
+2. End to end: /api/process-link against the fake Gemini with a share of
+   malformed answers; successes, Gemini calls and the response counters.
+
+    python -m benchmarks.bench_ai_response [malformed share]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+os.environ.setdefault('GEMINI_API_KEY', 'offline')
+os.environ.setdefault('SPAN_LOG', '0')
+
+from benchmarks.fake_gemini import malformed
+from services import ai_response
+
+KINDS = ('fenced', 'chatter', 'trailing_comma', 'truncated')
+
+def legacy_parse(text):
+    """The parser every endpoint used before ai_response."""
+    text = text.strip()
+    if text.startswith("```json"): text = text.replace("```json", "", 1)
+    if text.startswith("```"): text = text.replace("```", "", 1)
+    if text.endswith("```"): text = text.replace("```", "", 1)
+    return json.loads(text.strip())
+
+def briefing(rng, items):
+    words = "kerala monsoon budget metro court election cricket rupee startup port rail power".split()
+    sentence = lambda n: " ".join(rng.choice(words) for _ in range(n)).capitalize()
+    return {'headlines': [sentence(6) for _ in range(items)], 'details': [sentence(30) + "." for _ in range(items)]}
+
+def bench_corpus(per_kind=2000):
+    rng = random.Random(7)
+    random.seed(7)
+    print(f"{'damage':<15} {'old kept':>9} {'new kept':>9} {'items kept':>11} {'old µs':>8} {'new µs':>8}")
+    for kind in KINDS:
+        cases = []
+        for _ in range(per_kind):
+            data = briefing(rng, rng.randint(3, 5))
+            cases.append((data, malformed(json.dumps(data, ensure_ascii=False), kind)))
+
+        old_kept, started = 0, time.perf_counter()
+        for _, text in cases:
+            try:
+                legacy_parse(text)
+                old_kept += 1
+            except ValueError:
+                pass
+        old_us = (time.perf_counter() - started) * 1e6 / len(cases)
+
+        new_kept, items, total, started = 0, 0, 0, time.perf_counter()
+        for data, text in cases:
+            total += len(data['headlines'])
+            try:
+                parsed = ai_response.parse_briefing(text)
+            except ai_response.ResponseError:
+                continue
+            new_kept += 1
+            items += min(len(parsed['headlines']), len(parsed['details']))
+        new_us = (time.perf_counter() - started) * 1e6 / len(cases)
+
+        print(f"{kind:<15} {old_kept / len(cases):>8.0%} {new_kept / len(cases):>8.0%} {items / total:>10.0%} "
+              f"{old_us:>7.1f} {new_us:>7.1f}")
+
+def bench_end_to_end(share, requests=60):
+    from benchmarks.offline import OfflineStack, app_config
+    from benchmarks.fake_gemini import FakeGeminiHandler
+
+    workdir = tempfile.mkdtemp(prefix='mindfeed_ai_response_')
+    os.environ.setdefault('LOCAL_CACHE_PATH', os.path.join(workdir, 'cache.sqlite'))
+    calls = []
+    with OfflineStack(gemini_latency=0.01, gemini_jitter=0, article_delay=0) as stack:
+        for name, value in stack.env().items():
+            os.environ.setdefault(name, value)
+        from app import create_app
+        app = create_app(app_config(stack, workdir))
+        FakeGeminiHandler.malformed_rate = share
+        FakeGeminiHandler.calls = calls
+
+        client = app.test_client()
+        account = {'name': 'Bench', 'email': 'bench@example.com', 'password': 'bench'}
+        client.post('/auth/register', json=account)
+        client.post('/auth/login', json=account)
+        ok = sum(
+            client.post('/api/process-link', json={'url': f"{stack.article_url}/story-{i}"}).status_code == 200
+            for i in range(requests)
+        )
+
+    print(f"\n/api/process-link, {share:.0%} of Gemini answers malformed, {requests} requests")
+    print(f"succeeded {ok}/{requests}, Gemini calls {len(calls)}, counters {ai_response.stats()}")
+
+def main():
+    share = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    bench_corpus()
+    bench_end_to_end(share)
+
+if __name__ == '__main__':
+    main()
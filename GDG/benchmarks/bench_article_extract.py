@@ -0,0 +1,47 @@
+"""
+Link scraping against a locally served corpus of article pages: the old
+requests + full BeautifulSoup tree vs. the streaming extractor, cold and cached.
+
+    python -m benchmarks.bench_article_extract
+"""
+import time
+import requests
+from bs4 import BeautifulSoup
+
+from services import article_extractor
+from benchmarks.stub_servers import ArticleHandler, start_server
+
+PAGES = 30
+
+def legacy_extract(url):
+    response = requests.get(url, timeout=10)
+    soup = BeautifulSoup(response.content, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.extract()
+    text = " ".join([p.get_text() for p in soup.find_all('p')])
+    return " ".join(text.split())
+
+def run(name, fn, urls):
+    started = time.perf_counter()
+    chars = sum(len(fn(url)) for url in urls)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {elapsed:>7.3f}s {elapsed / len(urls) * 1000:>7.1f}ms/page {chars:>9} chars")
+
+def main():
+    server, base_url = start_server(ArticleHandler, delay=0.02)
+    run_id = int(time.time())
+    urls = [f"{base_url}/story-{run_id}-{i}?utm_source=whatsapp" for i in range(PAGES)]
+    for url in urls: requests.get(url) # render the corpus once so page generation is not timed
+    try:
+        run('legacy (bs4 tree)', legacy_extract, urls)
+        run('streaming, cold cache', article_extractor.extract_text_from_url, urls)
+        run('streaming, warm cache', article_extractor.extract_text_from_url, urls)
+        article_extractor.ARTICLE_CACHE_TTL = 0
+        run('streaming, revalidated', article_extractor.extract_text_from_url, urls)
+        same = legacy_extract(urls[0]) == article_extractor.parse_paragraphs([requests.get(urls[0]).text])
+        print(f"extractors agree on text: {same}")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
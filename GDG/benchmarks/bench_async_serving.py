@@ -0,0 +1,120 @@
+"""
+Load test: the sync gunicorn mode vs. the async serving mode (asgi.py).
+
+Both servers run the real app against local stand-ins (fake Gemini, article
+pages, RSS) with realistic network latency, and are driven with rising
+numbers of concurrent /api/process-link requests, each for a different
+article so every request waits on the article site and on Gemini.
+
+    python -m benchmarks.bench_async_serving [concurrency ...]
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.offline import OfflineStack
+
+SYNC_WORKERS = int(os.environ.get('BENCH_SYNC_WORKERS', 4))
+GEMINI_LATENCY = 0.8
+ARTICLE_DELAY = 0.3
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def server_command(mode, port):
+    bind = f"127.0.0.1:{port}"
+    if mode == 'sync':
+        if shutil.which('gunicorn'):
+            return ['gunicorn', 'app:app', '-w', str(SYNC_WORKERS), '-b', bind, '--log-level', 'warning']
+        # Without gunicorn: the werkzeug forking server, also one process per in-flight request
+        return [sys.executable, '-c', f"from werkzeug.serving import run_simple; from app import app; "
+                f"run_simple('127.0.0.1', {port}, app, threaded=False, processes={SYNC_WORKERS})"]
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+            '--log-level', 'warning', '--no-access-log']
+
+def start_app(mode, port, env):
+    process = subprocess.Popen(server_command(mode, port), cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(f"{base_url}/auth/login", timeout=1)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+def login(base_url):
+    account = {'name': 'Bench', 'email': 'bench@example.com', 'password': 'bench'}
+    for _ in range(20):
+        # gunicorn accepts connections before every worker has booted
+        try:
+            httpx.post(f"{base_url}/auth/register", json=account)
+            response = httpx.post(f"{base_url}/auth/login", json=account)
+            response.raise_for_status()
+            return dict(response.cookies)
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError("could not log in")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def drive(base_url, cookies, article_url, concurrency, run_id):
+    """Fires 2 x concurrency requests with `concurrency` in flight. Returns (latencies, failures, wall)."""
+    latencies, failures = [], 0
+    limit = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i):
+            nonlocal failures
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    response = await client.post('/api/process-link', json={'url': f"{article_url}/{run_id}-story-{i}"})
+                    ok = response.status_code == 200 and response.json().get('success')
+                except httpx.HTTPError:
+                    ok = False
+                if ok: latencies.append(time.perf_counter() - started)
+                else: failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency * 2)))
+        return latencies, failures, time.perf_counter() - started
+
+def main():
+    levels = [int(v) for v in sys.argv[1:]] or [8, 64, 256]
+    stack = OfflineStack(gemini_latency=GEMINI_LATENCY, gemini_jitter=0, article_delay=ARTICLE_DELAY, rss_delay=0.2).start()
+    workdir = tempfile.mkdtemp(prefix='mindfeed_bench_')
+
+    print(f"fake Gemini {GEMINI_LATENCY}s, article site {ARTICLE_DELAY}s, sync workers={SYNC_WORKERS}, cpus={os.cpu_count()}")
+    print(f"{'mode':<6} {'conc':>5} {'ok':>5} {'fail':>5} {'req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7}")
+    try:
+        for port, mode in enumerate(('sync', 'async'), start=18700):
+            env = dict(os.environ, **stack.env())
+            env.update(AI_MAX_CONCURRENCY='1024', DATABASE_URL=f"sqlite:///{workdir}/{mode}.db",
+                       LOCAL_CACHE_PATH=f"{workdir}/{mode}-cache.sqlite")
+            process, base_url = start_app(mode, port, env)
+            try:
+                cookies = login(base_url)
+                for concurrency in levels:
+                    latencies, failures, wall = asyncio.run(drive(base_url, cookies, stack.article_url, concurrency, f"{mode}{concurrency}"))
+                    row = f"{mode:<6} {concurrency:>5} {len(latencies):>5} {failures:>5} {len(latencies) / wall:>7.1f}"
+                    if latencies:
+                        row += "".join(f" {percentile(latencies, p):>6.2f}s" for p in (50, 95, 99))
+                    print(row)
+            finally:
+                process.terminate()
+                process.wait(10)
+    finally:
+        stack.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
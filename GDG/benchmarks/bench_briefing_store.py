@@ -0,0 +1,107 @@
+"""
+Database size and history latency before and after the content-addressed
+briefing store, on a seeded SQLite database.
+
+Rows are seeded the old way (the full briefing inline in meta_data), with
+many listeners sharing few briefings, as with hourly prebuilt briefings per
+topic set and language. Then migration 0003 moves them to the briefings
+table and the same reads are timed again: the history page, and expanding
+single entries (get_entry() + news_data(), what /api/history/<id> does).
+
+    python -m benchmarks.bench_briefing_store [rows] [distinct briefings]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from models import db, User, History, Briefing
+from services import briefing_store
+from services.history import history_page, get_entry, news_data
+import migrations
+
+MALAYALAM = "കേരളം മഴ മെട്രോ കൊച്ചി ബജറ്റ് കോടതി തിരഞ്ഞെടുപ്പ് ക്രിക്കറ്റ് തുറമുഖം വൈദ്യുതി സർക്കാർ വിദ്യാർത്ഥികൾ".split()
+
+def briefing(rng):
+    sentence = lambda n: " ".join(rng.choice(MALAYALAM) for _ in range(n))
+    return {'headlines': [sentence(8) for _ in range(5)], 'details': [sentence(60) + "." for _ in range(5)]}
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+def seed(rows, distinct):
+    rng = random.Random(3)
+    briefings = [briefing(rng) for _ in range(distinct)]
+    users = [User(name=f"u{i}", email=f"u{i}@example.com", password_hash="x", preferences={}) for i in range(50)]
+    db.session.add_all(users)
+    db.session.commit()
+    start = datetime(2024, 1, 1, 6, 0)
+    batch = []
+    for i in range(rows):
+        created = start + timedelta(minutes=3 * i)
+        news = briefings[rng.randrange(distinct)]
+        batch.append({'user_id': users[i % len(users)].id, 'summary_date': created.date(), 'created_at': created,
+                      'content': " | ".join(news['headlines'])[:500], 'meta_data': news})
+        if len(batch) == 5000:
+            db.session.execute(History.__table__.insert(), batch)
+            batch = []
+    if batch: db.session.execute(History.__table__.insert(), batch)
+    db.session.commit()
+    return users[0].id
+
+def best_of(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def expand(user_id, ids):
+    for entry_id in ids:
+        assert news_data(get_entry(user_id, entry_id))['headlines']
+
+def report(label, path, user_id, ids):
+    db.session.remove()
+    size = os.path.getsize(path) / 2**20
+    page = best_of(lambda: history_page(user_id))
+    # A cold briefing cache first, then warm: the cache only helps after the migration
+    briefing_store._cache.clear()
+    cold = best_of(lambda: expand(user_id, ids), repeat=1)
+    warm = best_of(lambda: expand(user_id, ids), repeat=3)
+    print(f"{label:<7} {size:>8.1f}MB {page * 1000:>10.2f}ms {cold * 1e6 / len(ids):>11.0f}µs {warm * 1e6 / len(ids):>11.0f}µs")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = make_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            user_id = seed(rows, distinct)
+            print(f"seeded {rows} rows sharing {distinct} briefings in {time.perf_counter() - started:.1f}s\n")
+            ids = [row.id for row in db.session.query(History.id).filter_by(user_id=user_id).limit(200)]
+
+            print(f"{'layout':<7} {'db size':>10} {'page':>12} {'expand cold':>13} {'expand warm':>13}")
+            report('inline', path, user_id, ids)
+            started = time.perf_counter()
+            migrations._briefing_store()
+            migrated = time.perf_counter() - started
+            report('store', path, user_id, ids)
+            print(f"\nmigration 0003: {migrated:.1f}s, {db.session.query(Briefing).count()} briefings stored")
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Delta briefings ("what's new since my last briefing") against full ones.
+
+1. One simulated day: topic feeds gain stories at a steady rate (some
+   shared between topics), and listeners with the same topics check in
+   every 20, 60 or 180 minutes. Full mode costs one Gemini call per news
+   hour and BRIEFING_CACHE_TTL, shared by everyone, with the packed feed in
+   the prompt and about 4 stories heard per check, repeats included. Delta mode gives each
+   listener only stories new to them, writes each story up once for all
+   listeners in at most one batched call per STORY_WRITE_INTERVAL, and
+   skips Gemini when nothing is new. Gemini calls, raw news tokens in the
+   prompts (instructions excluded), stories heard.
+2. End to end on the offline stack (static feeds): repeated delta calls
+   from one listener, Gemini calls made and latency of the answers.
+
+    python -m benchmarks.bench_delta_briefing [new stories per topic per hour]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+os.environ.setdefault('GEMINI_API_KEY', 'offline')
+os.environ.setdefault('SPAN_LOG', '0')
+# Before any service import: the local stores open their file on import
+WORKDIR = tempfile.mkdtemp(prefix='mindfeed_delta_')
+os.environ.setdefault('LOCAL_CACHE_PATH', os.path.join(WORKDIR, 'cache.sqlite'))
+
+from benchmarks.bench_headlines import new_story, SOURCES
+from services import headlines
+from services.ai_client import estimate_tokens
+from services.briefing_cache import BRIEFING_BUCKET_SECONDS, BRIEFING_CACHE_TTL
+from services.story_cache import STORY_WRITE_INTERVAL, STORY_WRITE_MAX
+
+TOPICS = ["Kerala", "Kochi", "Cricket", "Technology"]
+FEED_LENGTH = 20
+DAY = 24 * 3600
+
+def feed_timeline(rate, seed=11):
+    """[(published_at, topic, entry)] over a day, `rate` stories per topic per hour, 20% shared with another topic."""
+    rng = random.Random(seed)
+    events, n = [], 0
+    for topic in TOPICS:
+        at = -3600.0 # a full feed already exists at midnight
+        while at < DAY:
+            at += rng.expovariate(rate / 3600)
+            n += 1
+            entry = {'title': f"{new_story(rng)} - {rng.choice(SOURCES)}", 'link': f"https://news.example/{n}"}
+            entry['id'] = entry['link']
+            events.append((at, topic, entry))
+            if rng.random() < 0.2:
+                events.append((at, rng.choice([t for t in TOPICS if t != topic]), entry))
+    return sorted(events, key=lambda e: e[0])
+
+def feeds_at(events, now):
+    feeds = {topic: [] for topic in TOPICS}
+    for at, topic, entry in events:
+        if at > now: break
+        feeds[topic].insert(0, entry)
+    return [(topic, entries[:FEED_LENGTH]) for topic, entries in feeds.items()]
+
+def simulate(rate, cadences=(20, 60, 180), listeners_per_cadence=5, max_stories=6):
+    events = feed_timeline(rate)
+    rng = random.Random(3)
+    checks = sorted(
+        (offset + k * cadence * 60, (cadence, i))
+        for cadence in cadences for i in range(listeners_per_cadence)
+        for offset in [rng.uniform(0, cadence * 60)]
+        for k in range(int(DAY // (cadence * 60)))
+    )
+    cached, written, seen = {}, set(), {}
+    last_write = [None]
+    totals = {mode: {'calls': 0, 'tokens': 0, 'stories': 0, 'skipped': 0} for mode in ('full', 'delta')}
+
+    def regular_briefing(feeds, now):
+        """One Gemini call per news hour and BRIEFING_CACHE_TTL, shared by every listener (briefing_cache)."""
+        bucket = int(now // BRIEFING_BUCKET_SECONDS)
+        if cached.get('bucket') != bucket or now - cached['at'] >= BRIEFING_CACHE_TTL:
+            cached.update(bucket=bucket, at=now)
+            totals['full']['calls'] += 1
+            totals['full']['tokens'] += estimate_tokens(headlines.pack(feeds))
+        totals['full']['stories'] += 4
+
+    def claim_write(now, force):
+        """story_cache.claim_write()"""
+        if not force and last_write[0] is not None and now - last_write[0] < STORY_WRITE_INTERVAL: return False
+        last_write[0] = now
+        return True
+
+    def is_written(story):
+        return any(key in written for key in story['keys'])
+
+    for now, listener in checks:
+        feeds = feeds_at(events, now)
+        regular_briefing(feeds, now)
+
+        # app.delta_briefing() and delta_items()
+        heard = seen.setdefault(listener, set())
+        stories = headlines.select_stories(feeds, heard, per_topic=headlines.CANDIDATES_PER_TOPIC)
+        if not stories:
+            totals['delta']['skipped'] += 1
+            continue
+        missing = [story for story in stories[:max_stories] if not is_written(story)]
+        if missing and claim_write(now, force=not heard and not any(map(is_written, stories))):
+            taken = {key for story in missing for key in story['keys']}
+            window = [story for story in headlines.select_stories(feeds, per_topic=headlines.CANDIDATES_PER_TOPIC)
+                      if not taken.intersection(story['keys']) and not is_written(story)]
+            batch = (missing + window)[:max(STORY_WRITE_MAX, len(missing))]
+            totals['delta']['calls'] += 1
+            totals['delta']['tokens'] += estimate_tokens("".join(headlines.story_line(story) for story in batch))
+            written.update(key for story in batch for key in story['keys'])
+        delivered = [story for story in stories if is_written(story)][:max_stories]
+        if not delivered:
+            totals['delta']['skipped'] += 1
+            continue
+        held_back = {key for story in stories if story not in delivered for key in story['keys']}
+        totals['delta']['stories'] += len(delivered)
+        heard.update(key for key in headlines.window_keys(feeds) if key not in held_back)
+
+    print(f"{rate:g} new stories per topic per hour, {len(TOPICS)} topics, {len(checks)} checks by listeners every "
+          f"{', '.join(map(str, cadences))} min")
+    print(f"{'mode':<6} {'Gemini calls':>13} {'raw news tokens':>16} {'tokens/call':>12} {'stories heard':>14} {'no new':>7}")
+    for mode, t in totals.items():
+        per_call = t['tokens'] / t['calls'] if t['calls'] else 0
+        print(f"{mode:<6} {t['calls']:>13} {t['tokens']:>16} {per_call:>12.0f} {t['stories']:>14} {t['skipped']:>7}")
+
+def end_to_end(calls=5):
+    from benchmarks.offline import OfflineStack, app_config
+    from benchmarks.fake_gemini import FakeGeminiHandler
+
+    gemini_calls = []
+    with OfflineStack(gemini_latency=0.3, gemini_jitter=0, rss_delay=0.05) as stack:
+        for name, value in stack.env().items():
+            os.environ.setdefault(name, value)
+        from app import create_app
+        app = create_app(app_config(stack, WORKDIR))
+        FakeGeminiHandler.calls = gemini_calls
+
+        client = app.test_client()
+        account = {'name': 'Bench', 'email': 'bench@example.com', 'password': 'bench'}
+        client.post('/auth/register', json=account)
+        client.post('/auth/login', json=account)
+        print("\nend to end, one listener, static feeds: /api/process-news?delta=1")
+        for i in range(calls):
+            before, started = len(gemini_calls), time.perf_counter()
+            body = client.post('/api/process-news?delta=1').get_json()
+            if not body.get('success'):
+                print(f"call {i + 1}: {body.get('message')}")
+                continue
+            print(f"call {i + 1}: {(time.perf_counter() - started) * 1000:>7.1f}ms  Gemini calls {len(gemini_calls) - before}  "
+                  f"new stories {body.get('new_stories', 0):>2}  no_new_stories={body['no_new_stories']}")
+
+def main():
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    simulate(rate)
+    print()
+    simulate(rate * 4)
+    end_to_end()
+
+if __name__ == '__main__':
+    main()
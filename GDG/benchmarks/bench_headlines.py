@@ -0,0 +1,128 @@
+"""
+Micro-benchmarks for services.headlines on synthetic Google News feeds.
+
+Stories are random titles over a Zipf-like vocabulary; topics overlap, and a
+story shared by two topics comes back as a variant (other source, case and
+punctuation, a "LIVE:" prefix, a word added, swapped or a clause moved).
+
+1. cluster(): time, and pairwise precision/recall against the true stories.
+2. pack() against the old format (two lines per topic, cut at 12000 chars):
+   time per call, prompt tokens, duplicate lines and topics that reached Gemini.
+
+    python -m benchmarks.bench_headlines [headline counts ...]
+"""
+import os
+import sys
+import time
+import random
+from collections import Counter
+
+os.environ.setdefault('GEMINI_API_KEY', 'offline')
+
+from services import headlines
+from services.ai_client import estimate_tokens
+
+SOURCES = ['The Hindu', 'Manorama', 'Mathrubhumi', 'NDTV', 'Times of India', 'Indian Express', 'ESPN', 'Reuters']
+VOCABULARY = [f"w{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+def new_story(rng):
+    words = rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(6, 11))
+    return " ".join(w.capitalize() if i == 0 else w for i, w in enumerate(words))
+
+def variant(title, rng):
+    words = title.split()
+    kind = rng.randrange(5)
+    if kind == 0: words = [w.upper() if rng.random() < 0.3 else w for w in words]
+    elif kind == 1: words = ["LIVE:"] + words
+    elif kind == 2: words.insert(rng.randrange(len(words)), rng.choice(VOCABULARY))
+    elif kind == 3: words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    else:
+        cut = len(words) // 2
+        words = words[cut:] + ["as"] + words[:cut]
+    return " ".join(words)
+
+def synthetic_feeds(topics, per_topic=40, shared=0.3, seed=1):
+    """[(topic, entries)] plus the true story of every entry, in feed order."""
+    rng = random.Random(seed)
+    stories = []
+    feeds, truth = [], []
+    for t in range(topics):
+        entries = []
+        for rank in range(per_topic):
+            if stories and rng.random() < shared:
+                story = rng.randrange(len(stories))
+                title = variant(stories[story], rng)
+            else:
+                story = len(stories)
+                stories.append(new_story(rng))
+                title = stories[story]
+            entries.append({'title': f"{title} - {rng.choice(SOURCES)}", 'link': f"https://news.example/{t}/{rank}"})
+            truth.append(story)
+        feeds.append((f"Topic {t}", entries))
+    return feeds, truth
+
+def pair_scores(predicted, truth):
+    def pairs(counts): return sum(n * (n - 1) // 2 for n in counts.values())
+    together = pairs(Counter(zip(predicted, truth)))
+    found, actual = pairs(Counter(predicted)), pairs(Counter(truth))
+    return (together / found if found else 1.0), (together / actual if actual else 1.0)
+
+def legacy_format(feeds):
+    """format_headlines() and the prompt cut before services.headlines."""
+    text = ""
+    for query_term, entries in feeds:
+        for entry in entries[:2]:
+            text += f"Topic: {query_term} | Headline: {entry['title'].rsplit('-', 1)[0].strip()}\n"
+    return text[:12000]
+
+def topics_in(text):
+    found = set()
+    for line in text.splitlines():
+        if line.startswith("Topic: ") and " | Headline: " in line:
+            found.update(line[len("Topic: "):line.index(" | Headline: ")].split(", "))
+    return found
+
+def timed(fn, *args, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat): result = fn(*args)
+    return result, (time.perf_counter() - started) / repeat
+
+def bench_cluster(sizes):
+    print(f"{'headlines':>10} {'time':>9} {'per 1k':>8} {'clusters':>9} {'precision':>10} {'recall':>7}")
+    for size in sizes:
+        feeds, truth = synthetic_feeds(topics=max(1, size // 40))
+        titles = [headlines.clean_title(e['title']) for _, entries in feeds for e in entries]
+        ids, elapsed = timed(headlines.cluster, titles)
+        precision, recall = pair_scores(ids, truth)
+        print(f"{len(titles):>10} {elapsed * 1000:>7.0f}ms {elapsed * 1e6 / len(titles):>6.0f}ms "
+              f"{len(set(ids)):>9} {precision:>10.3f} {recall:>7.3f}")
+
+def duplicate_lines(text, story_of):
+    """Lines whose story was already sent on an earlier line."""
+    seen, count = set(), 0
+    for line in text.splitlines():
+        story = story_of.get(line.split(" | Headline: ", 1)[-1])
+        count += story in seen
+        seen.add(story)
+    return count
+
+def bench_pack(topic_counts):
+    print(f"\n{'topics':>6} {'pack':>8} {'old tokens':>11} {'new tokens':>11} {'old dup':>8} {'new dup':>8} {'old topics':>11} {'new topics':>11}")
+    for topics in topic_counts:
+        feeds, truth = synthetic_feeds(topics=topics, seed=topics)
+        entries = [entry for _, topic_entries in feeds for entry in topic_entries]
+        story_of = {headlines.clean_title(entry['title']): story for entry, story in zip(entries, truth)}
+        packed, elapsed = timed(headlines.pack, feeds, repeat=20)
+        old = legacy_format(feeds)
+        print(f"{topics:>6} {elapsed * 1000:>6.1f}ms {estimate_tokens(old):>11} {estimate_tokens(packed):>11} "
+              f"{duplicate_lines(old, story_of):>8} {duplicate_lines(packed, story_of):>8} "
+              f"{len(topics_in(old)):>11} {len(topics_in(packed)):>11}")
+
+def main():
+    sizes = [int(v) for v in sys.argv[1:]] or [1000, 10000, 50000, 100000]
+    bench_cluster(sizes)
+    bench_pack([5, 20, 80, 200])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+History page latency on a seeded SQLite database (100k rows by default,
+one heavy user plus background users): the old full `.all()` load vs. the
+keyset-paginated page, with and without the composite index.
+
+    python -m benchmarks.bench_history [rows]
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db, User, History
+from services.history import history_page
+
+NEWS = {
+    "headlines": [f"Headline {i} about Kochi metro and monsoon rain" for i in range(4)],
+    "details": [("Detailed radio script sentence. " * 12).strip() for _ in range(4)],
+}
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+def seed(rows):
+    users = [User(name=f"u{i}", email=f"u{i}@example.com", password_hash="x", preferences={}) for i in range(10)]
+    db.session.add_all(users)
+    db.session.commit()
+    start = datetime(2024, 1, 1, 6, 0)
+    batch = []
+    for i in range(rows):
+        created = start + timedelta(minutes=7 * i)
+        # Half the rows belong to one long-time listener
+        user_id = users[0].id if i % 2 == 0 else users[1 + i % 9].id
+        batch.append({'user_id': user_id, 'summary_date': created.date(), 'created_at': created,
+                      'content': " | ".join(NEWS['headlines']), 'meta_data': NEWS})
+        if len(batch) == 5000:
+            db.session.execute(History.__table__.insert(), batch)
+            batch = []
+    if batch: db.session.execute(History.__table__.insert(), batch)
+    db.session.commit()
+    return users[0].id
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def legacy(user_id):
+    return db.session.query(History).filter_by(user_id=user_id).order_by(History.created_at.desc()).all()
+
+def deep_page(user_id, pages):
+    cursor = None
+    for _ in range(pages):
+        rows, cursor = history_page(user_id, cursor=cursor)
+    return rows
+
+def report(label, user_id):
+    db.session.expire_all()
+    t, rows = timed(lambda: legacy(user_id), repeat=2)
+    print(f"{label:<12} legacy .all() ({len(rows)} rows)   {t * 1000:>9.1f}ms")
+    t, _ = timed(lambda: history_page(user_id))
+    print(f"{label:<12} keyset first page         {t * 1000:>9.1f}ms")
+    t50, _ = timed(lambda: deep_page(user_id, 50), repeat=1)
+    print(f"{label:<12} keyset 50 pages walked    {t50 * 1000:>9.1f}ms ({t50 / 50 * 1000:.2f}ms/page)")
+    day = legacy(user_id)[500].summary_date
+    t, _ = timed(lambda: history_page(user_id, selected_date=day))
+    print(f"{label:<12} keyset one day filter     {t * 1000:>9.1f}ms")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = make_app(path)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            user_id = seed(rows)
+            print(f"seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+
+            report('indexed', user_id)
+            db.session.execute(text("DROP INDEX ix_history_user_date_created"))
+            db.session.commit()
+            report('no index', user_id)
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Memory and throughput of /api/history/export on a seeded SQLite database
+(1M history rows for one listener by default, sharing a few hundred stored
+briefings).
+
+The export is read through the test client without buffering, one chunk
+at a time like a slow client would, sampling the process RSS as it goes:
+flat RSS from the first rows to the last is what bounded memory means.
+The old way to get the same data, one `.all()` over the user's rows, is
+measured last for comparison.
+
+    python -m benchmarks.bench_history_export [rows] [--no-legacy]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault('GEMINI_API_KEY', 'offline')
+os.environ.setdefault('SPAN_LOG', '0')
+
+from models import db, User, History
+from services import briefing_store
+
+PAGE = os.sysconf('SC_PAGE_SIZE')
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE / 2**20
+
+def seed(rows, distinct=300):
+    rng = random.Random(5)
+    db.session.add(User(name="Bench", email="bench@example.com", password_hash="x", preferences={}))
+    db.session.commit()
+    briefings = [{'headlines': [f"Headline {b}.{i} on the Kochi metro" for i in range(5)],
+                  'details': [f"Briefing {b} detail {i}. " + "Radio script sentence. " * 20 for i in range(5)]}
+                 for b in range(distinct)]
+    digests, new = briefing_store.put_many(briefings)
+    db.session.commit()
+    start = datetime(2015, 1, 1, 6, 0)
+    batch = []
+    for i in range(rows):
+        created = start + timedelta(minutes=5 * i)
+        story = rng.randrange(distinct)
+        batch.append({'user_id': 1, 'summary_date': created.date(), 'created_at': created,
+                      'content': " | ".join(briefings[story]['headlines']), 'briefing_digest': digests[story]})
+        if len(batch) == 10000:
+            db.session.execute(History.__table__.insert(), batch)
+            batch = []
+    if batch: db.session.execute(History.__table__.insert(), batch)
+    db.session.commit()
+    db.session.remove()
+    briefing_store._cache.clear()
+
+def export(client, rows, query, label):
+    samples, sent, chunks = [], 0, 0
+    started = time.perf_counter()
+    response = client.get(f"/api/history/export?{query}", buffered=False,
+                          headers={'Accept-Encoding': 'gzip'} if 'gzip' in label else {})
+    for chunk in response.response:
+        sent += len(chunk)
+        chunks += 1
+        if chunks % 500 == 1: samples.append(rss_mb())
+    response.close()
+    elapsed = time.perf_counter() - started
+    samples.append(rss_mb())
+    quarter = max(1, len(samples) // 4)
+    trace = " ".join(f"{s:.0f}" for s in samples[::quarter][:4] + samples[-1:])
+    print(f"{label:<13} {sent / 2**20:>9.1f}MB {elapsed:>7.1f}s {rows / elapsed:>10.0f} "
+          f"{max(samples) - samples[0]:>+9.1f}MB   RSS trace MB: {trace}")
+
+def legacy(user_id):
+    before = rss_mb()
+    started = time.perf_counter()
+    rows = db.session.query(History).filter_by(user_id=user_id).order_by(History.created_at.desc()).all()
+    print(f"{'legacy .all()':<13} {'':>11} {time.perf_counter() - started:>7.1f}s {len(rows) / (time.perf_counter() - started):>10.0f} "
+          f"{rss_mb() - before:>+9.1f}MB")
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    rows = int(args[0]) if args else 1000000
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    from app import create_app
+    app = create_app({'AUTO_MIGRATE': True})
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            seed(rows)
+            print(f"seeded {rows} rows in {time.perf_counter() - started:.0f}s, {os.path.getsize(path) / 2**20:.0f}MB\n")
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+        print(f"{'export':<13} {'sent':>11} {'time':>8} {'rows/s':>10} {'RSS growth':>10}")
+        export(client, rows, "format=ndjson", 'ndjson')
+        export(client, rows, "format=csv", 'csv')
+        export(client, rows, "format=ndjson", 'ndjson gzip')
+        with app.app_context():
+            in_2016 = History.query.filter(History.summary_date.between(datetime(2016, 1, 1).date(), datetime(2016, 12, 31).date())).count()
+        export(client, in_2016, "format=csv&from=2016-01-01&to=2016-12-31", 'csv 2016')
+
+        if '--no-legacy' not in sys.argv:
+            with app.app_context():
+                legacy(1)
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
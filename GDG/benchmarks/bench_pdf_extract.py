@@ -0,0 +1,72 @@
+"""
+Time and peak Python heap of PDF extraction on synthetic multi-page PDFs:
+the old temp-file + `text +=` path vs. the streaming, budget-aware engine.
+
+    python -m benchmarks.bench_pdf_extract
+"""
+import io
+import os
+import time
+import tempfile
+import tracemalloc
+
+import PyPDF2
+
+from services import text_processing
+from benchmarks.pdf_factory import build_pdf
+
+BUDGET = 25000
+
+def legacy_extract(data, max_pages=None):
+    """The previous implementation: spool to /tmp, then concatenate every page."""
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        with open(path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            text = ""
+            pages = len(reader.pages) if max_pages is None else min(len(reader.pages), max_pages)
+            for page_num in range(pages):
+                text += reader.pages[page_num].extract_text() + "\n"
+        return text
+    finally:
+        os.remove(path)
+
+def measure(fn):
+    """Times a clean run, then repeats under tracemalloc (which slows it down) for the peak."""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, len(result)
+
+def main():
+    print(f"{'pages':>5} {'variant':<24} {'time':>8} {'peak heap':>10} {'chars':>8}")
+    for pages in (15, 60, 200):
+        data = build_pdf(pages=pages)
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+        variants = [
+            ('legacy, 15 pages', lambda: legacy_extract(data, max_pages=15)),
+            ('legacy, all pages', lambda: legacy_extract(data)),
+            ('stream, budget', lambda: text_processing.extract_text_from_pdf(io.BytesIO(data), max_chars=BUDGET)),
+            ('stream, all pages', lambda: text_processing.extract_text_from_pdf(io.BytesIO(data))),
+            ('mmap + pool, all pages', lambda: "\n".join(text_processing.extract_pdf_pages(path, parallel=True))),
+        ]
+        try:
+            for name, fn in variants:
+                elapsed, peak, chars = measure(fn)
+                print(f"{pages:>5} {name:<24} {elapsed:>7.3f}s {peak / 1024:>8.0f}KB {chars:>8}")
+        finally:
+            os.remove(path)
+    print(f"(peak heap is the parent process only; the pool used {text_processing.PDF_WORKERS} worker(s) "
+          f"on {os.cpu_count()} CPU(s) and only pays off with several cores)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Wall-clock time of the live RSS fan-out vs. topic count, against a local stub feed.
+
+    python -m benchmarks.bench_rss_fetch
+"""
+import time
+import requests
+import feedparser
+from io import BytesIO
+
+from services import news_fetcher, feed_cache
+from benchmarks.stub_servers import RSSHandler, start_server
+
+def sequential_fetch(query_terms):
+    """The old one-topic-at-a-time loop, kept here as the baseline."""
+    results = []
+    for term in query_terms:
+        response = requests.get(news_fetcher.build_feed_url(term), timeout=4)
+        results.append((term, feedparser.parse(BytesIO(response.content)).entries))
+    return results
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main():
+    server, base_url = start_server(RSSHandler, delay=0.3)
+    news_fetcher.RSS_SEARCH_URL = f"{base_url}/rss/search"
+    # Measure the network fan-out itself, not the shared feed cache
+    feed_cache.FEED_CACHE_TTL = 0
+    try:
+        print(f"{'topics':>6} {'sequential':>11} {'parallel':>9}")
+        for n in (1, 2, 4, 8, 16):
+            terms = [f"Topic{i}" for i in range(n)]
+            seq = timed(sequential_fetch, terms)
+            par = timed(news_fetcher.fetch_feeds, terms)
+            print(f"{n:>6} {seq:>10.2f}s {par:>8.2f}s")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold start: import time, create_app() time and time to first response, each
+measured in a fresh interpreter the way a serverless cold start pays them
+(api/index.py). Also checks that no heavy dependency is imported before it
+is needed. Exits 1 when a budget is exceeded, so it can guard CI:
+
+    python -m benchmarks.bench_startup [--runs 7] [--max-first-response-ms 1500]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use only; none of these may load during a cold start
+HEAVY_MODULES = ('google.genai', 'feedparser', 'PyPDF2', 'requests', 'httpx', 'gtts')
+
+PROBE = f"""
+import sys, time, json
+started = time.perf_counter()
+import app as web
+imported = time.perf_counter()
+flask_app = web.create_app()
+created = time.perf_counter()
+response = flask_app.test_client().get('/auth/login')
+answered = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (answered - started) * 1000,
+    'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+def probe(env):
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=APP_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "probe failed")
+    # The app logs JSON request lines to stdout too; the probe's line is the last one
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--max-import-ms', type=float, default=1000)
+    parser.add_argument('--max-first-response-ms', type=float, default=1500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='mindfeed_startup_')
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY', 'offline'), SPAN_LOG='0',
+               DATABASE_URL=f"sqlite:///{workdir}/startup.db", LOCAL_CACHE_PATH=f"{workdir}/cache.sqlite")
+
+    probe(env) # warm the OS file cache and the .pyc files, as a warm container image would have
+    runs = [probe(env) for _ in range(args.runs)]
+
+    print(f"{args.runs} cold starts, python {sys.version.split()[0]}")
+    print(f"{'stage':<20} {'median':>9} {'max':>9}")
+    for key in ('import_ms', 'create_app_ms', 'first_response_ms'):
+        values = [run[key] for run in runs]
+        print(f"{key[:-3]:<20} {statistics.median(values):>7.0f}ms {max(values):>7.0f}ms")
+
+    failures = []
+    heavy = sorted({m for run in runs for m in run['heavy']})
+    if heavy:
+        failures.append(f"imported at startup: {', '.join(heavy)}")
+    if statistics.median(run['import_ms'] for run in runs) > args.max_import_ms:
+        failures.append(f"import over {args.max_import_ms:.0f}ms")
+    if statistics.median(run['first_response_ms'] for run in runs) > args.max_first_response_ms:
+        failures.append(f"first response over {args.max_first_response_ms:.0f}ms")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Cold start within budget")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+What a live_news page load costs the workers in static files, before and
+after fingerprinted assets: bytes and server time for a first visit, and
+for a repeat visit with a warm browser cache.
+
+Before, /static/ answers with no max-age, so a browser revalidates every
+file on every load (a conditional request, 304 at best). After, /assets/
+URLs are immutable for a year: a repeat visit sends no request at all.
+Audio is fetched the way <audio> does it, as a byte range.
+
+    python -m benchmarks.bench_static_assets [page loads]
+"""
+import os
+import re
+import sys
+import time
+import tempfile
+
+os.environ.setdefault('GEMINI_API_KEY', 'offline')
+os.environ.setdefault('SPAN_LOG', '0')
+
+FILES = ['css/style.css', 'js/theme.js', 'media/newsIntro.mp3']
+BROWSER = {'Accept-Encoding': 'gzip, deflate, br'}
+
+def fetch(client, url, cache):
+    """One browser fetch of `url` with cache = {url: (etag, Cache-Control)}. Returns bytes on the wire, or None when served from cache."""
+    cached = cache.get(url)
+    if cached and 'immutable' in cached[1]: return None
+    headers = dict(BROWSER)
+    if url.endswith('.mp3'): headers['Range'] = 'bytes=0-'
+    if cached: headers['If-None-Match'] = cached[0]
+    response = client.get(url, headers=headers)
+    if response.status_code in (200, 206):
+        cache[url] = (response.headers.get('ETag'), response.headers.get('Cache-Control') or '')
+    return len(response.data)
+
+def page_load(client, urls, cache):
+    sent, requests, started = 0, 0, time.perf_counter()
+    for url in urls:
+        size = fetch(client, url, cache)
+        if size is None: continue
+        sent += size
+        requests += 1
+    return sent, requests, time.perf_counter() - started
+
+def report(label, client, urls, loads):
+    cache = {}
+    first = page_load(client, urls, cache)
+    repeat = [page_load(client, urls, cache) for _ in range(loads)]
+    sent = sum(r[0] for r in repeat) / loads
+    requests = sum(r[1] for r in repeat) / loads
+    elapsed = sum(r[2] for r in repeat) / loads
+    print(f"{label:<8} {first[0] / 1024:>9.1f}KB {first[1]:>5} {first[2] * 1000:>8.2f}ms "
+          f"{sent / 1024:>9.1f}KB {requests:>5.0f} {elapsed * 1000:>8.2f}ms")
+
+def main():
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workdir = tempfile.mkdtemp(prefix='mindfeed_assets_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import create_app
+    app = create_app({'AUTO_MIGRATE': True})
+    client = app.test_client()
+
+    with app.test_request_context():
+        from flask import render_template_string
+        fingerprinted = [render_template_string("{{ asset_url(name) }}", name=name) for name in FILES]
+    assert all(re.match(r'/assets/', url) for url in fingerprinted), fingerprinted
+
+    print(f"{'':<8} {'first visit':>27} {'repeat visit (mean)':>27}")
+    print(f"{'urls':<8} {'sent':>11} {'reqs':>5} {'server':>10} {'sent':>11} {'reqs':>5} {'server':>10}")
+    report('/static', client, [f"/static/{name}" for name in FILES], loads)
+    report('/assets', client, fingerprinted, loads)
+
+if __name__ == '__main__':
+    main()
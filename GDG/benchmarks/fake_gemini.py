@@ -0,0 +1,104 @@
+"""
+A local stand-in for the Gemini REST API (generateContent and
+streamGenerateContent). Point the app at it with GEMINI_BASE_URL=<url> and
+any GEMINI_API_KEY, or create_app({'GEMINI_BASE_URL': url}).
+"""
+import re
+import json
+import time
+import random
+from http.server import BaseHTTPRequestHandler
+
+from benchmarks.stub_servers import start_server
+
+DEFAULT_BRIEFING = {
+    "headlines": ["Local headline one", "Local headline two", "Local headline three"],
+    "details": ["Detail for story one.", "Detail for story two.", "Detail for story three."],
+}
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    latency_jitter = 0.0 # extra uniform delay in [0, jitter]
+    error_rate = 0.0 # share of calls answered with 429/503
+    error_codes = (429, 503)
+    body_text = json.dumps(DEFAULT_BRIEFING)
+    calls = None # shared list of (status, timestamp) when set
+    stream_chunks = 8 # pieces a streamed answer is split into
+    malformed_rate = 0.0 # share of answers fenced, wrapped in chatter, with trailing commas or cut off
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = self.rfile.read(length)
+        time.sleep(self.latency + random.uniform(0, self.latency_jitter))
+
+        if random.random() < self.error_rate:
+            code = random.choice(self.error_codes)
+            status = 'RESOURCE_EXHAUSTED' if code == 429 else 'UNAVAILABLE'
+            self._reply(code, {"error": {"code": code, "message": "injected by fake gemini", "status": status}})
+            return
+
+        usage = {"promptTokenCount": length // 4, "candidatesTokenCount": 60, "totalTokenCount": length // 4 + 60}
+        text = self._answer(request)
+        if 'streamGenerateContent' in self.path:
+            self._stream(text, usage)
+            return
+        self._reply(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": usage,
+        })
+
+    def _answer(self, request):
+        if b"still need their details" in request:
+            return json.dumps({"details": DEFAULT_BRIEFING["details"]})
+        marked = sorted({int(n) for n in re.findall(rb"\[(?:Story|Article) (\d+)\]", request)})
+        if marked:
+            # Batched prompts (delta stories, several links): one article per [Story N] / [Article N]
+            return json.dumps({"articles": [
+                {"id": n, "headlines": [f"Headline {n}"], "details": [f"Detail for item {n}."]} for n in marked
+            ]})
+        if random.random() >= self.malformed_rate:
+            return self.body_text
+        return malformed(self.body_text)
+
+    def _stream(self, text, usage):
+        """Server-sent events, one candidate chunk each, spread over `latency` like a real model."""
+        if self.calls is not None: self.calls.append((200, time.time()))
+        size = max(1, -(-len(text) // self.stream_chunks))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for i, piece in enumerate(pieces):
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+            if i == len(pieces) - 1:
+                chunk["candidates"][0]["finishReason"] = "STOP"
+                chunk["usageMetadata"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.latency / len(pieces))
+
+    def _reply(self, code, payload):
+        if self.calls is not None: self.calls.append((code, time.time()))
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def malformed(text, kind=None):
+    """`text` broken the ways model output breaks: 'fenced', 'chatter', 'trailing_comma' or 'truncated'."""
+    kind = kind or random.choice(('fenced', 'chatter', 'trailing_comma', 'truncated'))
+    if kind == 'fenced': return f"```json\n{text}\n```"
+    if kind == 'chatter': return f"Here is your briefing:\n{text}\nLet me know if you need anything else!"
+    if kind == 'trailing_comma': return text.replace('"]', '",]').replace(']}', '],}')
+    # Cut somewhere in the details, as a max-token stop does
+    start = text.find('"details"')
+    return text[:random.randint(start + 14, len(text) - 2)] if start >= 0 else text[:len(text) // 2]
+
+def start_fake_gemini(**attrs):
+    """Returns (server, base_url)."""
+    return start_server(FakeGeminiHandler, **attrs)
@@ -0,0 +1,198 @@
+"""
+Load driver for the API endpoints, fully offline.
+
+Starts the offline stack (benchmarks.offline), builds the app with
+create_app(app_config(stack)) on a local threaded server (or targets a
+running server with --target), logs in a test listener and drives each
+endpoint with a fixed number of requests at a fixed concurrency. Prints
+throughput and p50/p95/p99 per endpoint and writes them as JSON tagged
+with the git commit, so runs can be compared across commits:
+
+    python -m benchmarks.load --out before.json
+    python -m benchmarks.load --out after.json --compare before.json
+    python -m benchmarks.load --endpoints process-link,history --requests 200 --concurrency 32
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.offline import OfflineStack, app_config
+from benchmarks.pdf_factory import build_pdf
+
+ACCOUNT = {'name': 'Load Test', 'email': 'load@example.com', 'password': 'load-test',
+           'topics': ['Kerala', 'Technology', 'Cricket']}
+
+def _news(i, ctx): return {'method': 'POST', 'url': '/api/process-news'}
+def _news_stream(i, ctx): return {'method': 'POST', 'url': '/api/process-news/stream'}
+def _link(i, ctx): return {'method': 'POST', 'url': '/api/process-link', 'json': {'url': f"{ctx['article_url']}/{ctx['run']}-story-{i}"}}
+def _links(i, ctx):
+    urls = [f"{ctx['article_url']}/{ctx['run']}-batch-{i}-{j}" for j in range(3)]
+    return {'method': 'POST', 'url': '/api/process-links', 'json': {'urls': urls}}
+def _pdf(i, ctx):
+    pdfs = ctx['pdfs']
+    return {'method': 'POST', 'url': '/api/process-pdf', 'files': {'file': (f"paper-{i % len(pdfs)}.pdf", pdfs[i % len(pdfs)], 'application/pdf')}}
+def _history(i, ctx): return {'method': 'GET', 'url': '/history'}
+def _history_api(i, ctx): return {'method': 'GET', 'url': '/api/history?limit=20'}
+
+ENDPOINTS = {
+    'process-news': _news,
+    'process-news-stream': _news_stream,
+    'process-link': _link,
+    'process-links': _links,
+    'process-pdf': _pdf,
+    'history': _history,
+    'history-api': _history_api,
+}
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+async def run_endpoint(base_url, cookies, name, ctx, requests, concurrency):
+    build = ENDPOINTS[name]
+    latencies, errors = [], 0
+    limit = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i):
+            nonlocal errors
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(**build(i, ctx))
+                    await response.aread()
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok: latencies.append(time.perf_counter() - started)
+                else: errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - started
+
+    return {
+        'requests': requests, 'concurrency': concurrency, 'ok': len(latencies), 'errors': errors,
+        'throughput': round(len(latencies) / wall, 2) if wall else 0.0,
+        **{f"p{p}": round(percentile(latencies, p), 4) if latencies else None for p in (50, 95, 99)},
+    }
+
+def login(base_url):
+    for _ in range(20):
+        try:
+            httpx.post(f"{base_url}/auth/register", json=ACCOUNT)
+            response = httpx.post(f"{base_url}/auth/login", json=ACCOUNT)
+            response.raise_for_status()
+            return dict(response.cookies)
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError("could not log in")
+
+def serve_in_process(config):
+    """create_app(config) on a threaded werkzeug server. Returns (server, base_url)."""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from app import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args): pass
+
+    server = make_server('127.0.0.1', 0, create_app(config), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def print_table(report, baseline=None):
+    print(f"{'endpoint':<20} {'ok':>5} {'err':>4} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in report['results'].items():
+        line = f"{name:<20} {row['ok']:>5} {row['errors']:>4} {row['throughput']:>8.1f}"
+        line += "".join(f" {row[p]:>7.3f}s" if row[p] is not None else f" {'-':>8}" for p in ('p50', 'p95', 'p99'))
+        before = (baseline or {}).get('results', {}).get(name)
+        if before and before.get('p50') and row['p50'] is not None:
+            line += f"   p50 {100 * (row['p50'] - before['p50']) / before['p50']:+.0f}%"
+            if before.get('throughput'):
+                line += f", req/s {100 * (row['throughput'] - before['throughput']) / before['throughput']:+.0f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--gemini-latency', type=float, default=0.3)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--target', help='base URL of a server already running against the stack (see benchmarks.offline)')
+    parser.add_argument('--article-url', help='article site printed by benchmarks.offline, with --target')
+    parser.add_argument('--out', help='write the results as JSON')
+    parser.add_argument('--compare', help='JSON from an earlier run to diff against')
+    args = parser.parse_args()
+
+    names = [n for n in args.endpoints.split(',') if n]
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown: parser.error(f"unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='mindfeed_load_')
+    # Before the app is imported: throwaway caches and budgets that never shape the result
+    os.environ.setdefault('LOCAL_CACHE_PATH', os.path.join(workdir, 'cache.sqlite'))
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'default.db')}")
+    os.environ.setdefault('GEMINI_API_KEY', 'offline')
+
+    # --target: a server started against `python -m benchmarks.offline`, whose article URL is passed in
+    stack = None if args.target else OfflineStack(gemini_latency=args.gemini_latency, gemini_error_rate=args.gemini_error_rate).start()
+    server = None
+    try:
+        if stack:
+            for name, value in stack.env().items():
+                os.environ.setdefault(name, value)
+            server, base_url = serve_in_process(app_config(stack, workdir))
+        else:
+            if not args.article_url: parser.error("--target needs --article-url")
+            base_url = args.target.rstrip('/')
+
+        ctx = {
+            'article_url': stack.article_url if stack else args.article_url.rstrip('/'),
+            'run': datetime.now().strftime('%H%M%S'),
+            'pdfs': [build_pdf(pages=12, seed=seed) for seed in range(4)],
+        }
+        cookies = login(base_url)
+        report = {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'cpus': os.cpu_count(),
+            'settings': {**(stack.settings if stack else {}), 'requests': args.requests, 'concurrency': args.concurrency,
+                         'target': 'external' if args.target else 'in-process'},
+            'results': {},
+        }
+        for name in names:
+            report['results'][name] = asyncio.run(run_endpoint(base_url, cookies, name, ctx, args.requests, args.concurrency))
+    finally:
+        if server: server.shutdown()
+        if stack: stack.stop()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"comparing {report['commit']} against {baseline.get('commit')}")
+    print_table(report, baseline)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+The offline stack: fake Gemini, a Google News RSS stand-in and an article
+site, all on local ports, plus the create_app() config that points the app
+at them. Nothing leaves the machine and no Gemini quota is spent.
+
+    python -m benchmarks.offline      # start the stack and print the env for an external server
+"""
+import os
+import time
+import tempfile
+
+from benchmarks.fake_gemini import start_fake_gemini
+from benchmarks.stub_servers import start_server, ArticleHandler, RSSHandler
+
+DEFAULTS = {
+    'gemini_latency': 0.3,
+    'gemini_jitter': 0.1,
+    'gemini_error_rate': 0.0,
+    'rss_delay': 0.05,
+    'article_delay': 0.1,
+}
+
+class OfflineStack:
+    def __init__(self, **settings):
+        self.settings = dict(DEFAULTS, **settings)
+        self.servers = []
+
+    def start(self):
+        s = self.settings
+        gemini, self.gemini_url = start_fake_gemini(
+            latency=s['gemini_latency'], latency_jitter=s['gemini_jitter'], error_rate=s['gemini_error_rate']
+        )
+        rss, rss_url = start_server(RSSHandler, delay=s['rss_delay'])
+        articles, self.article_url = start_server(ArticleHandler, delay=s['article_delay'])
+        self.rss_url = f"{rss_url}/rss/search"
+        self.servers = [gemini, rss, articles]
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+        self.servers = []
+
+    def env(self):
+        """Environment for running a separate server process against the stack."""
+        return {
+            'GEMINI_API_KEY': 'offline',
+            'GEMINI_BASE_URL': self.gemini_url,
+            'RSS_SEARCH_URL': self.rss_url,
+            'TTS_BACKEND': 'stub',
+            'AUTO_MIGRATE': '1', # throwaway databases start empty
+            # Generous budgets, so the limiter never shapes a benchmark by accident
+            'AI_REQUESTS_PER_MINUTE': '1000000',
+            'AI_TOKENS_PER_MINUTE': '1000000000',
+            'AI_MAX_CONCURRENCY': '256',
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def app_config(stack, workdir=None):
+    """create_app() config for the stack, with a throwaway database."""
+    workdir = workdir or tempfile.mkdtemp(prefix='mindfeed_bench_')
+    return {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'GEMINI_API_KEY': 'offline',
+        'GEMINI_BASE_URL': stack.gemini_url,
+        'RSS_SEARCH_URL': stack.rss_url,
+        'TTS_BACKEND': 'stub',
+        'AUTO_MIGRATE': True,
+    }
+
+def main():
+    with OfflineStack() as stack:
+        for name, value in stack.env().items():
+            print(f"export {name}={value}")
+        print(f"# python -m benchmarks.load --target http://127.0.0.1:8000 --article-url {stack.article_url}")
+        try:
+            while True: time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Builds synthetic newspaper-like PDFs with real text layers, no third-party deps."""
+import random
+
+WORDS = (
+    "kerala kochi government minister monsoon rain budget technology startup market "
+    "cricket football election assembly district police court school hospital port "
+    "railway airport tourism fisheries farmers price fuel bank policy report council"
+).split()
+
+def _page_stream(page_no, lines, rng):
+    parts = ["BT", "/F1 9 Tf", "11 TL", "36 800 Td"]
+    parts.append(f"(PAGE {page_no} NEWS) Tj T*")
+    for _ in range(lines):
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        parts.append(f"({line}) Tj T*")
+    parts.append("ET")
+    return "\n".join(parts).encode('latin-1')
+
+def build_pdf(pages=20, lines_per_page=60, seed=7):
+    """Returns the bytes of a PDF with `pages` pages of extractable text."""
+    rng = random.Random(seed)
+    objects = []
+    # 1: catalog, 2: pages, 3: font, then (page, content) pairs
+    kids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i in range(pages):
+        content_id = 5 + 2 * i
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        stream = _page_stream(i + 1, lines_per_page, rng)
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
@@ -0,0 +1,124 @@
+"""Local stand-in servers used by the benchmarks. Nothing here touches the internet."""
+import time
+import random
+import functools
+import hashlib
+import threading
+import urllib.parse
+from xml.sax.saxutils import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SOURCES = (
+    ("The Hindu", "https://www.thehindu.com"), ("Mathrubhumi English", "https://english.mathrubhumi.com"),
+    ("Onmanorama", "https://www.onmanorama.com"), ("The New Indian Express", "https://www.newindianexpress.com"),
+    ("Deccan Herald", "https://www.deccanherald.com"), ("NDTV", "https://www.ndtv.com"),
+)
+HEADLINE_WORDS = (
+    "minister announces new plan for", "heavy rain alert issued in", "court seeks report on",
+    "startup raises funds to expand", "police arrest two in", "budget boost for",
+    "metro extension to reach", "fishermen warned as sea turns rough near", "IT park to add jobs in",
+)
+
+@functools.lru_cache(maxsize=256)
+def build_rss(query, items=40):
+    """A feed shaped like news.google.com/rss/search: 'Headline - Source' titles, article redirect links, <source>."""
+    rng = random.Random(query)
+    q = escape(query)
+    out = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<rss xmlns:media="http://search.yahoo.com/mrss/" version="2.0"><channel>'
+        f'<generator>NFE/5.0</generator><title>"{q}" - Google News</title>'
+        f'<link>https://news.google.com/search?q={urllib.parse.quote(query)}&amp;hl=en-IN&amp;gl=IN&amp;ceid=IN:en</link>'
+        '<language>en-IN</language><webMaster>news-webmaster@google.com</webMaster>'
+        '<copyright>2025 Google Inc.</copyright><lastBuildDate>Mon, 06 Jan 2025 09:00:00 GMT</lastBuildDate>'
+        '<description>Google News</description>'
+    ]
+    for i in range(items):
+        source, site = rng.choice(SOURCES)
+        headline = escape(f"{query}: {rng.choice(HEADLINE_WORDS)} {rng.choice(('Kochi', 'Thiruvananthapuram', 'Kozhikode', 'Thrissur'))} ({i})")
+        token = hashlib.sha1(f"{query}-{i}".encode()).hexdigest()
+        link = f"https://news.google.com/rss/articles/CBMi{token}?oc=5"
+        description = f'<a href="{link}" target="_blank">{headline}</a>&nbsp;&nbsp;<font color="#6f6f6f">{source}</font>'
+        out.append(
+            f"<item><title>{headline} - {escape(source)}</title><link>{link}</link>"
+            f'<guid isPermaLink="false">CBMi{token}</guid>'
+            f"<pubDate>Mon, 06 Jan 2025 {i % 24:02d}:{(i * 7) % 60:02d}:00 GMT</pubDate>"
+            f"<description>{escape(description)}</description>"
+            f'<source url="{site}">{escape(source)}</source></item>'
+        )
+    out.append("</channel></rss>")
+    return "".join(out).encode('utf-8')
+
+class RSSHandler(BaseHTTPRequestHandler):
+    delay = 0.3
+
+    def do_GET(self):
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        query = params.get('q', ['General'])[0]
+        time.sleep(self.delay)
+        etag = f'"{hashlib.md5(query.encode()).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = build_rss(query)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@functools.lru_cache(maxsize=256)
+def build_article(slug, paragraphs=40, chrome_kb=150, seed=0):
+    """A news page with the usual chrome (scripts, nav, inline styles) around the story."""
+    rng = random.Random(f"{slug}-{seed}")
+    words = "kochi rain minister budget port startup police court market metro ferry hospital".split()
+    para = lambda: " ".join(rng.choice(words) for _ in range(rng.randint(30, 90))).capitalize() + "."
+    chrome = "".join(
+        f'<div class="ad-slot-{i}"><script>window.__ads.push({{"slot": {i}, "cfg": "{"x" * 200}"}});</script></div>'
+        for i in range(chrome_kb * 1024 // 260)
+    )
+    story = "".join(f"<p>{para()} <a href='/x'>{rng.choice(words)}</a> {para()}</p>" for _ in range(paragraphs))
+    return (
+        f"<!doctype html><html><head><title>{slug}</title><style>body{{margin:0}}</style></head><body>"
+        f"<header><nav><p>Home | Kerala | India | World</p></nav></header>{chrome}"
+        f"<article><h1>{slug}</h1>{story}</article>"
+        f"<footer><p>Copyright Example Times</p></footer></body></html>"
+    ).encode('utf-8')
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    delay = 0.05
+
+    def do_GET(self):
+        slug = urllib.parse.urlparse(self.path).path.strip('/') or 'index'
+        etag = f'"{hashlib.md5(slug.encode()).hexdigest()}"'
+        time.sleep(self.delay)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = build_article(slug)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024 # load tests open hundreds of connections at once
+
+def start_server(handler_cls, **attrs):
+    """Starts a threaded server on a free local port. Returns (server, base_url)."""
+    handler = type(handler_cls.__name__, (handler_cls,), attrs)
+    server = StubServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
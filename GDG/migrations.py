@@ -0,0 +1,102 @@
+"""
+Schema migrations. The app no longer creates tables on boot, so cold starts
+never touch the schema; apply pending migrations once per deploy instead:
+
+    flask --app app db-upgrade
+    python migrations.py
+
+Each migration runs once and is recorded in schema_migrations. Append new
+ones to MIGRATIONS; never edit or reorder applied ones. AUTO_MIGRATE=1 runs
+upgrade() inside create_app(), for local development and the benchmarks.
+"""
+from sqlalchemy import bindparam, inspect, null, select, text
+
+from models import db, History, Briefing, Job, SeenStories, SchemaMigration
+
+BACKFILL_BATCH = 1000
+
+def _create_tables():
+    # Creates only what is missing, so databases from before migrations adopt them safely
+    db.create_all()
+
+def _history_indexes():
+    # create_all skips tables that already exist, so add new indexes to old databases too
+    for index in History.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+def _briefing_store():
+    # Moves every inline meta_data copy into the content-addressed briefings table
+    from services import briefing_store
+    Briefing.__table__.create(db.engine, checkfirst=True)
+    if 'briefing_digest' not in {c['name'] for c in inspect(db.engine).get_columns('history')}:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE history ADD COLUMN briefing_digest VARCHAR(64)"))
+
+    moved, last_id = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(History.id, History.meta_data)
+            .where(History.id > last_id, History.briefing_digest.is_(None), History.meta_data.isnot(None))
+            .order_by(History.id).limit(BACKFILL_BATCH)
+        ).all()
+        if not rows: break
+        stored = [row for row in rows if row.meta_data is not None] # JSON 'null' passes isnot(None)
+        digests, new = briefing_store.put_many([row.meta_data for row in stored])
+        if stored:
+            db.session.execute(History.__table__.update().where(History.id == bindparam('row_id')).values(
+                briefing_digest=bindparam('digest'), meta_data=null()),
+                [{'row_id': row.id, 'digest': digest} for row, digest in zip(stored, digests)])
+        db.session.commit()
+        briefing_store.remember(new)
+        moved += len(stored)
+        last_id = rows[-1].id
+    print(f"🗄️ Moved {moved} history briefings to the briefing store")
+
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite keeps freed pages in the file until it is rebuilt
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("VACUUM"))
+
+def _seen_stories():
+    SeenStories.__table__.create(db.engine, checkfirst=True)
+
+def _job_uploads():
+    # Uploads live on the job row rather than in a host-local spool directory
+    if 'upload' not in {c['name'] for c in inspect(db.engine).get_columns('jobs')}:
+        column = Job.__table__.c.upload.type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE jobs ADD COLUMN upload {column}"))
+
+MIGRATIONS = [
+    ('0001_create_tables', _create_tables),
+    ('0002_history_indexes', _history_indexes),
+    ('0003_briefing_store', _briefing_store),
+    ('0004_seen_stories', _seen_stories),
+    ('0005_job_uploads', _job_uploads),
+]
+
+def applied():
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    return {row.version for row in db.session.query(SchemaMigration.version)}
+
+def pending():
+    done = applied()
+    return [version for version, _ in MIGRATIONS if version not in done]
+
+def upgrade():
+    """Applies pending migrations in order. Returns the versions applied. Needs an app context."""
+    done = applied()
+    ran = []
+    for version, migrate in MIGRATIONS:
+        if version in done: continue
+        migrate()
+        db.session.add(SchemaMigration(version=version))
+        db.session.commit()
+        print(f"🗄️ Applied migration {version}")
+        ran.append(version)
+    return ran
+
+if __name__ == '__main__':
+    from app import create_app
+    with create_app().app_context():
+        if not upgrade(): print("✅ Schema is up to date")
@@ -19,9 +19,60 @@ class User(db.Model):
 
 class History(db.Model):
     __tablename__ = 'history'
+    __table_args__ = (
+        # Serves both the per-day filter and the newest-first keyset pagination
+        db.Index('ix_history_user_date_created', 'user_id', 'summary_date', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     summary_date = db.Column(db.Date, default=datetime.utcnow, nullable=False)
     content = db.Column(db.Text, nullable=False)  # The AI generated summary
-    meta_data = db.Column(db.JSON) # Snapshot of preferences used for this generation
+    meta_data = db.Column(db.JSON) # Legacy inline copy of the briefing; new rows use briefing_digest
+    briefing_digest = db.Column(db.String(64)) # -> Briefing.digest
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Briefing(db.Model):
+    """Content-addressed briefing: stored once, however many History rows point at it. Immutable."""
+    __tablename__ = 'briefings'
+    digest = db.Column(db.String(64), primary_key=True) # sha256 of the canonical JSON
+    payload = db.Column(db.LargeBinary, nullable=False) # zlib-compressed canonical JSON
+    size = db.Column(db.Integer, nullable=False) # uncompressed bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PrebuiltBriefing(db.Model):
+    """Briefings generated ahead of reading time, shared by every user with the same topic set."""
+    __tablename__ = 'prebuilt_briefings'
+    id = db.Column(db.Integer, primary_key=True)
+    briefing_key = db.Column(db.String(500), unique=True, index=True, nullable=False) # sorted topics + language
+    language = db.Column(db.String(20), nullable=False)
+    news_data = db.Column(db.JSON, nullable=False)
+    built_at = db.Column(db.DateTime, nullable=False)
+
+class Job(db.Model):
+    """Background PDF/link processing job. Persisted so queued work survives a restart."""
+    __tablename__ = 'jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False) # 'pdf' | 'link'
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True) # queued | running | done | failed
+    progress = db.Column(db.Integer, default=0)
+    stage = db.Column(db.String(50))
+    payload = db.Column(db.JSON)
+    upload = db.Column(db.LargeBinary) # Raw uploaded file, so any runner host can read it; cleared once the job ends
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SeenStories(db.Model):
+    """RSS stories already delivered to a user in a delta briefing (see services/seen_stories.py)."""
+    __tablename__ = 'seen_stories'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    stories = db.Column(db.LargeBinary, nullable=False) # packed (8-byte story hash, 4-byte unix time) records
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SchemaMigration(db.Model):
+    """One row per migration applied by migrations.upgrade()."""
+    __tablename__ = 'schema_migrations'
+    version = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,6 +1,7 @@
 from app import create_app
 
-app = create_app()
+# Local development: apply pending migrations on start
+app = create_app({'AUTO_MIGRATE': True, 'JOB_RUNNER': True})
 
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
@@ -0,0 +1,356 @@
+"""
+The one way this app talks to Gemini.
+
+Every call goes through a process-wide limiter (requests and tokens per
+minute), a concurrency cap and a circuit breaker, and is retried with
+exponential backoff plus full jitter on 429/503 so workers do not retry in
+lockstep. While the breaker is open calls fail fast with AIUnavailableError,
+which the live briefing turns into its backup data.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+
+from services import metrics
+
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL") # e.g. a local fake Gemini for load tests
+DEFAULT_MODEL = 'gemini-2.5-flash-lite'
+
+AI_MAX_ATTEMPTS = int(os.environ.get('AI_MAX_ATTEMPTS', 3))
+AI_BACKOFF_BASE = float(os.environ.get('AI_BACKOFF_BASE', 1.0))
+AI_BACKOFF_MAX = float(os.environ.get('AI_BACKOFF_MAX', 16.0))
+AI_REQUESTS_PER_MINUTE = int(os.environ.get('AI_REQUESTS_PER_MINUTE', 60))
+AI_TOKENS_PER_MINUTE = int(os.environ.get('AI_TOKENS_PER_MINUTE', 250000))
+AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 8))
+AI_LIMIT_WAIT = float(os.environ.get('AI_LIMIT_WAIT', 30))
+BREAKER_THRESHOLD = int(os.environ.get('AI_BREAKER_THRESHOLD', 5))
+BREAKER_COOLDOWN = float(os.environ.get('AI_BREAKER_COOLDOWN', 30))
+BREAKER_TRIAL_TIMEOUT = float(os.environ.get('AI_BREAKER_TRIAL_TIMEOUT', 120))
+
+RETRYABLE_CODES = (429, 500, 503, 504)
+
+class AIUnavailableError(Exception):
+    """Gemini is not reachable right now (breaker open or limiter saturated)."""
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self, amount):
+        """Takes `amount` if it is available. Returns 0, or the seconds until it will be."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0
+            return (amount - self.tokens) / self.rate
+
+    def acquire(self, amount=1, timeout=AI_LIMIT_WAIT):
+        amount = min(float(amount), self.capacity)
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take(amount)
+            if not wait: return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, amount=1, timeout=AI_LIMIT_WAIT):
+        """acquire() for the event loop: waits with asyncio.sleep instead of blocking the thread."""
+        amount = min(float(amount), self.capacity)
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take(amount)
+            if not wait: return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; lets one trial call through
+    after `cooldown`. A trial that is never judged (record_*) nor released
+    stops blocking others after `trial_timeout`.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN, trial_timeout=BREAKER_TRIAL_TIMEOUT):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.trial_timeout = trial_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.trial_started = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """False to fail fast, True when closed, 'trial' when this call is the half-open trial."""
+        with self.lock:
+            if self.opened_at is None: return True
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown: return False
+            if self.trial_running and now - self.trial_started < self.trial_timeout: return False
+            self.trial_running = True
+            self.trial_started = now
+            return 'trial'
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release(self):
+        """Ends a trial call without judging the service either way."""
+        with self.lock:
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None: return 'closed'
+            return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+_client = None
+_client_lock = threading.Lock()
+_request_bucket = TokenBucket(AI_REQUESTS_PER_MINUTE)
+_token_bucket = TokenBucket(AI_TOKENS_PER_MINUTE)
+_concurrency = threading.BoundedSemaphore(AI_MAX_CONCURRENCY)
+_async_concurrency = None # asyncio.Semaphore, created on the serving loop (see asgi.py)
+breaker = CircuitBreaker()
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0, 'rejected': 0,
+    'latency_total': 0.0, 'latency_max': 0.0, 'tokens': 0,
+}
+
+def get_client():
+    """Creates the Gemini client on first use and reuses it."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # google.genai is slow to import, so cold starts that never call Gemini skip it
+                from google import genai
+                from google.genai import types
+                http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+                _client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+    return _client
+
+def configure(api_key=None, base_url=None):
+    """Points the client at another endpoint (e.g. the offline benchmark stack); takes effect on next use."""
+    global GEMINI_API_KEY, GEMINI_BASE_URL, _client
+    with _client_lock:
+        if api_key: GEMINI_API_KEY = api_key
+        if base_url: GEMINI_BASE_URL = base_url
+        _client = None
+
+def set_client(client):
+    """Swaps in another client (e.g. a fake Gemini) for tests and benchmarks."""
+    global _client
+    _client = client
+
+def _count(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+    metrics.inc(f"mindfeed_gemini_{name}_total", amount)
+
+def status_code(error):
+    """HTTP status of a Gemini error, falling back to the message for older client errors."""
+    for attr in ('code', 'status_code'):
+        code = getattr(error, attr, None)
+        if isinstance(code, int): return code
+    text = str(error)
+    if '429' in text or 'RESOURCE_EXHAUSTED' in text: return 429
+    if '503' in text or 'overloaded' in text.lower() or 'UNAVAILABLE' in text: return 503
+    return None
+
+def is_retryable(error, code):
+    if code in RETRYABLE_CODES: return True
+    if code is not None: return False
+    # An httpx error means httpx is loaded already; no need to import it just to check
+    httpx = sys.modules.get('httpx')
+    return isinstance(error, (ConnectionError, TimeoutError)) or bool(httpx and isinstance(error, httpx.TransportError))
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def backoff_delay(attempt):
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * (2 ** attempt)))
+
+def _check_breaker():
+    """True when this call is the breaker's half-open trial; the caller must release() it when done."""
+    allowed = breaker.allow()
+    if not allowed:
+        _count('rejected')
+        raise AIUnavailableError("Gemini circuit is open")
+    return allowed == 'trial'
+
+def _over_budget(trial):
+    _count('rejected')
+    if trial: breaker.release()
+    raise AIUnavailableError("Gemini rate limit budget exhausted")
+
+def _admit(prompt):
+    """Breaker and budget checks shared by every call. Raises AIUnavailableError to fail fast; returns `trial`."""
+    trial = _check_breaker()
+    if not _request_bucket.acquire(1) or not _token_bucket.acquire(estimate_tokens(prompt)):
+        _over_budget(trial)
+    _count('calls')
+    return trial
+
+async def _admit_async(prompt):
+    trial = _check_breaker()
+    try:
+        admitted = await _request_bucket.acquire_async(1) and await _token_bucket.acquire_async(estimate_tokens(prompt))
+    except BaseException:
+        if trial: breaker.release()
+        raise
+    if not admitted:
+        _over_budget(trial)
+    _count('calls')
+    return trial
+
+def _retry_delay(error, attempt):
+    """Records a failed attempt. Returns the backoff before the next one, or None to give up."""
+    code = status_code(error)
+    if not is_retryable(error, code):
+        # Gemini answered (e.g. a 400), so it is up; anything else says nothing about its health
+        breaker.record_success() if code is not None else breaker.release()
+        _count('failures')
+        return None
+    breaker.record_failure()
+    if attempt == AI_MAX_ATTEMPTS - 1 or breaker.state != 'closed':
+        _count('failures')
+        return None
+    delay = backoff_delay(attempt)
+    _count('retries')
+    print(f"⚠️ Gemini {code}. Retrying in {delay:.1f}s... (Attempt {attempt+1})")
+    return delay
+
+def _record_latency(started):
+    elapsed = time.monotonic() - started
+    with _metrics_lock:
+        _metrics['latency_total'] += elapsed
+        _metrics['latency_max'] = max(_metrics['latency_max'], elapsed)
+
+def generate(prompt, model=DEFAULT_MODEL, config=None):
+    """Rate-limited, retried generate_content. Raises AIUnavailableError when failing fast."""
+    trial = _admit(prompt)
+    started = time.monotonic()
+    with metrics.span('gemini_call', model=model) as span:
+        try:
+            for attempt in range(AI_MAX_ATTEMPTS):
+                span['attempts'] = attempt + 1
+                try:
+                    with _concurrency:
+                        response = get_client().models.generate_content(model=model, contents=prompt, config=config)
+                    breaker.record_success()
+                    span['tokens'] = _record_usage(response)
+                    _count('successes')
+                    return response
+                except Exception as e:
+                    delay = _retry_delay(e, attempt)
+                    if delay is None: raise
+                    time.sleep(delay)
+        finally:
+            _record_latency(started)
+            if trial: breaker.release()
+
+async def generate_async(prompt, model=DEFAULT_MODEL, config=None):
+    """
+    generate() on the client's asyncio API, for the ASGI serving mode.
+    Same budgets, breaker and retries; waiting never blocks the event loop.
+    """
+    global _async_concurrency
+    if _async_concurrency is None:
+        _async_concurrency = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    trial = await _admit_async(prompt)
+    started = time.monotonic()
+    with metrics.span('gemini_call', model=model) as span:
+        try:
+            for attempt in range(AI_MAX_ATTEMPTS):
+                span['attempts'] = attempt + 1
+                try:
+                    async with _async_concurrency:
+                        response = await get_client().aio.models.generate_content(model=model, contents=prompt, config=config)
+                    breaker.record_success()
+                    span['tokens'] = _record_usage(response)
+                    _count('successes')
+                    return response
+                except Exception as e:
+                    delay = _retry_delay(e, attempt)
+                    if delay is None: raise
+                    await asyncio.sleep(delay)
+        finally:
+            _record_latency(started)
+            if trial: breaker.release()
+
+def generate_stream(prompt, model=DEFAULT_MODEL, config=None):
+    """
+    Like generate(), but yields text chunks as Gemini produces them.
+    Only failures before the first chunk are retried; after that the caller
+    has already used part of the output.
+    """
+    trial = _admit(prompt)
+    started = time.monotonic()
+    with metrics.span('gemini_call', model=model) as span:
+        try:
+            for attempt in range(AI_MAX_ATTEMPTS):
+                span['attempts'] = attempt + 1
+                received = False
+                try:
+                    with _concurrency:
+                        last = None
+                        for chunk in get_client().models.generate_content_stream(model=model, contents=prompt, config=config):
+                            last = chunk
+                            if chunk.text:
+                                received = True
+                                yield chunk.text
+                    breaker.record_success()
+                    span['tokens'] = _record_usage(last)
+                    _count('successes')
+                    return
+                except Exception as e:
+                    if received:
+                        _count('failures')
+                        raise
+                    delay = _retry_delay(e, attempt)
+                    if delay is None: raise
+                    time.sleep(delay)
+        finally:
+            _record_latency(started)
+            # A trial cut short (listener gone: GeneratorExit / CancelledError) must not hold the breaker open
+            if trial: breaker.release()
+
+def _record_usage(response):
+    usage = getattr(response, 'usage_metadata', None)
+    tokens = getattr(usage, 'total_token_count', None) if usage else None
+    if tokens: _count('tokens', tokens)
+    return tokens
+
+def stats():
+    with _metrics_lock:
+        data = dict(_metrics)
+    data['latency_avg'] = data['latency_total'] / data['calls'] if data['calls'] else 0.0
+    data['circuit'] = breaker.state
+    return data
@@ -0,0 +1,237 @@
+"""
+Turns Gemini output into briefings without throwing paid calls away.
+
+Calls ask for JSON in a response schema, so well-formed output is the norm.
+What still goes wrong (a markdown fence, chatter around the object, a
+trailing comma, output cut off mid-string) is repaired locally, keeping every
+complete item. When details are missing for some headlines, only those are
+asked for again. Every response is counted as parsed, repaired, reasked or
+failed in mindfeed_ai_responses_total.
+"""
+import json
+import threading
+
+from services import ai_client, metrics
+
+def _strings():
+    return {'type': 'ARRAY', 'items': {'type': 'STRING'}}
+
+BRIEFING_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'headlines': _strings(), 'details': _strings()},
+    'required': ['headlines', 'details'],
+    # Headlines first, so the live briefing can stream them before the details
+    'propertyOrdering': ['headlines', 'details'],
+}
+DETAILS_SCHEMA = {'type': 'OBJECT', 'properties': {'details': _strings()}, 'required': ['details']}
+ARTICLES_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'articles': {'type': 'ARRAY', 'items': {
+        'type': 'OBJECT',
+        'properties': {'id': {'type': 'INTEGER'}, 'headlines': _strings(), 'details': _strings()},
+        'required': ['id', 'headlines', 'details'],
+        'propertyOrdering': ['id', 'headlines', 'details'],
+    }}},
+    'required': ['articles'],
+}
+
+def json_config(schema):
+    """generate_content config asking for JSON in `schema` (plain dicts, so google.genai stays unimported)."""
+    return {'response_mime_type': 'application/json', 'response_schema': schema}
+
+BRIEFING_CONFIG = json_config(BRIEFING_SCHEMA)
+DETAILS_CONFIG = json_config(DETAILS_SCHEMA)
+ARTICLES_CONFIG = json_config(ARTICLES_SCHEMA)
+
+_lock = threading.Lock()
+_stats = {'parsed': 0, 'repaired': 0, 'reasked': 0, 'failed': 0}
+
+class ResponseError(ValueError):
+    """Gemini answered, but nothing usable could be recovered from it."""
+
+def _count(outcome):
+    with _lock:
+        _stats[outcome] += 1
+    metrics.inc('mindfeed_ai_responses_total', outcome=outcome)
+
+def stats():
+    with _lock:
+        return dict(_stats)
+
+# --- REPAIR ---
+_CLOSERS = {'{': '}', '[': ']'}
+
+def repair(text):
+    """
+    Best-effort JSON object from `text`: skips anything before the first '{'
+    and after the object, drops trailing commas, and closes output that was
+    cut off after its last complete item. Returns the parsed value or None.
+    """
+    start = text.find('{')
+    if start < 0: return None
+
+    out = []
+    stack = []
+    colon = [] # per open object: whether its current key's ':' was seen
+    safe = None # (len(out), stack copy) after the last complete item
+    in_string = escape = False
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape: escape = False
+            elif ch == '\\': escape = True
+            elif ch == '"':
+                in_string = False
+                # A finished string is a complete item unless it is an object key
+                if stack[-1] == '[' or colon[-1]: safe = (len(out), list(stack))
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append(ch)
+            if ch == '{': colon.append(False)
+        elif ch in '}]':
+            if not stack or _CLOSERS[stack[-1]] != ch: break
+            while out and out[-1] in ' \t\r\n': out.pop()
+            if out and out[-1] == ',': out.pop()
+            stack.pop()
+            if ch == '}': colon.pop()
+            out.append(ch)
+            if not stack: break
+            safe = (len(out), list(stack))
+            continue
+        elif ch == ':' and stack[-1] == '{':
+            colon[-1] = True
+        elif ch == ',':
+            # Everything before a comma at this level is complete (numbers and literals included)
+            safe = (len(out), list(stack))
+            if stack[-1] == '{': colon[-1] = False
+        out.append(ch)
+
+    if stack:
+        if safe is None: return None
+        cut, open_ = safe
+        out = out[:cut]
+        while out and out[-1] in ' \t\r\n,': out.pop()
+        out.extend(_CLOSERS[c] for c in reversed(open_))
+    try:
+        return json.loads("".join(out))
+    except ValueError:
+        return None
+
+def loads(text):
+    """json.loads, falling back to repair(). Returns (value, repaired); raises ResponseError."""
+    text = (text or "").strip()
+    try:
+        return json.loads(text), False
+    except ValueError:
+        pass
+    # Fences and chatter around an intact object: still a C-speed parse
+    start, end = text.find('{'), text.rfind('}')
+    try:
+        if 0 <= start < end: return json.loads(text[start:end + 1]), True
+    except ValueError:
+        pass
+    value = repair(text)
+    if value is None:
+        raise ResponseError("unparseable Gemini response")
+    return value, True
+
+# --- BRIEFINGS ---
+def _string_list(value):
+    return [item for item in value if isinstance(item, str) and item.strip()] if isinstance(value, list) else []
+
+@metrics.timed('json_parse')
+def parse_briefing(text):
+    """
+    {'headlines', 'details'} from Gemini output. Raises ResponseError when no
+    headline survives. Details may come back short; see missing_details().
+    """
+    try:
+        value, repaired = loads(text)
+        if not isinstance(value, dict):
+            raise ResponseError("Gemini response is not an object")
+    except ResponseError:
+        _count('failed')
+        raise
+    data = dict(value, headlines=_string_list(value.get('headlines')), details=_string_list(value.get('details')))
+    if not data['headlines']:
+        _count('failed')
+        raise ResponseError("no headlines in Gemini response")
+    data['repaired'] = repaired
+    return data
+
+def missing_details(data):
+    """Index of the first headline without details, or None when every headline has them."""
+    return len(data['details']) if len(data['details']) < len(data['headlines']) else None
+
+def reask_prompt(prompt, data, start):
+    """The original task, plus a request for only the details of headlines[start:]."""
+    wanted = "\n".join(f"{i + 1}. {h}" for i, h in enumerate(data['headlines'][start:]))
+    return f"""{prompt}
+
+    Your previous answer was cut off. These headlines still need their details:
+    {wanted}
+
+    Output ONLY the details for these headlines, in the same order and language, as JSON:
+    {{"details": ["Detail 1", "Detail 2"]}}
+    """
+
+def finish(data, extra_details=None):
+    """Appends re-asked details, drops headlines still without one, and counts the outcome."""
+    repaired = data.pop('repaired', False)
+    if extra_details:
+        data['details'] = data['details'] + extra_details
+    count = min(len(data['headlines']), len(data['details']))
+    trimmed = count < max(len(data['headlines']), len(data['details']))
+    data['headlines'], data['details'] = data['headlines'][:count], data['details'][:count]
+    if not count:
+        _count('failed')
+        raise ResponseError("no complete headline in Gemini response")
+    _count('reasked' if extra_details else 'repaired' if repaired or trimmed else 'parsed')
+    return data
+
+def _reasked(response):
+    try:
+        return _string_list(loads(response.text)[0].get('details'))
+    except Exception:
+        return []
+
+def generate_briefing(prompt, model=ai_client.DEFAULT_MODEL):
+    """ai_client.generate() for the headlines/details shape. Raises like generate(), or ResponseError."""
+    response = ai_client.generate(prompt, model=model, config=BRIEFING_CONFIG)
+    data = parse_briefing(response.text)
+    start = missing_details(data)
+    extra = None
+    if start is not None:
+        try:
+            extra = _reasked(ai_client.generate(reask_prompt(prompt, data, start), model=model, config=DETAILS_CONFIG))
+        except Exception as e:
+            print(f"⚠️ Details re-ask failed: {e}")
+    return finish(data, extra)
+
+async def generate_briefing_async(prompt, model=ai_client.DEFAULT_MODEL):
+    """generate_briefing() for the event loop."""
+    response = await ai_client.generate_async(prompt, model=model, config=BRIEFING_CONFIG)
+    data = parse_briefing(response.text)
+    start = missing_details(data)
+    extra = None
+    if start is not None:
+        try:
+            extra = _reasked(await ai_client.generate_async(reask_prompt(prompt, data, start), model=model, config=DETAILS_CONFIG))
+        except Exception as e:
+            print(f"⚠️ Details re-ask failed: {e}")
+    return finish(data, extra)
+
+@metrics.timed('json_parse')
+def parse_articles(text):
+    """The batch link shape: [{'id', 'headlines', 'details'}]. Items that did not survive are simply absent."""
+    try:
+        value, repaired = loads(text)
+    except ResponseError:
+        _count('failed')
+        raise
+    articles = value.get('articles') if isinstance(value, dict) else None
+    articles = [item for item in articles or [] if isinstance(item, dict)]
+    _count(('repaired' if repaired else 'parsed') if articles else 'failed')
+    return articles
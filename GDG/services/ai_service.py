@@ -1,22 +1,12 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
+from services import ai_client
 
 def summarize_text(text, preferences):
     """
     Summarizes text using Google Gemini based on user preferences.
     """
-    if not GOOGLE_API_KEY:
-        return "Error: Google API Key not found."
+    if not ai_client.GEMINI_API_KEY and not ai_client.GEMINI_BASE_URL:
+        return "Error: Gemini API Key not found."
 
-    model = genai.GenerativeModel('gemini-pro')
-    
     prompt = f"""
     You are an AI news assistant. Please summarize the following text based on these preferences:
     - Topics of Interest: {preferences.get('topics', 'General')}
@@ -34,7 +24,7 @@ def summarize_text(text, preferences):
     """
 
     try:
-        response = model.generate_content(prompt)
+        response = ai_client.generate(prompt)
         return response.text
     except Exception as e:
         return f"Error interacting with Gemini API: {e}"
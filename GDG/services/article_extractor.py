@@ -0,0 +1,277 @@
+"""
+Article text for /api/process-link.
+
+Pages are streamed through a pooled session and a stdlib HTMLParser that
+keeps only <p> text outside script/style/nav/footer/header, so no document
+tree is ever built and the download stops at ARTICLE_MAX_BYTES. Results
+are cached by canonical URL with a TTL and revalidated with ETag /
+Last-Modified once stale.
+"""
+import os
+import re
+import json
+import time
+import codecs
+import asyncio
+import threading
+import urllib.parse
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from services.http import get_session, get_async_client
+from services.local_store import LocalStore
+from services import metrics
+
+ARTICLE_MAX_BYTES = int(os.environ.get('ARTICLE_MAX_BYTES', 2 * 1024 * 1024))
+ARTICLE_CACHE_TTL = int(os.environ.get('ARTICLE_CACHE_TTL', 3600))
+ARTICLE_CACHE_MAX_BYTES = int(os.environ.get('ARTICLE_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+FETCH_TIMEOUT = 10
+# One bounded pool for every batch, so its threads keep their pooled sessions (services.http is per thread)
+SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', 32))
+CHUNK_SIZE = 16 * 1024
+# Bumped when cached text from older versions must not be served (2: charset sniffing)
+ARTICLE_CACHE_VERSION = 2
+
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+SKIP_TAGS = frozenset(['script', 'style', 'nav', 'footer', 'header'])
+CLOSES_PARAGRAPH = frozenset(['p', 'div', 'section', 'article', 'li', 'td', 'table', 'ul', 'ol', 'body', 'blockquote'])
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+_store = LocalStore('article_cache', ARTICLE_CACHE_MAX_BYTES)
+_executor = None
+_lock = threading.Lock()
+
+def canonical_url(url):
+    """Lowercased scheme/host, no fragment, default port or tracking parameters; query sorted."""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'http'
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = [
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    return urllib.parse.urlunsplit((scheme, host, parts.path or '/', urllib.parse.urlencode(sorted(query)), ''))
+
+class ParagraphExtractor(HTMLParser):
+    """Collects the text of <p> elements that are not inside SKIP_TAGS."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.in_paragraph = False
+        self.current = []
+        self.paragraphs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == 'p':
+            self._close_paragraph()
+            self.in_paragraph = not self.skip_depth
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self.skip_depth: self.skip_depth -= 1
+        elif tag in CLOSES_PARAGRAPH:
+            self._close_paragraph()
+
+    def handle_data(self, data):
+        if self.in_paragraph and not self.skip_depth:
+            self.current.append(data)
+
+    def _close_paragraph(self):
+        if self.current:
+            self.paragraphs.append("".join(self.current))
+        self.current = []
+        self.in_paragraph = False
+
+    def text(self):
+        self._close_paragraph()
+        return " ".join(" ".join(self.paragraphs).split())
+
+def parse_paragraphs(html_chunks):
+    """Runs the extractor over an iterable of str chunks."""
+    parser = ParagraphExtractor()
+    for chunk in html_chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.text()
+
+def _codec(name):
+    try:
+        return codecs.lookup(name.strip(' "\'')).name
+    except LookupError:
+        return None
+
+def page_encoding(content_type, head):
+    """
+    The charset of the Content-Type header, else a BOM or <meta charset> in
+    `head` (the first chunk of the body), else UTF-8. Not response.encoding:
+    requests reports ISO-8859-1 for any text/html without a charset, which
+    garbles UTF-8 pages that declare it only in <meta>.
+    """
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and _codec(value):
+            return _codec(value)
+    for bom, encoding in BOMS:
+        if head.startswith(bom): return encoding
+    match = META_CHARSET.search(head)
+    if match and _codec(match.group(1).decode('ascii')):
+        return _codec(match.group(1).decode('ascii'))
+    return 'utf-8'
+
+def _decoder(response, head):
+    encoding = page_encoding(response.headers.get('Content-Type'), head)
+    return codecs.getincrementaldecoder(encoding)(errors='replace')
+
+def _stream_text(response, stop_at=None):
+    """Decodes the body incrementally and stops reading at ARTICLE_MAX_BYTES or the `stop_at` monotonic time."""
+    decoder = None
+    received = 0
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if decoder is None: decoder = _decoder(response, chunk)
+        received += len(chunk)
+        yield decoder.decode(chunk)
+        if received >= ARTICLE_MAX_BYTES: break
+        if stop_at is not None and time.monotonic() >= stop_at: break
+    if decoder is not None: yield decoder.decode(b"", final=True)
+
+def _cache_key(url):
+    return f"{ARTICLE_CACHE_VERSION}|{canonical_url(url)}"
+
+def _cached(key):
+    """Returns (cached row or None, validator headers for a conditional GET)."""
+    try:
+        cached = _store.get(key)
+    except Exception as e:
+        print(f"⚠️ Article cache read error: {e}")
+        cached = None
+
+    meta = json.loads(cached['meta'] or '{}') if cached else {}
+    headers = {}
+    if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+    return cached, headers
+
+def _fresh(cached):
+    return cached and time.time() - cached['stored_at'] < ARTICLE_CACHE_TTL
+
+def _revalidated(key, cached):
+    _store.touch(key)
+    _store.incr('revalidations')
+    return cached['value'].decode('utf-8')
+
+def _remember(key, text, response_headers):
+    _store.incr('misses')
+    if not text: return
+    validators = {'etag': response_headers.get('ETag'), 'last_modified': response_headers.get('Last-Modified')}
+    try:
+        _store.put(key, text.encode('utf-8'), json.dumps(validators))
+    except Exception as e:
+        print(f"⚠️ Article cache write error: {e}")
+
+def extract_text_from_url(url, deadline=None):
+    """
+    Scrapes the main text content from a news URL. Returns "" on failure.
+    With `deadline` (seconds), reading stops once it has passed.
+    """
+    stop_at = time.monotonic() + deadline if deadline else None
+    timeout = min(FETCH_TIMEOUT, deadline) if deadline else FETCH_TIMEOUT
+    key = _cache_key(url)
+    with metrics.span('scrape', url=canonical_url(url)) as span:
+        cached, headers = _cached(key)
+        if _fresh(cached):
+            _store.incr('hits')
+            span['cache'] = 'hit'
+            return cached['value'].decode('utf-8')
+
+        try:
+            with get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    span['cache'] = 'revalidated'
+                    return _revalidated(key, cached)
+                span['status'] = response.status_code
+                if response.status_code != 200:
+                    return ""
+                text = parse_paragraphs(_stream_text(response, stop_at))
+                response_headers = response.headers
+        except Exception as e:
+            print(f"Scraping Error: {e}")
+            return ""
+
+        span['chars'] = len(text)
+        _remember(key, text, response_headers)
+        return text
+
+async def extract_text_from_url_async(url):
+    """extract_text_from_url() on the shared async client, for the ASGI serving mode."""
+    key = _cache_key(url)
+    with metrics.span('scrape', url=canonical_url(url)) as span:
+        # The article cache is SQLite shared with other workers: off the event loop
+        cached, headers = await asyncio.to_thread(_cached, key)
+        if _fresh(cached):
+            await asyncio.to_thread(_store.incr, 'hits')
+            span['cache'] = 'hit'
+            return cached['value'].decode('utf-8')
+
+        try:
+            async with get_async_client().stream('GET', url, headers=headers, timeout=FETCH_TIMEOUT) as response:
+                if response.status_code == 304 and cached:
+                    span['cache'] = 'revalidated'
+                    return await asyncio.to_thread(_revalidated, key, cached)
+                span['status'] = response.status_code
+                if response.status_code != 200:
+                    return ""
+                decoder = None
+                parser = ParagraphExtractor()
+                received = 0
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    if decoder is None: decoder = _decoder(response, chunk)
+                    received += len(chunk)
+                    parser.feed(decoder.decode(chunk))
+                    if received >= ARTICLE_MAX_BYTES: break
+                if decoder is not None: parser.feed(decoder.decode(b"", final=True))
+                parser.close()
+                text = parser.text()
+                response_headers = response.headers
+        except Exception as e:
+            print(f"Scraping Error: {e}")
+            return ""
+
+        span['chars'] = len(text)
+        await asyncio.to_thread(_remember, key, text, response_headers)
+        return text
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS, thread_name_prefix='scrape')
+    return _executor
+
+def extract_many(urls, deadline=FETCH_TIMEOUT):
+    """
+    Scrapes several URLs concurrently on the shared scrape pool, whose
+    threads reuse their keep-alive sessions. The batch gets `deadline`
+    seconds in all: a URL that waited for a free thread gets what is left,
+    and slower ones come back as None and stop reading at the deadline.
+    Returns texts in input order.
+    """
+    if not urls: return []
+    end = time.monotonic() + deadline
+
+    def scrape(url):
+        remaining = end - time.monotonic()
+        return extract_text_from_url(url, remaining) if remaining > 0 else None
+
+    futures = [_get_executor().submit(metrics.in_context(scrape), url) for url in urls]
+    done, _ = wait(futures, timeout=deadline)
+    return [future.result() if future in done else None for future in futures]
+
+def stats():
+    return _store.stats()
@@ -0,0 +1,149 @@
+"""
+Fingerprinted, precompressed static assets.
+
+Templates link /assets/<name with content hash>, e.g. css/style.3f2a9c1b0d4e.css.
+The URL changes whenever the file does, so responses can be cached for a
+year as immutable. Text assets are precompressed by the build step:
+
+    flask --app app assets-build
+    python -m services.assets
+
+which writes <file>.gz, and <file>.br when the brotli package is installed,
+next to each text asset, plus static/assets-manifest.json recording which
+content each variant was made from. A variant whose source changed since
+the build is ignored. Without a build (or for a changed file) the gzip
+variant is made once in memory on first request, so a deploy that skipped
+the step still never compresses per request.
+"""
+import os
+import re
+import gzip
+import json
+import hashlib
+import threading
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+MANIFEST_NAME = 'assets-manifest.json'
+HASH_LENGTH = 12
+ASSET_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz')) # preferred first
+
+_HASHED = re.compile(r'^(.+)\.([0-9a-f]{%d})(\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+
+_lock = threading.Lock()
+_hashes = {} # name -> (mtime_ns, size, hash)
+_compressed = {} # (name, hash) -> gzip bytes, for assets without a fresh build
+_manifest = {'mtime_ns': None, 'assets': {}}
+
+def _path(name):
+    """static/<name>, or None when it is not a regular file inside static/."""
+    path = os.path.normpath(os.path.join(STATIC_DIR, name))
+    if not path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(path): return None
+    return path
+
+def fingerprint(name):
+    """Content hash of static/<name>, or None when there is no such file. Re-hashed only when the file changes."""
+    path = _path(name)
+    if path is None: return None
+    st = os.stat(path)
+    with _lock:
+        cached = _hashes.get(name)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+    with _lock:
+        _hashes[name] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def hashed_name(name, digest):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{digest}{ext}"
+
+def split_hashed(filename):
+    """'css/style.<hash>.css' -> ('css/style.css', hash), or (filename, None) when it carries no hash."""
+    match = _HASHED.match(filename)
+    if not match: return filename, None
+    return match.group(1) + match.group(3), match.group(2)
+
+def compressible(name):
+    return name.endswith(COMPRESSIBLE)
+
+def _built():
+    """The build manifest, reloaded when the file changes."""
+    path = os.path.join(STATIC_DIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    with _lock:
+        if _manifest['mtime_ns'] == mtime: return _manifest['assets']
+    try:
+        with open(path) as f:
+            assets = json.load(f)
+    except ValueError:
+        assets = {}
+    with _lock:
+        _manifest.update(mtime_ns=mtime, assets=assets)
+    return assets
+
+def variant(name, digest, accepted):
+    """
+    (encoding, path or bytes) of the best compressed copy of static/<name>
+    whose content hash is `digest`, for a client accepting the encodings in
+    `accepted`; (None, None) when it should be sent as is.
+    """
+    if not compressible(name): return None, None
+    entry = _built().get(name)
+    if entry and entry['hash'] == digest:
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and encoding in entry['encodings']:
+                return encoding, _path(name) + suffix
+    if 'gzip' not in accepted: return None, None
+    key = (name, digest)
+    with _lock:
+        data = _compressed.get(key)
+    if data is None:
+        with open(_path(name), 'rb') as f:
+            data = gzip.compress(f.read(), 9, mtime=0)
+        with _lock:
+            _compressed[key] = data
+    return 'gzip', data
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def build(static_dir=STATIC_DIR):
+    """Writes .gz/.br variants of every text asset and the manifest. Returns the manifest."""
+    brotli = _brotli()
+    if brotli is None: print("⚠️ brotli is not installed; building gzip variants only")
+    assets = {}
+    for root, _, files in os.walk(static_dir):
+        for file in sorted(files):
+            path = os.path.join(root, file)
+            name = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            if not compressible(name) or name == MANIFEST_NAME: continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            outputs = {'gzip': gzip.compress(data, 9, mtime=0)}
+            if brotli is not None: outputs['br'] = brotli.compress(data, quality=11)
+            encodings = []
+            for encoding, suffix in ENCODINGS:
+                # A variant no smaller than the file is not worth a Content-Encoding
+                if encoding not in outputs or len(outputs[encoding]) >= len(data): continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(outputs[encoding])
+                encodings.append(encoding)
+            assets[name] = {'hash': hashlib.sha256(data).hexdigest()[:HASH_LENGTH], 'size': len(data), 'encodings': encodings}
+            print(f"📦 {name}: {len(data)} B, " + ", ".join(f"{e} {len(outputs[e])} B" for e in encodings))
+    with open(os.path.join(static_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(assets, f, indent=1, sort_keys=True)
+    return assets
+
+if __name__ == '__main__':
+    build()
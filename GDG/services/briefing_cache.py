@@ -0,0 +1,98 @@
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+BRIEFING_CACHE_TTL = int(os.environ.get('BRIEFING_CACHE_TTL', 900))
+BRIEFING_BUCKET_SECONDS = int(os.environ.get('BRIEFING_BUCKET_SECONDS', 3600))
+BRIEFING_CACHE_SIZE = 256
+FOLLOWER_TIMEOUT = 120
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_inflight = {}
+_stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+def normalize_topics(topics):
+    return tuple(sorted({" ".join(str(t).lower().split()) for t in topics if t}))
+
+def make_key(topics, language):
+    """(sorted normalized topics, language, news-hour bucket)"""
+    bucket = int(time.time() // BRIEFING_BUCKET_SECONDS)
+    return (normalize_topics(topics), language.lower(), bucket)
+
+def get_or_generate(key, generate):
+    """
+    Returns the cached briefing for `key`, or runs `generate()` exactly once
+    per key no matter how many requests miss at the same time; the others
+    wait for the leader's result. `generate` returns (news_data, cacheable) so
+    fallback briefings are handed to the waiters but never stored.
+    """
+    role, value = claim(key)
+    if role == 'hit': return value
+    if role == 'follow': return wait(value)
+
+    try:
+        news_data, cacheable = generate()
+    except Exception as e:
+        fail(key, value, e)
+        raise
+    finish(key, value, news_data, cacheable)
+    return copy.deepcopy(news_data)
+
+def claim(key):
+    """
+    The single-flight step of get_or_generate, for callers that produce the
+    briefing themselves (the streamed briefing). Returns ('hit', news_data),
+    ('follow', future) to wait() on while another request generates `key`,
+    or ('lead', future): the caller must then finish() or fail() it.
+    """
+    with _lock:
+        entry = _entries.get(key)
+        if entry and time.time() - entry[1] < BRIEFING_CACHE_TTL:
+            _entries.move_to_end(key)
+            _stats['hits'] += 1
+            return 'hit', copy.deepcopy(entry[0])
+
+        future = _inflight.get(key)
+        if future is not None:
+            _stats['coalesced'] += 1
+            return 'follow', future
+        future = Future()
+        _inflight[key] = future
+        _stats['misses'] += 1
+        return 'lead', future
+
+def wait(future):
+    """The leader's briefing; raises what the leader failed with."""
+    return copy.deepcopy(future.result(timeout=FOLLOWER_TIMEOUT))
+
+def finish(key, future, news_data, cacheable):
+    with _lock:
+        if cacheable:
+            _entries[key] = (copy.deepcopy(news_data), time.time())
+            _entries.move_to_end(key)
+            while len(_entries) > BRIEFING_CACHE_SIZE:
+                _entries.popitem(last=False)
+        if _inflight.get(key) is future: del _inflight[key]
+    future.set_result(news_data)
+
+def fail(key, future, error):
+    with _lock:
+        if _inflight.get(key) is future: del _inflight[key]
+    future.set_exception(error)
+
+def peek(key):
+    """The fresh cached briefing for `key`, or None. Never starts a generation."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry and time.time() - entry[1] < BRIEFING_CACHE_TTL:
+            _stats['hits'] += 1
+            return copy.deepcopy(entry[0])
+    return None
+
+def stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), inflight=len(_inflight))
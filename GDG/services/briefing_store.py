@@ -0,0 +1,101 @@
+"""
+Content-addressed briefing store. A briefing is kept once in `briefings`,
+compressed and keyed by the sha256 of its canonical JSON; History rows hold
+only that digest. The same hourly briefing read by thousands of listeners
+is one row, and rows never change, so reads are cached without invalidation.
+"""
+import os
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from models import db, Briefing
+
+BRIEFING_STORE_CACHE = int(os.environ.get('BRIEFING_STORE_CACHE', 1024))
+
+_lock = threading.Lock()
+_cache = OrderedDict() # digest -> canonical JSON text; presence also means "already stored"
+_stats = {'hits': 0, 'misses': 0, 'written': 0, 'deduplicated': 0}
+
+def canonical(news_data):
+    return json.dumps(news_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+def digest_of(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _remember(digest, text):
+    with _lock:
+        _cache[digest] = text
+        _cache.move_to_end(digest)
+        while len(_cache) > BRIEFING_STORE_CACHE:
+            _cache.popitem(last=False)
+
+def _insert_ignoring_duplicates(rows):
+    """INSERT ... ON CONFLICT DO NOTHING where the database has it; another writer may store the same briefing."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        existing = set(db.session.scalars(select(Briefing.digest).where(Briefing.digest.in_([r['digest'] for r in rows]))))
+        rows = [r for r in rows if r['digest'] not in existing]
+        if rows: db.session.execute(Briefing.__table__.insert(), rows)
+        return
+    db.session.execute(insert(Briefing).on_conflict_do_nothing(index_elements=['digest']), rows)
+
+def put_many(briefings):
+    """
+    Stores each briefing dict unless already present, in the caller's
+    transaction. Returns (digests in order, {digest: text} newly written);
+    pass the latter to remember() once the transaction commits.
+    """
+    digests, new = [], {}
+    for news_data in briefings:
+        text = canonical(news_data)
+        digest = digest_of(text)
+        digests.append(digest)
+        with _lock:
+            known = digest in _cache or digest in new
+            _stats['deduplicated' if known else 'written'] += 1
+        if not known: new[digest] = text
+    if new:
+        _insert_ignoring_duplicates([
+            {'digest': digest, 'payload': zlib.compress(text.encode('utf-8')), 'size': len(text.encode('utf-8'))}
+            for digest, text in new.items()
+        ])
+    return digests, new
+
+def remember(new):
+    """The briefings from put_many() are committed: later writes of the same one skip the INSERT."""
+    for digest, text in new.items():
+        _remember(digest, text)
+
+def get_text(digest):
+    """The canonical JSON text stored under `digest`, or None. Cheaper than get() when it is sent on as JSON."""
+    with _lock:
+        text = _cache.get(digest)
+        if text is not None:
+            _cache.move_to_end(digest)
+            _stats['hits'] += 1
+            return text
+    payload = db.session.scalar(select(Briefing.payload).where(Briefing.digest == digest))
+    if payload is None: return None
+    text = zlib.decompress(payload).decode('utf-8')
+    with _lock:
+        _stats['misses'] += 1
+    _remember(digest, text)
+    return text
+
+def get(digest):
+    """The briefing dict stored under `digest`, or None."""
+    text = get_text(digest)
+    return None if text is None else json.loads(text)
+
+def stats():
+    with _lock:
+        return dict(_stats, cached=len(_cache))
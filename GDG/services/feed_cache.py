@@ -0,0 +1,79 @@
+import os
+import json
+import time
+
+from services.local_store import LocalStore
+
+FEED_CACHE_TTL = int(os.environ.get('FEED_CACHE_TTL', 600))
+FEED_CACHE_MAX_BYTES = int(os.environ.get('FEED_CACHE_MAX_BYTES', 20 * 1024 * 1024))
+
+_store = LocalStore('feed_cache', FEED_CACHE_MAX_BYTES)
+
+def _key(query_term):
+    return " ".join(query_term.lower().split())
+
+def simplify_entries(entries):
+    """Keeps only the fields we use from feedparser entries, as plain dicts."""
+    return [
+        {
+            'title': entry.get('title', ''),
+            'link': entry.get('link', ''),
+            'id': entry.get('id', entry.get('link', '')),
+            'published': entry.get('published', ''),
+        }
+        for entry in entries
+    ]
+
+def lookup(query_term):
+    """
+    Returns the cached feed for a topic as {'entries', 'etag', 'last_modified', 'fresh'},
+    or None. Counts a hit only when the entry is still inside the TTL.
+    """
+    try:
+        row = _store.get(_key(query_term))
+    except Exception as e:
+        print(f"⚠️ Feed cache read error: {e}")
+        return None
+
+    if row is None:
+        _store.incr('misses')
+        return None
+
+    meta = json.loads(row['meta'] or '{}')
+    fresh = (time.time() - row['stored_at']) < FEED_CACHE_TTL
+    _store.incr('hits' if fresh else 'misses')
+    return {
+        'entries': json.loads(row['value']),
+        'etag': meta.get('etag'),
+        'last_modified': meta.get('last_modified'),
+        'fresh': fresh,
+    }
+
+def validators(cached):
+    """Conditional GET headers for a stale cached feed."""
+    headers = {}
+    if not cached: return headers
+    if cached.get('etag'): headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'): headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+def store(query_term, entries, response_headers):
+    meta = {
+        'etag': response_headers.get('ETag'),
+        'last_modified': response_headers.get('Last-Modified'),
+    }
+    try:
+        _store.put(_key(query_term), json.dumps(entries).encode('utf-8'), json.dumps(meta))
+    except Exception as e:
+        print(f"⚠️ Feed cache write error: {e}")
+
+def revalidated(query_term):
+    """The origin answered 304: the cached entries are good for another TTL."""
+    try:
+        _store.touch(_key(query_term))
+        _store.incr('revalidations')
+    except Exception as e:
+        print(f"⚠️ Feed cache write error: {e}")
+
+def stats():
+    return _store.stats()
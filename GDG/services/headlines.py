@@ -0,0 +1,146 @@
+"""
+Packs RSS headlines into the live briefing prompt.
+
+Overlapping topics ("Kerala", "Kochi") return the same stories, often
+under slightly different titles. Headlines are clustered by word-shingle
+similarity, each story is sent once and tagged with every topic that
+returned it, and the prompt is filled round-robin across topics up to a
+token budget, so a long topic list loses its least relevant headlines
+instead of its last topics.
+"""
+import os
+import re
+import math
+from collections import Counter
+
+BRIEFING_TOKEN_BUDGET = int(os.environ.get('BRIEFING_TOKEN_BUDGET', 3000))
+HEADLINES_PER_TOPIC = int(os.environ.get('BRIEFING_HEADLINES_PER_TOPIC', 2))
+CANDIDATES_PER_TOPIC = 10 # deeper feed entries never reach the prompt
+DUPLICATE_SIMILARITY = float(os.environ.get('HEADLINE_DUPLICATE_SIMILARITY', 0.6)) # shingle Jaccard
+
+_WORD = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+def story_key(entry):
+    """What identifies an RSS entry across fetches: its id, else its link."""
+    return entry.get('id') or entry.get('link') or ""
+
+def clean_title(title):
+    """Google News titles end in " - Source"."""
+    return title.rsplit('-', 1)[0].strip()
+
+def shingles(title):
+    """Lowercased words and word pairs, without stopwords."""
+    words = [w for w in _WORD.findall(title.lower()) if w not in STOPWORDS]
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+def similarity(a, b):
+    if not a or not b: return 1.0 if a == b else 0.0
+    return len(a & b) / len(a | b)
+
+def cluster(titles, links=None, threshold=DUPLICATE_SIMILARITY):
+    """
+    Returns a cluster id per title; titles with shingle similarity >= threshold,
+    or the same link, share one.
+
+    Prefix filtering: with every shingle set sorted rarest first, two sets that
+    similar must share a shingle within their first len - ceil(threshold * len) + 1,
+    so only those prefixes are indexed. Exact, and candidates stay few because
+    rare shingles are shared by few titles.
+    """
+    parent = list(range(len(titles)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[root(i)] = root(j)
+
+    features = [shingles(t) for t in titles]
+    frequency = Counter(f for feats in features for f in feats)
+    index = {}
+    for i, feats in enumerate(features):
+        ordered = sorted(feats, key=lambda f: (frequency[f], f))
+        prefix = ordered[:len(ordered) - math.ceil(threshold * len(ordered) - 1e-9) + 1]
+        checked = set()
+        for f in prefix:
+            for j in index.get(f, ()):
+                if j in checked: continue
+                checked.add(j)
+                if root(i) != root(j) and similarity(feats, features[j]) >= threshold:
+                    union(i, j)
+            index.setdefault(f, []).append(i)
+
+    if links:
+        first = {}
+        for i, link in enumerate(links):
+            # The same article under two topics is a duplicate however its title reads
+            if link: union(i, first.setdefault(link, i))
+    return [root(i) for i in range(len(titles))]
+
+def story_line(story):
+    return f"Topic: {', '.join(story['topics'])} | Headline: {story['title']}\n"
+
+def pack(feeds, token_budget=BRIEFING_TOKEN_BUDGET, per_topic=HEADLINES_PER_TOPIC):
+    """[(topic, entries)] -> the "Topic | Headline" lines given to Gemini; see select_stories()."""
+    return "".join(story_line(story) for story in select_stories(feeds, token_budget=token_budget, per_topic=per_topic))
+
+def window_keys(feeds):
+    """story_key() of every entry that can reach a briefing: the top CANDIDATES_PER_TOPIC of each feed."""
+    return [story_key(entry) for _, entries in feeds for entry in entries[:CANDIDATES_PER_TOPIC] if story_key(entry)]
+
+def select_stories(feeds, seen=(), token_budget=BRIEFING_TOKEN_BUDGET, per_topic=HEADLINES_PER_TOPIC):
+    """
+    [(topic, entries)] -> the stories for a briefing, in prompt order, as
+    {'title', 'topics', 'keys'} with the story_key() of each of its entries.
+
+    Each round gives every topic its next best story until it has
+    `per_topic`; a story already sent for another topic counts for each
+    topic that ranks it within its own top `per_topic`. Stories whose line
+    no longer fits the budget are skipped, never cut. A story with any
+    entry in `seen` (story keys) is left out, variants included.
+    """
+    rows = [] # (topic, title, link, key) in feed order
+    for topic, entries in feeds:
+        for entry in entries[:max(per_topic, CANDIDATES_PER_TOPIC)]:
+            title = clean_title(entry.get('title', ""))
+            if title: rows.append((topic, title, entry.get('link'), story_key(entry)))
+    if not rows: return []
+
+    ids = cluster([title for _, title, _, _ in rows], [link for _, _, link, _ in rows])
+    heard = {story_id for (_, _, _, key), story_id in zip(rows, ids) if key and key in seen} if seen else ()
+
+    stories = {} # cluster id -> {'title', 'topics', 'keys'}; the first title seen represents the story
+    queues = {} # topic -> its cluster ids, best first
+    for (topic, title, _, key), story_id in zip(rows, ids):
+        if story_id in heard: continue
+        story = stories.setdefault(story_id, {'title': title, 'topics': [], 'keys': []})
+        if topic not in story['topics']: story['topics'].append(topic)
+        if key and key not in story['keys']: story['keys'].append(key)
+        queue = queues.setdefault(topic, [])
+        if story_id not in queue: queue.append(story_id)
+    top = {topic: set(queue[:per_topic]) for topic, queue in queues.items()}
+
+    selected, sent, covered = [], set(), dict.fromkeys(queues, 0)
+    used, char_budget = 0, token_budget * 4 # estimate_tokens() counts 4 characters a token
+    for round_ in range(per_topic):
+        for topic, queue in queues.items():
+            if covered[topic] > round_: continue
+            while queue:
+                story_id = queue.pop(0)
+                if story_id in sent: continue
+                story = stories[story_id]
+                length = len(story_line(story))
+                if used + length > char_budget: continue
+                selected.append(story)
+                sent.add(story_id)
+                used += length
+                for tagged in story['topics']:
+                    if tagged == topic or story_id in top[tagged]: covered[tagged] += 1
+                break
+    return selected
@@ -0,0 +1,80 @@
+import json
+import base64
+from datetime import datetime, date
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import defer
+
+from models import db, History
+from services import history_writer, briefing_store
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(row):
+    key = [row.summary_date.isoformat(), row.created_at.isoformat(), row.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Returns (summary_date, created_at, id), or None for a missing or malformed cursor."""
+    if not cursor: return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        summary_date, created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(summary_date), datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+def parse_date(value):
+    if not value: return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def history_page(user_id, selected_date=None, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of a user's history, newest first, as (rows, next_cursor).
+    Keyset pagination over (summary_date, created_at, id) walks the
+    (user_id, summary_date, created_at) index, so deep pages cost the same
+    as the first. Briefings are not loaded; see get_entry() and news_data().
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    # Read-your-writes: rows still in the write-behind queue go to disk first
+    if history_writer.pending(user_id):
+        history_writer.flush()
+    query = db.session.query(History).options(defer(History.meta_data)).filter(History.user_id == user_id)
+
+    filter_date = parse_date(selected_date) if isinstance(selected_date, str) else selected_date
+    if filter_date:
+        query = query.filter(History.summary_date == filter_date)
+
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(History.summary_date, History.created_at, History.id) < tuple_(*position))
+
+    rows = (
+        query.order_by(History.summary_date.desc(), History.created_at.desc(), History.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def get_entry(user_id, entry_id):
+    """A single history row, for expanding or replaying it with news_data()."""
+    return db.session.query(History).filter_by(id=entry_id, user_id=user_id).first()
+
+def news_data(row):
+    """The briefing a row was generated with: from the briefing store, or inline on rows not yet migrated."""
+    if row.briefing_digest:
+        return briefing_store.get(row.briefing_digest)
+    return row.meta_data
+
+def entry_to_dict(row):
+    return {
+        'id': row.id,
+        'summary_date': row.summary_date.isoformat(),
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'content': row.content,
+    }
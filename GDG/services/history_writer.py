@@ -0,0 +1,158 @@
+import os
+import time
+import atexit
+import threading
+from collections import deque
+
+from models import db, History
+from services import metrics, briefing_store
+
+# Off by default. Enable it only on long-lived processes that exit through
+# atexit (gunicorn workers, asgi.py, worker.py): a serverless function
+# (api/index.py) is frozen between requests and can be recycled without
+# atexit, which would lose queued rows.
+HISTORY_WRITE_BEHIND = os.environ.get('HISTORY_WRITE_BEHIND', '0') == '1'
+HISTORY_FLUSH_SIZE = int(os.environ.get('HISTORY_FLUSH_SIZE', 50))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0))
+HISTORY_QUEUE_MAX = int(os.environ.get('HISTORY_QUEUE_MAX', 10000)) # rows queued or being flushed
+
+_app = None
+_thread = None
+_queue = deque() # units: lists of rows that are written in the same transaction
+_depth = 0 # rows in _queue plus rows of the flush in progress, bounded by HISTORY_QUEUE_MAX
+_cond = threading.Condition()
+_flush_lock = threading.Lock()
+_stopping = False
+_stats = {'enqueued': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0, 'direct_writes': 0,
+          'last_flush_ms': 0.0, 'max_flush_ms': 0.0, 'total_flush_ms': 0.0}
+
+def init_app(app):
+    """Binds the writer to the app and starts the background flusher (once per process)."""
+    global _app, _thread
+    with _cond:
+        _app = app
+        if not HISTORY_WRITE_BEHIND or _thread is not None:
+            return
+        _thread = threading.Thread(target=_flush_loop, daemon=True, name='history-writer')
+        _thread.start()
+    atexit.register(shutdown)
+
+def record(user_id, content, meta_data, created_at):
+    """
+    Queues one History row and returns immediately. Falls back to a direct
+    insert when write-behind is off, the flusher is not running or the
+    queue is full.
+    """
+    record_many([(user_id, content, meta_data, created_at)])
+
+def record_many(entries):
+    """Queues (user_id, content, meta_data, created_at) rows as one unit: they are committed together."""
+    rows = [{'user_id': user_id, 'summary_date': created_at.date(), 'created_at': created_at,
+             'content': content, 'meta_data': meta_data} for user_id, content, meta_data, created_at in entries]
+    if not rows: return
+    global _depth
+    with _cond:
+        queued = _thread is not None and _depth + len(rows) <= HISTORY_QUEUE_MAX
+        if queued:
+            _queue.append(rows)
+            _depth += len(rows)
+            _stats['enqueued'] += len(rows)
+            if _depth >= HISTORY_FLUSH_SIZE:
+                _cond.notify()
+        elif _thread is not None:
+            _stats['direct_writes'] += len(rows)
+    if not queued:
+        # A full queue means the database is behind: this caller waits on it rather than losing rows
+        _write(rows)
+
+def pending(user_id=None):
+    with _cond:
+        if user_id is None: return sum(len(unit) for unit in _queue)
+        return sum(1 for unit in _queue for row in unit if row['user_id'] == user_id)
+
+def _write(rows):
+    """
+    One multi-row INSERT in a single transaction. Briefings go to the
+    briefing store and rows keep only their digest.
+    """
+    started = time.perf_counter()
+    with metrics.span('db_commit', table='history', rows=len(rows)):
+        try:
+            stored = [row for row in rows if row['meta_data'] is not None]
+            digests, new = briefing_store.put_many([row['meta_data'] for row in stored])
+            digest_of = {id(row): digest for row, digest in zip(stored, digests)}
+            db.session.execute(History.__table__.insert(), [
+                # meta_data left out entirely: a None would be stored as JSON 'null', not NULL
+                {**{k: v for k, v in row.items() if k != 'meta_data'}, 'briefing_digest': digest_of.get(id(row))}
+                for row in rows
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    briefing_store.remember(new)
+    elapsed = (time.perf_counter() - started) * 1000
+    with _cond:
+        _stats['written'] += len(rows)
+        _stats['flushes'] += 1
+        _stats['last_flush_ms'] = round(elapsed, 2)
+        _stats['max_flush_ms'] = round(max(_stats['max_flush_ms'], elapsed), 2)
+        _stats['total_flush_ms'] += elapsed
+
+def flush():
+    """Writes everything queued so far. Safe to call from request handlers and tests."""
+    global _depth
+    with _flush_lock:
+        with _cond:
+            units = list(_queue)
+            _queue.clear()
+        rows = [row for unit in units for row in unit]
+        if not rows: return 0
+        try:
+            if _app is not None:
+                with _app.app_context():
+                    _write(rows)
+            else:
+                _write(rows)
+        except Exception as e:
+            # Put the batch back in front so the next flush retries it; its rows still count in _depth
+            with _cond:
+                _queue.extendleft(reversed(units))
+                _stats['failed_flushes'] += 1
+            print(f"❌ History Flush Error ({len(rows)} rows): {e}")
+            return 0
+        with _cond:
+            _depth -= len(rows)
+        return len(rows)
+
+def _flush_loop():
+    while True:
+        with _cond:
+            if not _queue and not _stopping:
+                _cond.wait(HISTORY_FLUSH_INTERVAL)
+            elif _depth < HISTORY_FLUSH_SIZE and not _stopping:
+                _cond.wait(HISTORY_FLUSH_INTERVAL)
+            stopping = _stopping
+        flush()
+        if stopping: return
+
+def shutdown(timeout=5):
+    """Stops the flusher and drains the queue; registered with atexit."""
+    global _stopping, _thread
+    with _cond:
+        thread = _thread
+        _stopping = True
+        _cond.notify()
+    if thread is not None:
+        thread.join(timeout)
+    flush()
+    with _cond:
+        _thread = None
+        _stopping = False
+
+def stats():
+    with _cond:
+        snapshot = dict(_stats, depth=_depth)
+    flushes = snapshot.pop('total_flush_ms')
+    snapshot['avg_flush_ms'] = round(flushes / snapshot['flushes'], 2) if snapshot['flushes'] else 0.0
+    return snapshot
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+POOL_SIZE = 32
+
+_local = threading.local()
+
+def get_session():
+    """
+    Returns a keep-alive requests.Session for the current thread.
+    Sessions are not guaranteed thread safe, so each worker thread gets its own
+    pooled session and reuses its connections across calls.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _local.session = session
+    return session
+
+_async_client = None
+_async_loop = None
+
+def get_async_client():
+    """
+    Returns the shared httpx.AsyncClient for the running event loop (the ASGI
+    serving mode). One client per loop keeps its connection pool usable.
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        import httpx
+        limits = httpx.Limits(max_connections=POOL_SIZE * 8, max_keepalive_connections=POOL_SIZE)
+        _async_client = httpx.AsyncClient(headers=DEFAULT_HEADERS, limits=limits, follow_redirects=True)
+        _async_loop = loop
+    return _async_client
+
+async def close_async_client():
+    global _async_client, _async_loop
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_loop = None
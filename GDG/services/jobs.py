@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db, Job
+from services import metrics
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+# Runner processes (worker.py, local runs, JOB_RUNNER=1) look for queued jobs this often
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1))
+# Every runner touches updated_at on the jobs it holds each heartbeat; a job
+# nobody has touched for JOB_STALE_SECONDS lost its process and is re-queued
+JOB_HEARTBEAT_SECONDS = int(os.environ.get('JOB_HEARTBEAT_SECONDS', 30))
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 120))
+SSE_POLL_INTERVAL = 0.5
+SSE_MAX_SECONDS = 300
+SSE_RETRY_MS = 2000
+
+_handlers = {}
+_app = None
+_executor = None
+_runner = None
+_owned = {} # job id -> 'queued' | 'running', for jobs on this process's pool
+_lock = threading.Lock()
+
+def register(kind, handler):
+    """
+    handler(payload, user_id, report, upload) -> result dict; report(progress,
+    stage) updates the job row, upload is the bytes given to submit() or None.
+    """
+    _handlers[kind] = handler
+
+def init_app(app, runner=False):
+    """
+    Binds jobs to the app. Only a runner process executes them: it starts the
+    pool and a loop that picks up queued work (including jobs a stopped
+    process never finished) and heartbeats what it holds. Other processes
+    (web workers without JOB_RUNNER, the release step, serverless functions)
+    only persist jobs for a runner to pick up.
+    """
+    global _app, _executor, _runner
+    with _lock:
+        _app = app
+        if not runner: return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+        if _runner is None:
+            _runner = threading.Thread(target=_runner_loop, daemon=True, name='job-runner')
+            _runner.start()
+
+def _reclaim():
+    """Queues jobs whose runner stopped heartbeating."""
+    stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    orphaned = db.session.query(Job.id).filter(Job.status.in_(('queued', 'running')), Job.updated_at < stale).all()
+    db.session.commit()
+    for (job_id,) in orphaned:
+        _queue(job_id)
+    if orphaned:
+        print(f"🔁 Re-queued {len(orphaned)} unfinished job(s)")
+
+def _poll():
+    """Takes queued jobs, up to this pool's free slots. Another runner may take the same one; _claim dedupes."""
+    with _lock:
+        free, held = JOB_WORKERS - len(_owned), list(_owned)
+    if free <= 0: return
+    query = db.session.query(Job.id).filter(Job.status == 'queued')
+    if held: query = query.filter(Job.id.notin_(held))
+    queued = query.order_by(Job.created_at).limit(free).all()
+    db.session.commit()
+    for (job_id,) in queued:
+        _queue(job_id)
+
+def _beat():
+    """Marks the jobs this process holds as alive."""
+    with _lock:
+        queued = [job_id for job_id, state in _owned.items() if state == 'queued']
+        running = [job_id for job_id, state in _owned.items() if state == 'running']
+    if not queued and not running: return
+    db.session.query(Job).filter(
+        (Job.id.in_(queued) & (Job.status == 'queued')) | (Job.id.in_(running) & (Job.status == 'running'))
+    ).update({'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+
+def _runner_loop():
+    next_beat = 0 # reclaim at once on boot
+    while True:
+        with _app.app_context():
+            try:
+                if time.monotonic() >= next_beat:
+                    _beat()
+                    _reclaim()
+                    next_beat = time.monotonic() + JOB_HEARTBEAT_SECONDS
+                _poll()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Job runner error: {e}")
+            finally:
+                db.session.remove()
+        time.sleep(JOB_POLL_SECONDS)
+
+def _queue(job_id):
+    with _lock:
+        _owned.setdefault(job_id, 'queued')
+    _executor.submit(metrics.in_context(_run), job_id)
+
+def new_id():
+    return uuid.uuid4().hex
+
+def submit(user_id, kind, payload, job_id=None, upload=None):
+    """
+    Persists the job (with the raw upload, if any, so any runner host can
+    read it) and returns its id immediately. A runner process queues it
+    straight away; otherwise a runner's poll picks it up.
+    """
+    job = Job(id=job_id or new_id(), user_id=user_id, kind=kind, status='queued', payload=payload, upload=upload)
+    db.session.add(job)
+    db.session.commit()
+    if _executor is not None:
+        _queue(job.id)
+    return job.id
+
+def _claim(job_id):
+    """Atomically moves a job to 'running' so two workers never run it twice."""
+    stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    claimed = db.session.query(Job).filter(
+        Job.id == job_id,
+        (Job.status == 'queued') | ((Job.status == 'running') & (Job.updated_at < stale))
+    ).update({'status': 'running', 'stage': 'started', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+def _update(job_id, **fields):
+    fields['updated_at'] = datetime.utcnow()
+    db.session.query(Job).filter(Job.id == job_id).update(fields, synchronize_session=False)
+    db.session.commit()
+
+def _run(job_id):
+    with _app.app_context():
+        try:
+            if not _claim(job_id): return
+            with _lock:
+                _owned[job_id] = 'running'
+            job = db.session.get(Job, job_id)
+            handler = _handlers[job.kind]
+            payload, user_id, upload = job.payload, job.user_id, job.upload
+
+            def report(progress, stage):
+                _update(job_id, progress=progress, stage=stage)
+
+            result = handler(payload, user_id, report, upload)
+            _update(job_id, status='done', progress=100, stage='done', result=result, upload=None)
+        except Exception as e:
+            db.session.rollback()
+            message = getattr(e, 'message', None) or 'Processing failed.'
+            print(f"❌ Job {job_id} Error: {e}")
+            try:
+                _update(job_id, status='failed', stage='failed', error=message, upload=None)
+            except Exception as db_e:
+                db.session.rollback()
+                print(f"❌ Job Save Error: {db_e}")
+        finally:
+            with _lock:
+                _owned.pop(job_id, None)
+            db.session.remove()
+
+def get_job(job_id, user_id):
+    return db.session.query(Job).filter_by(id=job_id, user_id=user_id).first()
+
+def job_to_dict(job):
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress or 0,
+        'stage': job.stage,
+    }
+    if job.status == 'done': data['result'] = job.result
+    if job.status == 'failed': data['message'] = job.error
+    return data
+
+def job_state(job_id, user_id):
+    """job_to_dict() read fresh from the database, or None."""
+    db.session.expire_all()
+    job = get_job(job_id, user_id)
+    return job_to_dict(job) if job else None
+
+def sse_message(data):
+    return f"event: {data['status']}\ndata: {json.dumps(data)}\n\n"
+
+def sse_snapshot(job_id, user_id):
+    """
+    Server-Sent Events for the sync (gunicorn) mode: the current state and a
+    retry hint, then the response ends and EventSource reconnects. Holding
+    the stream open would pin a sync worker per listener, so this is polling
+    over SSE; asgi.py serves a held-open stream from the event loop instead.
+    Clients can also poll /api/jobs/<id> directly.
+    """
+    data = job_state(job_id, user_id)
+    if data is None: return
+    yield f"retry: {SSE_RETRY_MS}\n" + sse_message(data)
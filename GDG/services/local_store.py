@@ -0,0 +1,129 @@
+import os
+import time
+import atexit
+import sqlite3
+import tempfile
+import threading
+
+DEFAULT_DB_PATH = os.environ.get('LOCAL_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'mindfeed_cache.sqlite'))
+# A hit refreshes an entry's LRU position at most this often, and counters
+# reach the shared file at most this often, so cache hits stay read-only.
+LOCAL_STORE_TOUCH_SECONDS = float(os.environ.get('LOCAL_STORE_TOUCH_SECONDS', 60))
+LOCAL_STORE_FLUSH_SECONDS = float(os.environ.get('LOCAL_STORE_FLUSH_SECONDS', 30))
+
+class LocalStore:
+    """
+    A small key/value table in a local SQLite file, shared by every gunicorn
+    worker on the host. Entries are evicted least-recently-used first once the
+    total stored size goes over `max_bytes`. Hit/miss style counters are
+    added up in process memory and flushed to the same file every
+    LOCAL_STORE_FLUSH_SECONDS, so all workers report the same numbers.
+    """
+
+    def __init__(self, table, max_bytes, path=None):
+        self.table = table
+        self.max_bytes = max_bytes
+        self.path = path or DEFAULT_DB_PATH
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                        "key TEXT PRIMARY KEY, value BLOB, meta TEXT, size INTEGER, "
+                        "stored_at REAL, accessed_at REAL)"
+                    )
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed ON {self.table} (accessed_at)")
+                    conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table}_counters (name TEXT PRIMARY KEY, value INTEGER)")
+                    self._ready = True
+        return conn
+
+    def get(self, key):
+        """
+        Returns {'value', 'meta', 'stored_at'} or None. Marks the entry as
+        recently used unless that was done in the last LOCAL_STORE_TOUCH_SECONDS.
+        """
+        conn = self._conn()
+        row = conn.execute(f"SELECT value, meta, stored_at, accessed_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None: return None
+        now = time.time()
+        if now - (row[3] or 0) >= LOCAL_STORE_TOUCH_SECONDS:
+            conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return {'value': row[0], 'meta': row[1], 'stored_at': row[2]}
+
+    def put(self, key, value, meta=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, meta, size, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, value, meta, len(value), now, now)
+        )
+        self._evict(conn)
+
+    def touch(self, key):
+        """Resets the age of an entry that the origin confirmed is still current."""
+        now = time.time()
+        self._conn().execute(f"UPDATE {self.table} SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def delete(self, key):
+        self._conn().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _evict(self, conn):
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes: return
+        rows = conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes: break
+            doomed.append((key,))
+            total -= size
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+    def incr(self, name, amount=1):
+        with self._pending_lock:
+            self._pending[name] = self._pending.get(name, 0) + amount
+            due = time.monotonic() - self._flushed_at >= LOCAL_STORE_FLUSH_SECONDS
+        if due: self.flush()
+
+    def flush(self):
+        """Adds this process's pending counter increments to the shared file."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending: return
+        try:
+            self._conn().executemany(
+                f"INSERT INTO {self.table}_counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                list(pending.items())
+            )
+        except Exception:
+            with self._pending_lock:
+                for name, amount in pending.items():
+                    self._pending[name] = self._pending.get(name, 0) + amount
+            raise
+
+    def counters(self):
+        self.flush()
+        rows = self._conn().execute(f"SELECT name, value FROM {self.table}_counters").fetchall()
+        return dict(rows)
+
+    def stats(self):
+        count, size = self._conn().execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        stats = {'entries': count, 'bytes': size}
+        stats.update(self.counters())
+        return stats
@@ -0,0 +1,176 @@
+"""
+Timing spans, counters and the Prometheus text format behind /metrics.
+
+    with metrics.span('gemini_call') as span:
+        ...
+        span['tokens'] = 812
+
+times the block into the mindfeed_stage_seconds{stage,outcome} histogram
+and writes one JSON log line carrying the current request id. The request
+id lives in a contextvar, so it follows asyncio tasks and any pool work
+submitted through metrics.in_context(). Stdlib only.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SPAN_LOG = os.environ.get('SPAN_LOG', '1') == '1'
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_lock = threading.Lock()
+_histograms = {} # name -> {labels tuple: [bucket counts..., sum, count]}
+_counters = {} # name -> {labels tuple: value}
+_help = {}
+_collectors = {}
+
+logger = logging.getLogger('mindfeed')
+if SPAN_LOG and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def describe(name, text):
+    _help[name] = text
+
+describe('mindfeed_stage_seconds', 'Time spent in each pipeline stage.')
+describe('mindfeed_http_request_seconds', 'HTTP request latency up to the first response byte.')
+
+# --- REQUEST ID ---
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+def set_request_id(request_id):
+    """Returns a token for reset_request_id()."""
+    return _request_id.set(request_id)
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+def current_request_id():
+    return _request_id.get()
+
+def in_context(fn):
+    """Wraps `fn` to run in a copy of the caller's context, e.g. for ThreadPoolExecutor.submit."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+# --- RECORDING ---
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def observe(name, value, **labels):
+    key = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        row = series.get(key)
+        if row is None:
+            row = series[key] = [0] * len(BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound: row[i] += 1
+        row[-2] += value
+        row[-1] += 1
+
+def inc(name, amount=1, **labels):
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+def log_event(event, **fields):
+    if not SPAN_LOG: return
+    record = {'ts': round(time.time(), 3), 'event': event, 'request_id': current_request_id()}
+    record.update(fields)
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+@contextmanager
+def span(stage, **fields):
+    """Times the block as `stage`. Keys set on the yielded dict are added to the log line."""
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield fields
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = 'cancelled' # client went away mid-stream
+        raise
+    except BaseException as e:
+        outcome = 'error'
+        fields.setdefault('error', type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        observe('mindfeed_stage_seconds', elapsed, stage=stage, outcome=outcome)
+        log_event('span', stage=stage, outcome=outcome, duration_ms=round(elapsed * 1000, 2), **fields)
+
+def timed(stage, **fields):
+    """Decorator form of span() for functions that are one stage end to end."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **fields):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def register_collector(name, collect):
+    """collect() -> {metric suffix: number}; exported as mindfeed_<name>_<suffix> on every scrape."""
+    _collectors[name] = collect
+
+# --- EXPOSITION ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render():
+    """Everything recorded so far, in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = {name: {k: list(v) for k, v in series.items()} for name, series in _histograms.items()}
+        counters = {name: dict(series) for name, series in _counters.items()}
+
+    for name in sorted(histograms):
+        if name in _help: lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, row in sorted(histograms[name].items()):
+            for i, bound in enumerate(BUCKETS):
+                lines.append(f"{name}_bucket{_labels(key, [('le', bound)])} {row[i]}")
+            lines.append(f"{name}_bucket{_labels(key, [('le', '+Inf')])} {row[-1]}")
+            lines.append(f"{name}_sum{_labels(key)} {_number(row[-2])}")
+            lines.append(f"{name}_count{_labels(key)} {row[-1]}")
+
+    for name in sorted(counters):
+        if name in _help: lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_labels(key)} {_number(value)}")
+
+    for prefix, collect in sorted(_collectors.items()):
+        try:
+            values = collect()
+        except Exception as e:
+            print(f"⚠️ Metrics collector {prefix} failed: {e}")
+            continue
+        for suffix, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)): continue
+            name = f"mindfeed_{prefix}_{suffix}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
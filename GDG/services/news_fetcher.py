@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+import threading
+import urllib.parse
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from services.http import get_session, get_async_client
+from services import feed_cache, metrics
+
+RSS_SEARCH_URL = os.environ.get('RSS_SEARCH_URL', 'https://news.google.com/rss/search')
+MAX_WORKERS = int(os.environ.get('RSS_FETCH_WORKERS', 8))
+PER_FEED_TIMEOUT = 4
+FANOUT_DEADLINE = float(os.environ.get('RSS_FETCH_DEADLINE', 6))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def parse_feed(content):
+    import feedparser # imported on first fetch, not on every cold start
+    return feedparser.parse(BytesIO(content))
+
+def _get_executor():
+    """Process-wide bounded pool shared by every request."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='rss')
+    return _executor
+
+def build_feed_url(query_term):
+    encoded_topic = urllib.parse.quote(query_term)
+    return f"{RSS_SEARCH_URL}?q={encoded_topic}&hl=en-IN&gl=IN&ceid=IN:en"
+
+def fetch_feed(query_term, timeout=PER_FEED_TIMEOUT):
+    """
+    Returns the parsed entries (plain dicts) for one topic feed.
+    Served from the shared feed cache while fresh; once stale the feed is
+    revalidated with a conditional GET and only re-parsed when it changed.
+    """
+    with metrics.span('rss_fetch', topic=query_term) as span:
+        cached = feed_cache.lookup(query_term)
+        if cached and cached['fresh']:
+            span['cache'] = 'hit'
+            return cached['entries']
+
+        response = get_session().get(build_feed_url(query_term), headers=feed_cache.validators(cached), timeout=timeout)
+        span['status'] = response.status_code
+        if response.status_code == 304 and cached:
+            feed_cache.revalidated(query_term)
+            return cached['entries']
+        if response.status_code != 200:
+            return cached['entries'] if cached else []
+
+        feed = parse_feed(response.content)
+        entries = feed_cache.simplify_entries(feed.entries)
+        feed_cache.store(query_term, entries, response.headers)
+        return entries
+
+def fetch_feeds(query_terms, deadline=FANOUT_DEADLINE):
+    """
+    Fetches all topic feeds concurrently on the shared pool.
+    Waits at most `deadline` seconds for the whole fan-out and returns
+    [(query_term, entries)] for the feeds that finished, in the input order.
+    """
+    if not query_terms: return []
+
+    started = time.monotonic()
+    executor = _get_executor()
+    futures = [(term, executor.submit(metrics.in_context(fetch_feed), term)) for term in query_terms]
+    done, not_done = wait([f for _, f in futures], timeout=deadline)
+
+    for f in not_done:
+        f.cancel()
+    if not_done:
+        print(f"      ⏱️ RSS deadline hit after {time.monotonic() - started:.1f}s, dropped {len(not_done)} feed(s)")
+
+    results = []
+    for term, future in futures:
+        if future not in done: continue
+        try:
+            results.append((term, future.result()))
+        except Exception as e:
+            print(f"      ❌ Error fetching {term}: {e}")
+    return results
+
+async def fetch_feed_async(query_term, timeout=PER_FEED_TIMEOUT):
+    """fetch_feed() on the shared async client, for the ASGI serving mode."""
+    # The feed cache is SQLite shared with other workers (busy timeout of
+    # seconds under write contention): its calls run off the event loop
+    with metrics.span('rss_fetch', topic=query_term) as span:
+        cached = await asyncio.to_thread(feed_cache.lookup, query_term)
+        if cached and cached['fresh']:
+            span['cache'] = 'hit'
+            return cached['entries']
+
+        response = await get_async_client().get(build_feed_url(query_term), headers=feed_cache.validators(cached), timeout=timeout)
+        span['status'] = response.status_code
+        if response.status_code == 304 and cached:
+            await asyncio.to_thread(feed_cache.revalidated, query_term)
+            return cached['entries']
+        if response.status_code != 200:
+            return cached['entries'] if cached else []
+
+        feed = parse_feed(response.content)
+        entries = feed_cache.simplify_entries(feed.entries)
+        await asyncio.to_thread(feed_cache.store, query_term, entries, response.headers)
+        return entries
+
+async def fetch_feeds_async(query_terms, deadline=FANOUT_DEADLINE):
+    """fetch_feeds() as coroutines on the event loop: no pool threads, same deadline and ordering."""
+    if not query_terms: return []
+
+    started = time.monotonic()
+    tasks = [asyncio.ensure_future(fetch_feed_async(term)) for term in query_terms]
+    done, not_done = await asyncio.wait(tasks, timeout=deadline)
+
+    for task in not_done:
+        task.cancel()
+    if not_done:
+        print(f"      ⏱️ RSS deadline hit after {time.monotonic() - started:.1f}s, dropped {len(not_done)} feed(s)")
+
+    results = []
+    for term, task in zip(query_terms, tasks):
+        if task not in done: continue
+        try:
+            results.append((term, task.result()))
+        except Exception as e:
+            print(f"      ❌ Error fetching {term}: {e}")
+    return results
@@ -0,0 +1,86 @@
+import os
+import json
+import zlib
+import hashlib
+
+from services.local_store import LocalStore
+from services import metrics
+from services.text_processing import extract_pdf_pages, page_offsets, segment_articles
+
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+HASH_CHUNK = 1024 * 1024
+
+_store = LocalStore('pdf_cache', PDF_CACHE_MAX_BYTES)
+
+def file_digest(source):
+    """SHA-256 of a path or binary stream, read in chunks. Streams are rewound afterwards."""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+def _load(digest, max_chars, max_pages):
+    row = _store.get(digest)
+    if row is None: return None
+    meta = json.loads(row['meta'] or '{}')
+    # A copy extracted under a smaller budget cannot serve a bigger one
+    if not meta.get('complete') and (meta.get('max_chars'), meta.get('max_pages')) != (max_chars, max_pages):
+        return None
+    return json.loads(zlib.decompress(row['value']))
+
+def extract_with_cache(source, max_chars=None, max_pages=None):
+    """
+    Returns (document, cache_hit), where document is
+    {'digest', 'text', 'page_offsets', 'articles'}. Repeat uploads of the
+    same file skip PDF parsing entirely.
+    """
+    with metrics.span('pdf_extract', max_pages=max_pages) as span:
+        try:
+            digest = file_digest(source)
+            document = _load(digest, max_chars, max_pages)
+        except Exception as e:
+            print(f"⚠️ PDF cache read error: {e}")
+            digest, document = None, None
+
+        if document is not None:
+            _store.incr('hits')
+            document['text'] = document['text'][:max_chars] if max_chars else document['text']
+            span['cache'] = 'hit'
+            return dict(document, digest=digest), True
+
+        try:
+            pages = extract_pdf_pages(source, max_chars=max_chars, max_pages=max_pages)
+        except Exception as e:
+            print(f"PDF Error: {e}")
+            return {'digest': digest, 'text': "", 'page_offsets': [], 'articles': []}, False
+
+        span['cache'] = 'miss'
+        span['pages'] = len(pages)
+        document = {
+            'text': "\n".join(pages) + "\n",
+            'page_offsets': page_offsets(pages),
+            'articles': segment_articles(pages),
+        }
+        if digest and document['text'].strip():
+            total = len(document['text'])
+            meta = {
+                'max_chars': max_chars,
+                'max_pages': max_pages,
+                'complete': (max_chars is None or total < max_chars) and max_pages is None,
+            }
+            try:
+                _store.incr('misses')
+                _store.put(digest, zlib.compress(json.dumps(document).encode('utf-8')), json.dumps(meta))
+            except Exception as e:
+                print(f"⚠️ PDF cache write error: {e}")
+        return dict(document, digest=digest), False
+
+def stats():
+    return _store.stats()
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from models import db, User
+from services.scheduler import briefing_key
+
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 4096))
+# Invalidation only reaches the process that saved the preferences; the TTL bounds staleness in the others
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 300))
+# How late a worker may notice a briefing the scheduler just built (or replaced)
+PREBUILT_CACHE_TTL = int(os.environ.get('PREBUILT_CACHE_TTL', 60))
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_prebuilt = OrderedDict() # briefing key -> (news_data, built_at, loaded_at); (None, None, ...) when there is none
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'prebuilt_hits': 0, 'prebuilt_misses': 0}
+
+def clean_user_topics(user_prefs, default="Kerala"):
+    """Turns the stored topics (dicts or plain strings) into a list of topic names."""
+    cleaned_topics = []
+    for t in user_prefs.get('topics', []):
+        if isinstance(t, dict): cleaned_topics.append(t.get('id', 'General'))
+        else: cleaned_topics.append(str(t))
+    if not cleaned_topics: cleaned_topics = [default]
+    return cleaned_topics
+
+def language_prompt(user_language):
+    """Returns (role, lang_instruction) for the prompt."""
+    if user_language == 'english':
+        return "You are a professional English Radio News Editor.", "Language: English."
+    return "You are a professional Malayalam Radio News Editor.", "Language: Malayalam."
+
+class UserProfile:
+    """Everything the API paths derive from a user's preferences, computed once."""
+    __slots__ = ('user_id', 'language', 'topics', 'pdf_topics', 'role', 'lang_instruction',
+                 'prebuilt_key', 'loaded_at')
+
+    def __init__(self, user_id, preferences):
+        prefs = preferences or {}
+        self.user_id = user_id
+        self.language = str(prefs.get('language', 'malayalam')).lower()
+        self.topics = clean_user_topics(prefs, default="Kerala")
+        self.pdf_topics = clean_user_topics(prefs, default="General News")
+        self.role, self.lang_instruction = language_prompt(self.language)
+        self.prebuilt_key = briefing_key(self.topics, self.language)
+        self.loaded_at = time.time()
+
+def peek(user_id):
+    """The cached profile if it is still fresh, or None. Never touches the database."""
+    with _lock:
+        profile = _entries.get(user_id)
+        if profile and time.time() - profile.loaded_at < PROFILE_CACHE_TTL:
+            _entries.move_to_end(user_id)
+            _stats['hits'] += 1
+            return profile
+    return None
+
+def get_profile(user_id):
+    """The cached profile for `user_id`, loading it on a miss. None if the user does not exist."""
+    profile = peek(user_id)
+    if profile: return profile
+    with _lock:
+        _stats['misses'] += 1
+
+    user = db.session.get(User, user_id)
+    if not user: return None
+    profile = UserProfile(user.id, user.preferences)
+
+    with _lock:
+        _entries[user_id] = profile
+        _entries.move_to_end(user_id)
+        while len(_entries) > PROFILE_CACHE_SIZE:
+            _entries.popitem(last=False)
+    return profile
+
+def prebuilt(key, load):
+    """
+    (news_data, built_at) of the scheduler's briefing for `key`, as
+    load(key) returns it, reused for PREBUILT_CACHE_TTL. An absent briefing
+    is remembered too, so the live path makes no query on most requests.
+    """
+    with _lock:
+        entry = _prebuilt.get(key)
+        if entry and time.time() - entry[2] < PREBUILT_CACHE_TTL:
+            _prebuilt.move_to_end(key)
+            _stats['prebuilt_hits'] += 1
+            return entry[0], entry[1]
+        _stats['prebuilt_misses'] += 1
+
+    news_data, built_at = load(key)
+    with _lock:
+        _prebuilt[key] = (news_data, built_at, time.time())
+        _prebuilt.move_to_end(key)
+        while len(_prebuilt) > PROFILE_CACHE_SIZE:
+            _prebuilt.popitem(last=False)
+    return news_data, built_at
+
+def invalidate(user_id):
+    with _lock:
+        if _entries.pop(user_id, None) is not None:
+            _stats['invalidations'] += 1
+
+def stats():
+    with _lock:
+        return dict(_stats, size=len(_entries), prebuilt_size=len(_prebuilt))
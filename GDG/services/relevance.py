@@ -0,0 +1,117 @@
+"""
+Local retrieval stage for newspaper PDFs: split the paper into article-sized
+chunks, rank them against the listener's topics with BM25, and pack only the
+best ones into the Gemini prompt under a token budget.
+"""
+import os
+import re
+import math
+from collections import Counter
+
+from services import metrics
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PDF_PROMPT_TOKEN_BUDGET', 6000))
+CHUNK_MIN_CHARS = 300
+MALAYALAM_STEM = 4 # code points kept as a prefix stem for agglutinated Malayalam words
+
+_WORD = re.compile(r"[a-z0-9]+|[ഀ-ൿ‌‍]+")
+_JOINERS = re.compile(r"[‌‍]")
+_MALAYALAM = re.compile(r"[ഀ-ൿ]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with news".split()
+)
+
+def tokenize(text):
+    """
+    Lowercased word tokens. Malayalam words drop zero-width joiners and also
+    emit a short prefix stem so inflected forms (കേരളത്തിൽ, കേരളം) still match.
+    """
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if _MALAYALAM.match(word):
+            word = _JOINERS.sub("", word)
+            tokens.append(word)
+            if len(word) > MALAYALAM_STEM: tokens.append(word[:MALAYALAM_STEM] + "~")
+        elif len(word) > 1 and word not in STOPWORDS:
+            tokens.append(word[:-1] if len(word) > 3 and word.endswith('s') else word)
+    return tokens
+
+def estimate_tokens(text):
+    """Rough Gemini token count: Malayalam script costs far more per character than ASCII."""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + 1
+
+class BM25Index:
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms = [Counter(tokenize(doc)) for doc in documents]
+        self.doc_lengths = [sum(terms.values()) for terms in self.doc_terms]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0
+        df = Counter()
+        for terms in self.doc_terms:
+            df.update(terms.keys())
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def scores(self, query):
+        query_terms = set(tokenize(query))
+        results = []
+        for terms, length in zip(self.doc_terms, self.doc_lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf: score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+def chunk_document(document):
+    """Article spans from the PDF cache, merged on each page until they are at least CHUNK_MIN_CHARS long."""
+    text = document['text']
+    chunks = []
+    current = None
+    for span in document.get('articles') or [{'page': 1, 'start': 0, 'end': len(text)}]:
+        if current and current['page'] == span['page'] and current['end'] - current['start'] < CHUNK_MIN_CHARS:
+            current['end'] = span['end']
+            continue
+        if current: chunks.append(current)
+        current = dict(span)
+    if current: chunks.append(current)
+    return [(chunk['page'], text[chunk['start']:chunk['end']].strip()) for chunk in chunks if text[chunk['start']:chunk['end']].strip()]
+
+@metrics.timed('pdf_rank')
+def select_relevant(document, topics, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Returns the prompt text: the highest scoring chunks for `topics`, in page
+    order, up to `token_budget`. Falls back to the front of the paper when
+    nothing matches (e.g. English topics against a Malayalam edition).
+    """
+    chunks = chunk_document(document)
+    if not chunks: return ""
+
+    scores = BM25Index([chunk for _, chunk in chunks]).scores(" ".join(topics))
+    ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+    if not ranked:
+        ranked = list(range(len(chunks)))
+
+    chosen = []
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(chunks[i][1])
+        if used + cost > token_budget:
+            if chosen: continue
+            # Even the best chunk alone is over budget: keep a trimmed copy of it
+            chosen.append(i)
+            break
+        chosen.append(i)
+        used += cost
+
+    parts = []
+    for i in sorted(chosen):
+        page, chunk = chunks[i]
+        if estimate_tokens(chunk) > token_budget:
+            chunk = chunk[:token_budget * 2]
+        parts.append(f"[Page {page}] {chunk}")
+    return "\n\n".join(parts)
@@ -0,0 +1,171 @@
+import os
+import time
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from models import db, User, History, PrebuiltBriefing
+from services.briefing_cache import normalize_topics
+from services.news_fetcher import fetch_feeds
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+PREBUILD_LEAD_MINUTES = int(os.environ.get('PREBUILD_LEAD_MINUTES', 15))
+PREBUILD_INTERVAL = int(os.environ.get('PREBUILD_INTERVAL', 300))
+PREBUILT_MAX_AGE = int(os.environ.get('PREBUILT_MAX_AGE', 45 * 60))
+HABIT_SAMPLE = 20
+HABIT_REFRESH_SECONDS = int(os.environ.get('HABIT_REFRESH_SECONDS', 3600))
+PREBUILD_LOCK_PATH = os.environ.get('PREBUILD_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'mindfeed_prebuild.lock'))
+
+_habits = {'minutes': {}, 'at': None}
+_leader_lock = None
+
+def briefing_key(topics, language):
+    return "|".join(normalize_topics(topics)) + "#" + language.lower()
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def is_fresh(built_at):
+    return built_at is not None and (utc_now() - built_at).total_seconds() < PREBUILT_MAX_AGE
+
+def usual_minutes():
+    """
+    {user_id: minute of the day (IST)} for the hour each user most often
+    started a live briefing in their last HABIT_SAMPLE, from one query.
+    Habits move slowly, so the result is reused for HABIT_REFRESH_SECONDS.
+    """
+    if _habits['at'] is not None and time.monotonic() - _habits['at'] < HABIT_REFRESH_SECONDS:
+        return _habits['minutes']
+
+    recent = (
+        db.session.query(
+            History.user_id, History.created_at,
+            func.row_number().over(partition_by=History.user_id, order_by=History.created_at.desc()).label('rank'),
+        )
+        .filter(~History.content.startswith('PDF:'), ~History.content.startswith('Link:'))
+        .subquery()
+    )
+    rows = (
+        db.session.query(recent.c.user_id, recent.c.created_at)
+        .filter(recent.c.rank <= HABIT_SAMPLE)
+        .order_by(recent.c.user_id, recent.c.rank)
+    )
+    hours = defaultdict(Counter)
+    for user_id, created_at in rows:
+        if created_at: hours[user_id][created_at.hour] += 1
+    _habits['minutes'] = {user_id: counts.most_common(1)[0][0] * 60 for user_id, counts in hours.items()}
+    _habits['at'] = time.monotonic()
+    return _habits['minutes']
+
+def reading_minute(prefs, usual_minute):
+    """
+    Minute of the day (IST) the user usually listens, or None if unknown.
+    `reading_time` is used when it holds a clock time ("07:30"); the preferences
+    page stores a session length there, so otherwise `usual_minute` (from
+    usual_minutes) is used.
+    """
+    reading_time = str(prefs.get('reading_time', ''))
+    if ':' in reading_time:
+        try:
+            hour, minute = reading_time.split(':', 1)
+            return int(hour) * 60 + int(minute)
+        except ValueError:
+            pass
+    return usual_minute
+
+def due_groups(now_ist, topics_for):
+    """Groups users whose reading time falls within the lead window by shared topic set + language."""
+    now_minute = now_ist.hour * 60 + now_ist.minute
+    usual = usual_minutes()
+    groups = defaultdict(list)
+    for user_id, preferences in db.session.query(User.id, User.preferences):
+        prefs = preferences or {}
+        minute = reading_minute(prefs, usual.get(user_id))
+        if minute is None: continue
+        if (minute - now_minute) % (24 * 60) > PREBUILD_LEAD_MINUTES: continue
+
+        topics = topics_for(prefs)
+        language = prefs.get('language', 'malayalam').lower()
+        groups[briefing_key(topics, language)].append((user_id, topics, language))
+    return groups
+
+def run_once(generate, topics_for, now_ist=None):
+    """Builds every due briefing that is not already fresh. Needs an app context."""
+    now_ist = now_ist or datetime.now(IST)
+    groups = due_groups(now_ist, topics_for)
+
+    existing = {
+        row.briefing_key: row
+        for row in db.session.query(PrebuiltBriefing).filter(PrebuiltBriefing.briefing_key.in_(list(groups))).all()
+    } if groups else {}
+    pending = {key: members for key, members in groups.items() if not (key in existing and is_fresh(existing[key].built_at))}
+    if not pending:
+        return 0
+
+    # Overlapping topic sets share one fan-out; each group below then reads the warm feed cache
+    all_topics = sorted({t for members in pending.values() for t in members[0][1]})
+    fetch_feeds(all_topics)
+
+    built = 0
+    for key, members in pending.items():
+        _, topics, language = members[0]
+        news_data = generate(topics, language)
+        if news_data is None: continue
+        row = existing.get(key) or PrebuiltBriefing(briefing_key=key, language=language)
+        row.news_data = news_data
+        row.built_at = utc_now()
+        db.session.add(row)
+        try:
+            db.session.commit()
+            built += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Prebuild Save Error: {e}")
+
+    print(f"🗓️ Prebuilt {built} briefing(s) for {sum(len(m) for m in pending.values())} user(s)")
+    return built
+
+def is_leader():
+    """
+    True once this process holds the host's prebuild lock. With
+    PREBUILD_IN_APP=1 every gunicorn worker starts a scheduler thread; only
+    the lock holder builds, and another worker takes over when it exits.
+    The lock is per host: across hosts, run one scheduler (worker.py).
+    """
+    global _leader_lock
+    if _leader_lock is not None: return True
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    handle = open(PREBUILD_LOCK_PATH, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _leader_lock = handle
+    return True
+
+def run_forever(app, generate, topics_for, interval=PREBUILD_INTERVAL, exclusive=False):
+    while True:
+        if not exclusive or is_leader():
+            with app.app_context():
+                try:
+                    run_once(generate, topics_for)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Scheduler Error: {e}")
+        time.sleep(interval)
+
+def start_background(app, generate, topics_for):
+    """Runs the scheduler on a daemon thread inside the web process, in one worker per host (is_leader)."""
+    thread = threading.Thread(
+        target=run_forever, args=(app, generate, topics_for), kwargs={'exclusive': True}, daemon=True, name='prebuild'
+    )
+    thread.start()
+    return thread
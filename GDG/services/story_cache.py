@@ -0,0 +1,67 @@
+"""
+A radio headline and detail per RSS story and language, for delta
+briefings. Gemini writes a story up once and every later listener gets the
+stored copy. Entries are stored under each of the story's keys, so a later
+fetch that clusters the story under another entry still finds it.
+
+Write-ups are batched per topic set: at most one Gemini call per
+STORY_WRITE_INTERVAL (claim_write), covering every unwritten story in the
+feeds' candidate window, so the listeners who check in after it find their
+new stories already written.
+"""
+import os
+import json
+import time
+
+from services.local_store import LocalStore
+
+STORY_CACHE_TTL = int(os.environ.get('STORY_CACHE_TTL', 24 * 3600))
+STORY_CACHE_MAX_BYTES = int(os.environ.get('STORY_CACHE_MAX_BYTES', 10 * 1024 * 1024))
+STORY_WRITE_INTERVAL = int(os.environ.get('STORY_WRITE_INTERVAL', 3600)) # once per news hour (BRIEFING_BUCKET_SECONDS)
+STORY_WRITE_MAX = int(os.environ.get('STORY_WRITE_MAX', 40)) # stories per write-up call
+
+_store = LocalStore('story_cache', STORY_CACHE_MAX_BYTES)
+
+def _key(story_key, language):
+    return f"{language.lower()}|{story_key}"
+
+def get(keys, language):
+    """{'headline', 'detail'} stored under any of a story's `keys`, or None."""
+    for story_key in keys:
+        try:
+            row = _store.get(_key(story_key, language))
+        except Exception as e:
+            print(f"⚠️ Story cache read error: {e}")
+            return None
+        if row and time.time() - row['stored_at'] < STORY_CACHE_TTL:
+            _store.incr('hits')
+            return json.loads(row['value'])
+    _store.incr('misses')
+    return None
+
+def put(keys, language, headline, detail):
+    value = json.dumps({'headline': headline, 'detail': detail}, ensure_ascii=False).encode('utf-8')
+    try:
+        for story_key in keys:
+            _store.put(_key(story_key, language), value)
+    except Exception as e:
+        print(f"⚠️ Story cache write error: {e}")
+
+def claim_write(topics, language, force=False):
+    """
+    True at most once per STORY_WRITE_INTERVAL for a topic set and language:
+    the caller may then ask Gemini for a write-up. `force` claims it anyway
+    (a first briefing with nothing written) and restarts the interval.
+    Shared by this host's processes; two hosts may each write once.
+    """
+    key = f"{language.lower()}|written|{','.join(topics)}"
+    try:
+        row = None if force else _store.get(key)
+        if row and time.time() - row['stored_at'] < STORY_WRITE_INTERVAL: return False
+        _store.put(key, b"")
+    except Exception as e:
+        print(f"⚠️ Story cache write error: {e}")
+    return True
+
+def stats():
+    return _store.stats()
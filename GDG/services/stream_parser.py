@@ -0,0 +1,72 @@
+import json
+
+class BriefingStreamParser:
+    """
+    Incremental parser for the {"headlines": [...], "details": [...]} briefing
+    as Gemini streams it. feed() returns the (key, index, text) items whose
+    string literal was completed by the new text, so each one can be sent to
+    the listener before the rest of the JSON exists. Anything outside the
+    JSON object (markdown fences, chatter) is ignored.
+    """
+
+    KEYS = ('headlines', 'details')
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.pending_key = None
+        self.current_key = None
+        self.array_key = None
+        self.items = {key: [] for key in self.KEYS}
+
+    def feed(self, text):
+        self.buffer += text
+        items = []
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            ch = buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    item = self._string_done(buffer[self.string_start:self.pos + 1])
+                    if item: items.append(item)
+            elif ch == '"' and self.stack:
+                self.in_string = True
+                self.string_start = self.pos
+            elif ch == '{':
+                self.stack.append('{')
+            elif ch == '[' and self.stack:
+                self.array_key = self.current_key if self.stack[-1] == '{' and len(self.stack) == 1 else None
+                self.stack.append('[')
+            elif ch in '}]' and self.stack:
+                self.stack.pop()
+            elif ch == ':' and self.stack[-1:] == ['{']:
+                self.current_key = self.pending_key
+            self.pos += 1
+        return items
+
+    def _string_done(self, literal):
+        try:
+            value = json.loads(literal)
+        except ValueError:
+            return None
+        if self.stack[-1] == '{':
+            self.pending_key = value
+            return None
+        if len(self.stack) == 2 and self.array_key in self.items:
+            values = self.items[self.array_key]
+            values.append(value)
+            return (self.array_key, len(values) - 1, value)
+        return None
+
+    def result(self):
+        """Whatever complete items were seen, as a briefing dict."""
+        return {key: list(values) for key, values in self.items.items()}
@@ -1,20 +1,152 @@
 import os
-import PyPDF2
+import io
+import mmap
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_text_from_pdf(filepath):
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', min(4, os.cpu_count() or 1)))
+PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 24))
+PAGES_PER_TASK = 16
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+def _open_source(source):
+    """
+    Returns (stream, closer) for a path, raw bytes or an open binary stream.
+    Paths are memory-mapped so the file is never copied into the heap.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source), None
+    if isinstance(source, (str, os.PathLike)):
+        f = open(source, 'rb')
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            f.close()
+            return io.BytesIO(b""), None
+        return mapped, lambda: (mapped.close(), f.close())
+    source.seek(0)
+    return source, None
+
+def _reader(stream):
+    import PyPDF2 # only PDF requests pay for this import
+    return PyPDF2.PdfReader(stream)
+
+def _extract_range(source, start, stop):
+    """Process pool task: text of pages [start, stop) of the PDF at `source` (path or bytes)."""
+    stream, closer = _open_source(source)
+    try:
+        reader = _reader(stream)
+        return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+    finally:
+        if closer: closer()
+
+def extract_pdf_pages(source, max_chars=None, max_pages=None, parallel=None):
+    """
+    Extracts page texts in order, stopping as soon as `max_chars` characters
+    have been collected or `max_pages` pages read. Large documents given as a
+    path or bytes are extracted in a process pool, a few pages per task.
+    """
+    stream, closer = _open_source(source)
+    try:
+        reader = _reader(stream)
+        page_count = len(reader.pages)
+        if max_pages is not None: page_count = min(page_count, max_pages)
+
+        can_fork = isinstance(source, (str, os.PathLike, bytes, bytearray))
+        if parallel is None:
+            parallel = can_fork and PDF_WORKERS > 1 and page_count >= PARALLEL_MIN_PAGES
+        if parallel and can_fork:
+            return _extract_parallel(bytes(source) if isinstance(source, bytearray) else source, page_count, max_chars)
+
+        pages = []
+        total = 0
+        for page_num in range(page_count):
+            page_text = reader.pages[page_num].extract_text() or ""
+            pages.append(page_text)
+            total += len(page_text) + 1
+            if max_chars is not None and total >= max_chars: break
+        return pages
+    finally:
+        if closer: closer()
+
+def _extract_parallel(source, page_count, max_chars):
+    """Keeps at most PDF_WORKERS tasks in flight and stops submitting once the budget is met."""
+    pool = _get_pool()
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    pending = []
+    pages = []
+    total = 0
+    next_range = 0
+
+    while next_range < len(ranges) or pending:
+        while next_range < len(ranges) and len(pending) < PDF_WORKERS:
+            start, stop = ranges[next_range]
+            pending.append(pool.submit(_extract_range, source, start, stop))
+            next_range += 1
+
+        for page_text in pending.pop(0).result():
+            pages.append(page_text)
+            total += len(page_text) + 1
+            if max_chars is not None and total >= max_chars:
+                for future in pending: future.cancel()
+                return pages
+    return pages
+
+def extract_text_from_pdf(source, max_chars=None, max_pages=None):
     """
-    Extracts text from a PDF file.
+    Extracts text from a PDF given as a path, bytes or an uploaded stream.
+    Returns "" when the file cannot be read.
     """
-    text = ""
     try:
-        with open(filepath, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+        return "\n".join(extract_pdf_pages(source, max_chars=max_chars, max_pages=max_pages)) + "\n"
     except Exception as e:
-        print(f"Error reading PDF: {e}")
-        return None
-    return text
+        print(f"PDF Error: {e}")
+        return ""
+
+ARTICLE_MAX_CHARS = 2000
+
+def page_offsets(pages):
+    """Start offset of each page inside "\n".join(pages)."""
+    offsets = []
+    position = 0
+    for page_text in pages:
+        offsets.append(position)
+        position += len(page_text) + 1
+    return offsets
+
+def segment_articles(pages):
+    """
+    Splits extracted pages into article-sized spans of the joined text.
+    Blank lines separate stories where the PDF kept them; long runs without
+    any are cut at the last sentence end (or space) before ARTICLE_MAX_CHARS.
+    Returns [{'page', 'start', 'end'}].
+    """
+    articles = []
+    for page_no, (base, page_text) in enumerate(zip(page_offsets(pages), pages), start=1):
+        cursor = 0
+        for block in page_text.split("\n\n"):
+            block_start = page_text.find(block, cursor)
+            cursor = block_start + len(block)
+            start, end = block_start, block_start + len(block)
+            while end - start > ARTICLE_MAX_CHARS:
+                cut = page_text.rfind(". ", start, start + ARTICLE_MAX_CHARS)
+                if cut <= start: cut = page_text.rfind(" ", start, start + ARTICLE_MAX_CHARS)
+                cut = cut + 1 if cut > start else start + ARTICLE_MAX_CHARS
+                articles.append({'page': page_no, 'start': base + start, 'end': base + cut})
+                start = cut
+            if page_text[start:end].strip():
+                articles.append({'page': page_no, 'start': base + start, 'end': base + end})
+    return articles
 
 def clean_text(text):
     """
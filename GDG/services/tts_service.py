@@ -1,20 +1,172 @@
-from gtts import gTTS
+"""
+Server-side speech for briefings.
+
+Each headline/detail is synthesized once per (text, language, voice) and kept
+in a content-addressed audio cache on disk, so a segment shared by many
+users' briefings is only ever rendered once. Whole briefings are the
+concatenation of their segment files (MP3 frames concatenate cleanly) and
+are addressed the same way. The backend is pluggable: gTTS in production,
+a silent-MP3 stub (TTS_BACKEND=stub) for tests and benchmarks.
+"""
 import os
+import time
 import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+AUDIO_CACHE_DIR = os.environ.get('AUDIO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mindfeed_audio'))
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+# Files used this recently are never evicted: segments about to be concatenated, briefings just handed to a client
+AUDIO_EVICT_GRACE_SECONDS = int(os.environ.get('AUDIO_EVICT_GRACE_SECONDS', 600))
+TTS_BACKEND = os.environ.get('TTS_BACKEND', 'gtts')
+TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 4))
+
+LANGUAGE_CODES = {'malayalam': 'ml', 'ml': 'ml', 'english': 'en', 'en': 'en'}
+
+def clean_for_speech(text):
+    """Clean markdown characters for better TTS"""
+    return text.replace('*', '').replace('#', '').replace('-', ' ').strip()
+
+class GTTSBackend:
+    voice = 'gtts'
+
+    def synthesize(self, text, lang, fp):
+        from gtts import gTTS
+        gTTS(text=text, lang=lang).write_to_fp(fp)
+
+class StubBackend:
+    """Writes silent MPEG-1 Layer III frames, roughly one per three characters of text."""
+    voice = 'stub'
+    FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413 # 128 kbps, 44.1 kHz, 417 bytes
+
+    def synthesize(self, text, lang, fp):
+        fp.write(self.FRAME * max(1, len(text) // 3))
+
+BACKENDS = {'gtts': GTTSBackend, 'stub': StubBackend}
+
+_backend = None
+_executor = None
+_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[TTS_BACKEND]()
+    return _backend
+
+def set_backend(backend):
+    """Swaps the synthesizer, e.g. StubBackend() in tests."""
+    global _backend
+    _backend = backend
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix='tts')
+    return _executor
+
+def audio_path(digest):
+    return os.path.join(AUDIO_CACHE_DIR, f"{digest}.mp3")
+
+def segment_digest(text, lang, voice):
+    return hashlib.sha256(f"{voice}\0{lang}\0{text}".encode('utf-8')).hexdigest()
+
+def _write_atomic(path, write):
+    """Writes via a temp file + rename so readers never see a half-written file."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as fp:
+            write(fp)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+def render_segment(text, language):
+    """Returns the digest of the cached audio for one piece of text, synthesizing it on a miss."""
+    lang = LANGUAGE_CODES.get(language.lower(), 'en')
+    backend = get_backend()
+    text = clean_for_speech(text)
+    digest = segment_digest(text, lang, backend.voice)
+    path = audio_path(digest)
+    try:
+        os.utime(path) # recently used, for eviction
+        return digest
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    _write_atomic(path, lambda fp: backend.synthesize(text, lang, fp))
+    return digest
+
+def render_briefing(segments, language):
+    """
+    Synthesizes every (kind, index, text) segment concurrently, then writes
+    the concatenated briefing. Returns (briefing_digest, [segment dicts]).
+    """
+    texts = [text for _, _, text in segments]
+    # render_segment marks each file as just used, which keeps evict() away from it while we concatenate
+    digests = list(_get_executor().map(lambda text: render_segment(text, language), texts))
+
+    briefing_digest = hashlib.sha256("".join(digests).encode('ascii')).hexdigest()
+    path = audio_path(briefing_digest)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        def concatenate(fp):
+            for digest, text in zip(digests, texts):
+                try:
+                    with open(audio_path(digest), 'rb') as part:
+                        fp.write(part.read())
+                except FileNotFoundError:
+                    # Evicted by another process anyway: synthesize it again, straight into the briefing
+                    get_backend().synthesize(clean_for_speech(text), LANGUAGE_CODES.get(language.lower(), 'en'), fp)
+        _write_atomic(path, concatenate)
+        evict()
+
+    parts = [{'kind': kind, 'index': index, 'digest': digest} for (kind, index, _), digest in zip(segments, digests)]
+    return briefing_digest, parts
+
+def evict():
+    """
+    Deletes least recently used audio files until the cache is under
+    AUDIO_CACHE_MAX_BYTES, never one used in the last AUDIO_EVICT_GRACE_SECONDS.
+    """
+    try:
+        entries = [e for e in os.scandir(AUDIO_CACHE_DIR) if e.name.endswith('.mp3')]
+    except FileNotFoundError:
+        return
+    stats = []
+    for e in entries:
+        try:
+            stat = e.stat()
+        except FileNotFoundError: # evicted by another process meanwhile
+            continue
+        stats.append((stat.st_mtime, stat.st_size, e.path))
+    total = sum(size for _, size, _ in stats)
+    recent = time.time() - AUDIO_EVICT_GRACE_SECONDS
+    for mtime, size, path in sorted(stats):
+        if total <= AUDIO_CACHE_MAX_BYTES or mtime >= recent: break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
 
-def generate_audio(text, output_folder):
+def generate_audio(text, output_folder, language='english'):
     """
-    Generates audio from text using gTTS and saves it to the output folder.
+    Generates audio from text through the shared audio cache and copies it to the output folder.
     Returns the filename.
     """
     try:
-        # Clean markdown characters for better TTS
-        clean_text = text.replace('*', '').replace('#', '').replace('-', ' ')
-        
-        tts = gTTS(text=clean_text, lang='en')
-        filename = f"{uuid.uuid4()}.mp3"
-        filepath = os.path.join(output_folder, filename)
-        tts.save(filepath)
+        digest = render_segment(text, language)
+        filename = f"{digest}.mp3"
+        if os.path.abspath(output_folder) != os.path.abspath(AUDIO_CACHE_DIR):
+            shutil.copyfile(audio_path(digest), os.path.join(output_folder, filename))
         return filename
     except Exception as e:
         print(f"Error generating audio: {e}")
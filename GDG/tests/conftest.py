@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GEMINI_API_KEY', 'fake')
+os.environ.setdefault('SPAN_LOG', '0')
+
+from services import ai_client
+from benchmarks.fake_gemini import start_fake_gemini
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """
+    Starts a local fake Gemini and points ai_client at it with a fresh breaker
+    and budgets. Call it with handler attributes (error_rate, error_codes,
+    latency...); returns the list of (status, timestamp) the fake answered.
+    """
+    from google import genai
+    from google.genai import types
+
+    servers = []
+    monkeypatch.setattr(ai_client, 'breaker', ai_client.CircuitBreaker(threshold=2, cooldown=0.2))
+    monkeypatch.setattr(ai_client, '_request_bucket', ai_client.TokenBucket(100000))
+    monkeypatch.setattr(ai_client, '_token_bucket', ai_client.TokenBucket(10000000))
+    monkeypatch.setattr(ai_client, 'AI_BACKOFF_BASE', 0.01)
+
+    def start(**attrs):
+        calls = []
+        attrs.setdefault('latency', 0.01)
+        server, base_url = start_fake_gemini(calls=calls, **attrs)
+        servers.append(server)
+        monkeypatch.setattr(ai_client, '_client', genai.Client(api_key='fake', http_options=types.HttpOptions(base_url=base_url)))
+        return calls
+
+    yield start
+    for server in servers:
+        server.shutdown()
@@ -0,0 +1,138 @@
+import time
+import asyncio
+
+import pytest
+
+from services import ai_client
+from services.ai_client import AIUnavailableError, CircuitBreaker, TokenBucket
+
+def trip(breaker):
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+
+def test_breaker_opens_after_threshold_and_fails_fast(fake_gemini):
+    calls = fake_gemini()
+    trip(ai_client.breaker)
+    assert ai_client.breaker.state == 'open'
+    with pytest.raises(AIUnavailableError):
+        ai_client.generate("news")
+    assert calls == []
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    assert breaker.allow() == 'trial'
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() is True
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() == 'trial'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.allow() is False
+
+def test_unreleased_trial_expires():
+    breaker = CircuitBreaker(threshold=1, cooldown=0, trial_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow() == 'trial'
+    assert breaker.allow() is False
+    time.sleep(0.06)
+    assert breaker.allow() == 'trial'
+
+def test_trial_success_closes_the_circuit(fake_gemini):
+    calls = fake_gemini()
+    trip(ai_client.breaker)
+    time.sleep(0.25)
+    ai_client.generate("news")
+    assert ai_client.breaker.state == 'closed'
+    assert len(calls) == 1
+
+def test_abandoned_stream_trial_releases_the_breaker(fake_gemini):
+    fake_gemini(latency=0.2)
+    trip(ai_client.breaker)
+    time.sleep(0.25)
+    stream = ai_client.generate_stream("news")
+    next(stream)
+    assert ai_client.breaker.trial_running
+    stream.close() # the listener went away mid-briefing
+    assert not ai_client.breaker.trial_running
+    ai_client.generate("news")
+    assert ai_client.breaker.state == 'closed'
+
+def test_cancelled_async_trial_releases_the_breaker(fake_gemini):
+    fake_gemini(latency=0.5)
+    trip(ai_client.breaker)
+    time.sleep(0.25)
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(ai_client.generate_async("news"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert not ai_client.breaker.trial_running
+    assert ai_client.breaker.allow() == 'trial'
+
+def test_backoff_gives_up_after_max_attempts(fake_gemini, monkeypatch):
+    monkeypatch.setattr(ai_client, 'breaker', CircuitBreaker(threshold=10, cooldown=30))
+    calls = fake_gemini(error_rate=1.0, error_codes=(503,))
+    retries = ai_client.stats()['retries']
+    with pytest.raises(Exception) as error:
+        ai_client.generate("news")
+    assert ai_client.status_code(error.value) == 503
+    assert len(calls) == ai_client.AI_MAX_ATTEMPTS
+    assert ai_client.stats()['retries'] - retries == ai_client.AI_MAX_ATTEMPTS - 1
+
+def test_backoff_stops_when_the_breaker_opens(fake_gemini):
+    calls = fake_gemini(error_rate=1.0, error_codes=(429,))
+    with pytest.raises(Exception):
+        ai_client.generate("news")
+    assert len(calls) == ai_client.breaker.threshold
+    assert ai_client.breaker.state == 'open'
+
+def test_client_errors_are_not_retried(fake_gemini):
+    calls = fake_gemini(error_rate=1.0, error_codes=(400,))
+    with pytest.raises(Exception):
+        ai_client.generate("news")
+    assert len(calls) == 1
+    assert ai_client.breaker.state == 'closed'
+
+def test_backoff_delay_is_capped(monkeypatch):
+    monkeypatch.setattr(ai_client, 'AI_BACKOFF_BASE', 1.0)
+    monkeypatch.setattr(ai_client, 'AI_BACKOFF_MAX', 4.0)
+    assert all(0 <= ai_client.backoff_delay(attempt) <= 4.0 for attempt in range(10) for _ in range(50))
+
+def test_token_bucket_refuses_past_the_wait():
+    bucket = TokenBucket(60)
+    assert bucket.acquire(60, timeout=0)
+    assert not bucket.acquire(1, timeout=0.5)
+    assert bucket.acquire(1, timeout=1.5)
+
+def test_limiter_refuses_work_without_calling_gemini(fake_gemini, monkeypatch):
+    calls = fake_gemini()
+    monkeypatch.setattr(ai_client, '_request_bucket', TokenBucket(1))
+    ai_client.generate("news")
+    rejected = ai_client.stats()['rejected']
+    with pytest.raises(AIUnavailableError):
+        ai_client.generate("news")
+    assert len(calls) == 1
+    assert ai_client.stats()['rejected'] == rejected + 1
+
+def test_limiter_refusal_releases_a_trial(fake_gemini, monkeypatch):
+    fake_gemini()
+    monkeypatch.setattr(ai_client, '_request_bucket', TokenBucket(1))
+    ai_client._request_bucket.acquire(1)
+    trip(ai_client.breaker)
+    time.sleep(0.25)
+    with pytest.raises(AIUnavailableError):
+        ai_client.generate("news")
+    assert not ai_client.breaker.trial_running
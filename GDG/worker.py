@@ -0,0 +1,8 @@
+from app import create_app, prebuild_briefing, clean_user_topics
+from services import scheduler
+
+# The worker process runs background jobs as well as the prebuild scheduler
+app = create_app({'JOB_RUNNER': True})
+
+if __name__ == '__main__':
+    scheduler.run_forever(app, prebuild_briefing, clean_user_topics)